@@ -1,7 +1,10 @@
 """Decide on interventions
 """
 # pylint: disable=C0103
-from digital_comms.mobile_network.model import PostcodeSector
+from digital_comms.mobile_network.model import (
+    MACRO_FREQUENCIES, MACRO_BANDWIDTH, SMALL_CELL_CONFIGURATION,
+    CapacityCurves, count_sites, lookup_clutter_geotype,
+    )
 
 import copy
 import math
@@ -371,9 +374,9 @@ def _suggest_interventions(budget, available_interventions,
         if budget <= 0:
             break
 
-        if _area_satisfied(area, area_interventions,
-            service_obligation_capacity,
-            traffic, market_share):
+        area_capacity = SectorCapacity(area, service_obligation_capacity)
+
+        if area_capacity.satisfied(area_interventions):
             continue
 
         # group assets by site
@@ -423,8 +426,7 @@ def _suggest_interventions(budget, available_interventions,
         if 'carrier_700' in available_interventions and \
             timestep >= 2020:
 
-            if _area_satisfied(area, area_interventions,
-                service_obligation_capacity, traffic, market_share):
+            if area_capacity.satisfied(area_interventions):
                 continue
 
             build_option = INTERVENTIONS['carrier_700']['assets_to_build']
@@ -466,8 +468,7 @@ def _suggest_interventions(budget, available_interventions,
         if 'carrier_3500' in available_interventions and \
             timestep >= 2020:
 
-            if _area_satisfied(area, area_interventions,
-                service_obligation_capacity, traffic, market_share):
+            if area_capacity.satisfied(area_interventions):
                 continue
 
             build_option = INTERVENTIONS['carrier_3500']['assets_to_build']
@@ -504,8 +505,7 @@ def _suggest_interventions(budget, available_interventions,
 
         # x6_sectors
         if 'add_3_sectors' in available_interventions:
-            if _area_satisfied(area, area_interventions,
-                service_obligation_capacity, traffic, market_share):
+            if area_capacity.satisfied(area_interventions):
                 continue
 
             build_option = INTERVENTIONS['add_3_sectors']['assets_to_build']
@@ -549,8 +549,7 @@ def _suggest_interventions(budget, available_interventions,
         # build_macro_site
         if 'build_macro_site' in available_interventions:
 
-            if _area_satisfied(area, area_interventions,
-                service_obligation_capacity, traffic, market_share):
+            if area_capacity.satisfied(area_interventions):
                 continue
 
             for site_ngr, site_assets in assets_by_site.items():
@@ -567,6 +566,12 @@ def _suggest_interventions(budget, available_interventions,
                 build_option = INTERVENTIONS['build_macro_site']['assets_to_build']
                 cost = INTERVENTIONS['build_macro_site']['cost']
 
+                area_capacity.update(area_interventions)
+                sites_needed = area_capacity.sites_needed(
+                    build_option[0], minimum=1
+                    )
+
+                number_built = 0
                 while True:
                     to_build = copy.deepcopy(build_option)
                     to_build[0]['build_date'] = timestep
@@ -579,11 +584,10 @@ def _suggest_interventions(budget, available_interventions,
                         'build_macro_site', cost
                         ))
                     budget -= cost
+                    number_built += 1
 
-                    if budget < 0 or _area_satisfied(area,
-                        area_interventions,
-                        service_obligation_capacity,
-                        traffic, market_share):
+                    if budget < 0 or (sites_needed is not None and
+                        number_built >= sites_needed):
                         break
 
         if budget < 0:
@@ -656,8 +660,7 @@ def _suggest_interventions(budget, available_interventions,
 
         # build small cells to next density
         if 'small_cell' in available_interventions and timestep >= 2020:
-            if _area_satisfied(area, area_interventions,
-                service_obligation_capacity, traffic, market_share):
+            if area_capacity.satisfied(area_interventions):
                 continue
 
             area_sq_km = area.area
@@ -671,6 +674,12 @@ def _suggest_interventions(budget, available_interventions,
             build_option = INTERVENTIONS['small_cell']['assets_to_build']
             cost = INTERVENTIONS['small_cell']['cost']
 
+            area_capacity.update(area_interventions)
+            sites_needed = area_capacity.sites_needed(
+                build_option[0], minimum=1
+                )
+
+            number_built = 0
             while True:
                 to_build = copy.deepcopy(build_option)
                 to_build[0]['build_date'] = timestep
@@ -683,11 +692,10 @@ def _suggest_interventions(budget, available_interventions,
                     'small_cells', cost
                     ))
                 budget -= cost
+                number_built += 1
 
-                if budget < 0 or _area_satisfied(area,
-                    area_interventions,
-                    service_obligation_capacity,
-                    traffic, market_share):
+                if budget < 0 or (sites_needed is not None and
+                    number_built >= sites_needed):
                     break
 
     return built_interventions, budget, spend
@@ -715,31 +723,174 @@ def _area_satisfied(area, built_interventions,
     service_obligation_capacity,
     traffic, market_share):
 
-    if service_obligation_capacity == 0:
-        target_capacity = area.demand
-    else:
-        target_capacity = service_obligation_capacity
-
-    data = {
-        "id": area.id,
-        "lad_id": area.lad_id,
-        "population": area.population,
-        "area": area.area,
-        "user_throughput": area.user_throughput,
-    }
-
-    assets = area.assets + built_interventions
-
-    test_area = PostcodeSector(
-        data,
-        assets,
-        area._capacity_lookup_table,
-        area._clutter_lookup,
-        service_obligation_capacity,
-        traffic,
-        market_share
-    )
+    return SectorCapacity(area, service_obligation_capacity).satisfied(
+        built_interventions
+        )
+
+
+class SectorCapacity(object):
+    """
+    Capacity of a postcode sector as interventions are added to it.
+
+    Keeps the site count of each band, so the capacity after adding
+    assets is looked up without rebuilding a `PostcodeSector` from all
+    of its assets. Capacities are summed in the same order as
+    `PostcodeSector`, so they are identical to a rebuild.
+
+    Parameters
+    ----------
+    area: PostcodeSector
+        The postcode sector receiving interventions
+    service_obligation_capacity: float
+        Capacity to reach in Mbps/km^2, or 0 to meet the demand of
+        the area instead
+
+    Raises
+    ------
+    KeyError
+        If a capacity curve of the area is not in the lookup table.
+
+    """
+    def __init__(self, area, service_obligation_capacity):
+
+        if service_obligation_capacity == 0:
+            self.target_capacity = area.demand
+        else:
+            self.target_capacity = service_obligation_capacity
+
+        self.area = area.area
+        self.site_counts = count_sites(area.assets)
+        self._counted = 0
+
+        clutter_environment = lookup_clutter_geotype(
+            area._clutter_lookup, area.population_density
+            )
+
+        curves = CapacityCurves(area._capacity_lookup_table)
+        keys = [
+            (clutter_environment, frequency, MACRO_BANDWIDTH)
+            for frequency in MACRO_FREQUENCIES
+            ]
+        keys.append(SMALL_CELL_CONFIGURATION)
+
+        self._curves = curves
+        self._keys = keys
+        self._densities = [curves.curve(key)[0] for key in keys]
+
+    def update(self, built_interventions):
+        """
+        Count assets added to the end of `built_interventions` since
+        the last update. The list must only be appended to.
+
+        """
+        added = count_sites(built_interventions[self._counted:])
+        for band, number in enumerate(added):
+            self.site_counts[band] += number
+        self._counted = len(built_interventions)
+
+    def capacity(self, asset=None, number=0):
+        """
+        Return the capacity in Mbps/km^2, after adding `number` more
+        of `asset` if given.
+
+        """
+        if asset is None:
+            site_counts = self.site_counts
+        else:
+            site_counts = [
+                count + number * added for count, added
+                in zip(self.site_counts, count_sites([asset]))
+                ]
+
+        return self._capacity(site_counts)
+
+    def _capacity(self, site_counts):
+
+        macro_capacity = 0
+        for key, num_sites in zip(self._keys[:-1], site_counts[:-1]):
+            macro_capacity += self._curves.capacity(
+                key, float(num_sites) / self.area
+                )
+
+        return macro_capacity + self._curves.capacity(
+            self._keys[-1], float(site_counts[-1]) / self.area
+            )
+
+    def satisfied(self, built_interventions):
+        """
+        Return whether the area reaches the target capacity with
+        `built_interventions` added.
+
+        """
+        self.update(built_interventions)
+
+        return self.capacity() >= self.target_capacity
+
+    def sites_needed(self, asset, minimum=0):
+        """
+        Return the smallest number, of at least `minimum`, of `asset`
+        to add for the area to reach the target capacity, or None if
+        no number of them does.
+
+        Notes
+        -----
+        Capacity is linear in the number added between the numbers at
+        which any band reaches a site density of its lookup curve, so
+        the curves are inverted one piece at a time rather than adding
+        one asset after another.
+
+        """
+        added = count_sites([asset])
+
+        def capacity(number):
+            return self._capacity([
+                count + number * step
+                for count, step in zip(self.site_counts, added)
+                ])
+
+        breaks = set()
+        for densities, count, step in zip(
+            self._densities, self.site_counts, added):
+            if step == 0:
+                continue
+            for density in densities:
+                number = (density * self.area - count) / step
+                if number > minimum:
+                    breaks.add(number)
+
+        lower = minimum
+        for upper in sorted(breaks) + [None]:
+
+            first = int(math.ceil(lower))
+            if upper is None:
+                last = first
+            else:
+                last = int(math.floor(upper))
+                lower = upper
+                if last < first:
+                    continue
+
+            first_capacity = capacity(first)
+            if first_capacity >= self.target_capacity:
+                return first
+
+            last_capacity = capacity(last)
+            if last_capacity < self.target_capacity:
+                continue
+
+            #invert the linear piece, then settle rounding either way
+            number = first + (
+                (self.target_capacity - first_capacity) * (last - first) /
+                (last_capacity - first_capacity)
+                )
+            number = min(max(int(math.ceil(number)), first + 1), last)
+
+            while capacity(number) < self.target_capacity:
+                number += 1
+            while number - 1 > first and \
+                capacity(number - 1) >= self.target_capacity:
+                number -= 1
+
+            return number
 
-    reached_capacity = test_area.capacity
-    # print(reached_capacity)
-    return reached_capacity >= target_capacity
+        return None
@@ -1,9 +1,22 @@
 """Cambridge Communications Assessment Model
 """
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from itertools import tee
 from pprint import pprint
 
+import numpy as np
+
+#bands summed for macrocell capacity, in the order they are added
+MACRO_FREQUENCIES = ['800', '2600', '700', '3500']
+MACRO_BANDWIDTH = "2x10MHz"
+
+#clutter environment, frequency and bandwidth of small cell capacity
+SMALL_CELL_CONFIGURATION = ("Small cells", "3700", "2x25MHz")
+
+# TODO: replace hard-coded parameter
+PENETRATION = 0.8
+
 class NetworkManager(object):
     """Model controller class.
     Represents local area districts and postcode sectors
@@ -75,11 +88,23 @@ class NetworkManager(object):
 
         :obj:`dict` attribute `postcode_sectors`
 
+        The capacity and clutter environment of every postcode sector
+        are evaluated together by a `CapacityEngine`, held in the
+        `capacity_engine` attribute. Later changes are applied with
+        `update_population` and `apply_interventions`, which only
+        re-evaluate the postcode sectors affected.
+
         """
         self.lads = {}
 
         self.postcode_sectors = {}
 
+        self._capacity_lookup_table = capacity_lookup_table
+        self._clutter_lookup = clutter_lookup
+        self._service_obligation_capacity = service_obligation_capacity
+        self._traffic = traffic
+        self._market_share = market_share
+
         for lad_data in lads:
             lad_id = lad_data["id"]
             self.lads[lad_id] = LAD(
@@ -89,24 +114,185 @@ class NetworkManager(object):
         assets_by_pcd = defaultdict(list)
         for asset in assets:
             assets_by_pcd[asset['pcd_sector']].append(asset)
-
-        for pcd_sector_data in pcd_sectors:
-            try:
-                lad_id = pcd_sector_data["lad_id"]
+        self._assets_by_pcd = assets_by_pcd
+
+        #copies, so later updates leave the caller's data unchanged
+        self._pcd_sector_data = {}
+        #position of each postcode sector in the input
+        self._pcd_sector_order = {}
+        for position, pcd_sector_data in enumerate(pcd_sectors):
+            if "id" in pcd_sector_data:
                 pcd_sector_id = pcd_sector_data["id"]
-                assets = assets_by_pcd[pcd_sector_id]
+                self._pcd_sector_data[pcd_sector_id] = dict(pcd_sector_data)
+                self._pcd_sector_order.setdefault(pcd_sector_id, position)
+
+        self.capacity_engine = CapacityEngine.from_sectors(
+            pcd_sectors, assets_by_pcd, capacity_lookup_table,
+            clutter_lookup, traffic, market_share
+            )
+
+        for row, pcd_sector_data in enumerate(pcd_sectors):
+            self._add_pcd_sector(row, pcd_sector_data)
+
+    def _add_pcd_sector(self, row, pcd_sector_data):
+        """
+        Create the PostcodeSector for a row of the capacity engine and
+        add it to its LAD, replacing any previous version in place.
+
+        """
+        #sectors with incomplete data or no matching lookup are
+        #skipped, as if PostcodeSector had raised
+        if not self.capacity_engine.valid[row]:
+            return
+
+        try:
+            lad_id = pcd_sector_data["lad_id"]
+            pcd_sector_id = pcd_sector_data["id"]
+            assets = self._assets_by_pcd[pcd_sector_id]
+
+            pcd_sector = PostcodeSector(
+                pcd_sector_data, assets,
+                self._capacity_lookup_table, self._clutter_lookup,
+                self._service_obligation_capacity, self._traffic,
+                self._market_share,
+                self.capacity_engine.clutter_environment(row),
+                float(self.capacity_engine.capacity[row]))
+
+            self.postcode_sectors[pcd_sector_id] = pcd_sector
+
+            lad_containing_pcd_sector = self.lads[lad_id]
+            lad_containing_pcd_sector.add_pcd_sector(pcd_sector)
+        except:
+            pass
+
+    def _refresh(self, pcd_sector_ids):
+        """
+        Re-evaluate postcode sectors after their data or assets have
+        changed.
+
+        """
+        engine = self.capacity_engine
+
+        rows = [
+            engine.index[pcd_sector_id] for pcd_sector_id in pcd_sector_ids
+            if pcd_sector_id in engine.index
+            ]
+
+        if not rows:
+            return
+
+        for row in rows:
+            pcd_sector_id = engine.ids[row]
+            engine.load_sector(
+                row, self._pcd_sector_data[pcd_sector_id],
+                self._assets_by_pcd.get(pcd_sector_id, [])
+                )
 
-                pcd_sector = PostcodeSector(
-                    pcd_sector_data, assets,
-                    capacity_lookup_table, clutter_lookup,
-                    service_obligation_capacity, traffic, market_share)
+        engine.evaluate(rows)
 
-                self.postcode_sectors[pcd_sector_id] = pcd_sector
+        added = False
 
-                lad_containing_pcd_sector = self.lads[lad_id]
-                lad_containing_pcd_sector.add_pcd_sector(pcd_sector)
-            except:
-                pass
+        for row in rows:
+
+            pcd_sector_id = engine.ids[row]
+
+            if not engine.valid[row]:
+                previous = self.postcode_sectors.pop(pcd_sector_id, None)
+                if previous is not None and previous.lad_id in self.lads:
+                    self.lads[previous.lad_id].remove_pcd_sector(
+                        pcd_sector_id
+                        )
+                continue
+
+            added |= pcd_sector_id not in self.postcode_sectors
+
+            self._add_pcd_sector(row, self._pcd_sector_data[pcd_sector_id])
+
+        #sectors which have become valid are put back in input order,
+        #as a rebuild would, so results are listed and summed in the
+        #same order
+        if added:
+            position = self._pcd_sector_order.get
+            self.postcode_sectors = dict(sorted(
+                self.postcode_sectors.items(), key=lambda item: position(item[0])
+                ))
+            for lad in self.lads.values():
+                lad.sort_pcd_sectors(position)
+
+    def update_population(self, populations, user_throughput=None):
+        """
+        Update postcode sectors to new population values, e.g. those of
+        the next timestep of a scenario.
+
+        Parameters
+        ----------
+        populations: dict
+            Population keyed by postcode sector id. Sectors not listed
+            keep their population and user throughput.
+        user_throughput: float, optional
+            New user throughput for every listed postcode sector
+
+        Returns
+        -------
+        list of str
+            Ids of the postcode sectors which changed and were
+            re-evaluated
+
+        """
+        changed = []
+
+        for pcd_sector_id, population in populations.items():
+
+            pcd_sector_data = self._pcd_sector_data.get(pcd_sector_id)
+            if pcd_sector_data is None:
+                continue
+
+            updates = {"population": population}
+            if user_throughput is not None:
+                updates["user_throughput"] = user_throughput
+
+            if all(key in pcd_sector_data and pcd_sector_data[key] == value
+                for key, value in updates.items()):
+                continue
+
+            pcd_sector_data.update(updates)
+            changed.append(pcd_sector_id)
+
+        self._refresh(changed)
+
+        return changed
+
+    def apply_interventions(self, interventions_built):
+        """
+        Add newly built assets, re-evaluating only the postcode sectors
+        which receive them.
+
+        Parameters
+        ----------
+        interventions_built: list of dict
+            Assets, as returned by `decide_interventions`
+
+        Returns
+        -------
+        list of str
+            Ids of the postcode sectors which received assets
+
+        """
+        built_by_pcd = defaultdict(list)
+        for asset in interventions_built:
+            built_by_pcd[asset['pcd_sector']].append(asset)
+
+        for pcd_sector_id, built in built_by_pcd.items():
+            #a new list, so sectors built earlier keep their own assets
+            self._assets_by_pcd[pcd_sector_id] = (
+                self._assets_by_pcd[pcd_sector_id] + built
+                )
+
+        changed = list(built_by_pcd)
+
+        self._refresh(changed)
+
+        return changed
 
 
 class LAD(object):
@@ -114,6 +300,12 @@ class LAD(object):
     Local area district.
     Represents an area to be modelled, contains data for demand
     characterisation and assets for supply assessment.
+
+    Totals over the nested postcode sectors are summed in one pass the
+    first time an aggregate is needed, and kept until a sector is
+    added, removed or reordered. Postcode sectors are therefore
+    replaced with `add_pcd_sector` rather than changed in place.
+
     Arguments
     ---------
     data: dict
@@ -128,27 +320,60 @@ class LAD(object):
         self.name = data["name"]
         self.service_obligation_capacity = service_obligation_capacity
         self._pcd_sectors = {}
+        self._totals = None
 
     def __repr__(self):
         return "<LAD id:{} name:{}>".format(self.id, self.name)
 
+    def _summed(self):
+        """
+        Return the totals over all nested postcode sectors, summing
+        them if a sector has changed since they were last summed.
+
+        Sums are accumulated in sector order, so they equal summing
+        each aggregate separately.
+
+        """
+        if self._totals is None:
+
+            population = 0
+            area = 0
+            capacity = 0
+            demand = 0
+            population_with_coverage = 0
+
+            for pcd_sector in self._pcd_sectors.values():
+                population += pcd_sector.population
+                area += pcd_sector.area
+                capacity += pcd_sector.capacity
+                demand += pcd_sector.demand * pcd_sector.area
+                #population-weighted coverage mask
+                if pcd_sector.capacity >= self.service_obligation_capacity:
+                    population_with_coverage += pcd_sector.population
+
+            self._totals = {
+                'population': population,
+                'area': area,
+                'capacity': capacity,
+                'demand': demand,
+                'population_with_coverage': population_with_coverage,
+            }
+
+        return self._totals
+
     @property
     def population(self):
         """
         obj: Sum of all sectors populations in the LAD.
 
         """
-        return sum([
-            pcd_sector.population
-            for pcd_sector in self._pcd_sectors.values()])
+        return self._summed()['population']
 
     @property
     def population_density(self):
         """obj: The population density in the local area district
         """
-        total_area = sum([
-            pcd_sector.area
-            for pcd_sector in self._pcd_sectors.values()])
+        total_area = self._summed()['area']
         if total_area == 0:
             return 0
         else:
@@ -156,6 +381,7 @@ class LAD(object):
 
     def add_pcd_sector(self, pcd_sector):
         """Add a postcode sector to the local area district.
+        A sector with the same id is replaced in its position.
         Arguments
         ---------
         pcd_sector: PostcodeSector
@@ -163,6 +389,31 @@ class LAD(object):
             added to the local area district
         """
         self._pcd_sectors[pcd_sector.id] = pcd_sector
+        self._totals = None
+
+    def remove_pcd_sector(self, pcd_sector_id):
+        """Remove a postcode sector from the local area district.
+        Arguments
+        ---------
+        pcd_sector_id: str
+            Id of the postcode sector to remove
+        """
+        self._pcd_sectors.pop(pcd_sector_id, None)
+        self._totals = None
+
+    def sort_pcd_sectors(self, key):
+        """Reorder the postcode sectors, which sets the order they
+        are summed in.
+        Arguments
+        ---------
+        key: callable
+            Called with each postcode sector id, returning its
+            sort key
+        """
+        self._pcd_sectors = dict(sorted(
+            self._pcd_sectors.items(), key=lambda item: key(item[0])
+            ))
+        self._totals = None
 
     def capacity(self):
         """
@@ -179,9 +430,7 @@ class LAD(object):
         if not self._pcd_sectors:
             return 0
 
-        summed_capacity = sum([
-            pcd_sector.capacity
-            for pcd_sector in self._pcd_sectors.values()])
+        summed_capacity = self._summed()['capacity']
 
         return summed_capacity / len(self._pcd_sectors)
 
@@ -202,14 +451,11 @@ class LAD(object):
         if not self._pcd_sectors:
             return 0
 
-        summed_demand = sum(
-            pcd_sector.demand * pcd_sector.area
-            for pcd_sector in self._pcd_sectors.values()
-        )
-        summed_area = sum(
-            pcd_sector.area
-            for pcd_sector in self._pcd_sectors.values()
-        )
+        totals = self._summed()
+
+        summed_demand = totals['demand']
+        summed_area = totals['area']
+
         return summed_demand / summed_area
 
     def coverage(self):
@@ -229,14 +475,11 @@ class LAD(object):
         if not self._pcd_sectors:
             return 0
 
-        population_with_coverage = sum([
-            pcd_sector.population
-            for pcd_sector in self._pcd_sectors.values()
-            if pcd_sector.capacity >= self.service_obligation_capacity])
+        totals = self._summed()
 
-        total_pop = sum([
-            pcd_sector.population
-            for pcd_sector in self._pcd_sectors.values()])
+        population_with_coverage = totals['population_with_coverage']
+
+        total_pop = totals['population']
 
         return float(population_with_coverage) / total_pop
 
@@ -245,10 +488,14 @@ class PostcodeSector(object):
     """
     Represents a Postcode sector to be modelled
 
+    The clutter environment and capacity are looked up from the assets
+    unless given, e.g. by a `CapacityEngine` which has already
+    evaluated them for many sectors.
+
     """
     def __init__(self, data, assets, capacity_lookup_table,
         clutter_lookup, service_obligation_capacity,
-        traffic, market_share):
+        traffic, market_share, clutter_environment=None, capacity=None):
 
         self.id = data["id"]
         self.lad_id = data["lad_id"]
@@ -265,20 +512,23 @@ class PostcodeSector(object):
         self._capacity_lookup_table = capacity_lookup_table
         self._clutter_lookup = clutter_lookup
 
-        self.clutter_environment = lookup_clutter_geotype(
-            self._clutter_lookup,
-            self.population_density
-        )
+        if clutter_environment is None:
+            clutter_environment = lookup_clutter_geotype(
+                self._clutter_lookup,
+                self.population_density
+            )
+        self.clutter_environment = clutter_environment
 
-        # TODO: replace hard-coded parameter
-        self.penetration = 0.8
+        self.penetration = PENETRATION
 
         # Keep list of assets
         self.assets = assets
-        self.capacity = (
-            self._macrocell_site_capacity() +
-            self._small_cell_capacity()
-            )
+        if capacity is None:
+            capacity = (
+                self._macrocell_site_capacity() +
+                self._small_cell_capacity()
+                )
+        self.capacity = capacity
 
     def __repr__(self):
         return "<PostcodeSector id:{}>".format(self.id)
@@ -297,7 +547,7 @@ class PostcodeSector(object):
                 * 1/3600 converting hours to seconds,
             = ~0.01 Mbps required per user
         """
-        return user_throughput * 1024 * 8 * traffic / 30 / 3600
+        return calculate_user_demand(user_throughput, traffic)
 
     def threshold_demand(self):
         """
@@ -359,7 +609,7 @@ class PostcodeSector(object):
     def _macrocell_site_capacity(self):
         capacity = 0
 
-        for frequency in ['800', '2600', '700', '3500']:
+        for frequency in MACRO_FREQUENCIES:
             num_sites = 0
             for asset in self.assets:
                 for asset_frequency in asset['frequency']:
@@ -374,7 +624,7 @@ class PostcodeSector(object):
                 self._capacity_lookup_table,
                 self.clutter_environment,
                 frequency,
-                "2x10MHz",
+                MACRO_BANDWIDTH,
                 site_density)
 
             capacity += tech_capacity
@@ -393,10 +643,8 @@ class PostcodeSector(object):
 
         capacity = lookup_capacity(
             self._capacity_lookup_table,
-            "Small cells",
-            "3700",
-            "2x25MHz",
-            site_density)
+            *SMALL_CELL_CONFIGURATION,
+            site_density=site_density)
 
         return capacity
 
@@ -408,6 +656,290 @@ class PostcodeSector(object):
         return capacity_margin
 
 
+class CapacityEngine(object):
+    """
+    Columnar capacity and demand of many postcode sectors.
+
+    Each sector is a row of arrays holding its area, population, user
+    throughput and site counts per band. Clutter environment, capacity,
+    demand and capacity margin are evaluated for every row with a few
+    NumPy operations per band and clutter environment, giving the same
+    values as `PostcodeSector`.
+
+    Parameters
+    ----------
+    ids: list of str
+        Postcode sector ids, one per row
+    area: array_like
+        Area of each sector in km^2
+    population: array_like
+        Number of inhabitants of each sector
+    user_throughput: array_like
+        Monthly data demand per user of each sector (GB/month)
+    site_counts: array_like
+        Sites per sector (rows) serving each band of
+        `MACRO_FREQUENCIES`, followed by the number of small cells
+        (columns), see `count_sites`
+    capacity_lookup_table: dict
+        As for `NetworkManager`
+    clutter_lookup: list of tuple
+        As for `NetworkManager`
+    traffic: float
+        Proportion of traffic in the busy hour
+    market_share: float
+        Market share of the modelled operator
+
+    complete: array_like of bool, optional
+        False for rows whose postcode sector data is incomplete
+
+    Attributes
+    ----------
+    valid: numpy.ndarray
+        False for rows `PostcodeSector` could not evaluate, e.g. with
+        incomplete data, a zero area or a clutter environment missing
+        from the lookup table. Their values are undefined.
+
+    Notes
+    -----
+    The lookup tables are compiled for the lifetime of the engine, see
+    `CapacityCurves` and `ClutterGeotypes`, so they must not be changed
+    once it is created.
+
+    """
+    def __init__(self, ids, area, population, user_throughput,
+        site_counts, capacity_lookup_table, clutter_lookup,
+        traffic, market_share, complete=None):
+
+        self.ids = list(ids)
+        self.index = {pcd_sector_id: row
+            for row, pcd_sector_id in enumerate(self.ids)}
+
+        count = len(self.ids)
+
+        self.area = np.array(area, dtype=float)
+        self.population = np.array(population, dtype=float)
+        self.user_throughput = np.array(user_throughput, dtype=float)
+        self.site_counts = np.array(
+            site_counts, dtype=float
+            ).reshape(count, len(MACRO_FREQUENCIES) + 1)
+
+        #False for rows whose postcode sector data is incomplete
+        if complete is None:
+            complete = np.ones(count, dtype=bool)
+        self.complete = np.array(complete, dtype=bool)
+
+        self.traffic = traffic
+        self.market_share = market_share
+        self.penetration = PENETRATION
+
+        self._capacity_lookup_table = capacity_lookup_table
+        self._capacity_curves = CapacityCurves(capacity_lookup_table)
+        self._clutter_geotypes = ClutterGeotypes(clutter_lookup)
+
+        self.population_density = np.zeros(count)
+        self.clutter_class = np.zeros(count, dtype=int)
+        self.user_demand = np.zeros(count)
+        self.demand = np.zeros(count)
+        self.capacity = np.zeros(count)
+        self.valid = np.zeros(count, dtype=bool)
+
+        self.evaluate()
+
+    @classmethod
+    def from_sectors(cls, pcd_sectors, assets_by_pcd, capacity_lookup_table,
+        clutter_lookup, traffic, market_share):
+        """
+        Build an engine from postcode sector dicts, as passed to
+        `NetworkManager`, and their assets keyed by postcode sector id.
+        Sectors missing data are kept as invalid rows.
+
+        """
+        count = len(pcd_sectors)
+
+        ids = []
+        values = np.zeros((count, 3))
+        site_counts = np.zeros((count, len(MACRO_FREQUENCIES) + 1))
+        complete = np.zeros(count, dtype=bool)
+
+        for row, pcd_sector_data in enumerate(pcd_sectors):
+            ids.append(pcd_sector_data.get("id"))
+            sector_values = _sector_values(
+                pcd_sector_data,
+                assets_by_pcd.get(pcd_sector_data.get("id"), [])
+                )
+            if sector_values is not None:
+                values[row], site_counts[row] = sector_values
+                complete[row] = True
+
+        return cls(ids, values[:, 0], values[:, 1], values[:, 2],
+            site_counts, capacity_lookup_table, clutter_lookup, traffic,
+            market_share, complete)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load_sector(self, row, pcd_sector_data, assets):
+        """
+        Replace the values of a row from a postcode sector dict and its
+        assets. Call `evaluate` afterwards to update the results.
+
+        """
+        sector_values = _sector_values(pcd_sector_data, assets)
+
+        self.complete[row] = sector_values is not None
+
+        if sector_values is not None:
+            values, site_counts = sector_values
+            self.area[row], self.population[row], \
+                self.user_throughput[row] = values
+            self.site_counts[row] = site_counts
+
+    def evaluate(self, rows=None):
+        """
+        Evaluate the clutter environment, demand and capacity from the
+        current area, population, throughput and site counts.
+
+        Parameters
+        ----------
+        rows: array_like of int, optional
+            Rows to evaluate. Defaults to every row.
+
+        """
+        if rows is None:
+            rows = slice(None)
+        else:
+            rows = np.asarray(rows, dtype=int)
+
+        area = self.area[rows]
+        population = self.population[rows]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            population_density = population / area
+
+            clutter_class = self._clutter_geotypes.classes(population_density)
+
+            user_demand = calculate_user_demand(
+                self.user_throughput[rows], self.traffic
+                )
+
+            users = population * self.penetration * self.market_share
+            demand = users * user_demand / area
+
+            capacity, found = self._capacity(
+                clutter_class, self.site_counts[rows], area
+                )
+
+        self.population_density[rows] = population_density
+        self.clutter_class[rows] = clutter_class
+        self.user_demand[rows] = user_demand
+        self.demand[rows] = demand
+        self.capacity[rows] = capacity
+        self.valid[rows] = self.complete[rows] & (area != 0) & found
+
+    def _capacity(self, clutter_class, site_counts, area):
+
+        capacity = np.zeros(len(area))
+        found = np.ones(len(area), dtype=bool)
+
+        for band, frequency in enumerate(MACRO_FREQUENCIES):
+
+            site_density = site_counts[:, band] / area
+
+            for geotype_class, geotype in enumerate(
+                self._clutter_geotypes.geotypes):
+
+                rows = clutter_class == geotype_class
+                if not rows.any():
+                    continue
+
+                key = (geotype, frequency, MACRO_BANDWIDTH)
+                if key not in self._capacity_lookup_table:
+                    found[rows] = False
+                    continue
+
+                capacity[rows] += self._capacity_curves.capacity(
+                    key, site_density[rows]
+                    )
+
+        if SMALL_CELL_CONFIGURATION in self._capacity_lookup_table:
+            capacity += self._capacity_curves.capacity(
+                SMALL_CELL_CONFIGURATION, site_counts[:, -1] / area
+                )
+        else:
+            found[:] = False
+
+        return capacity, found
+
+    @property
+    def capacity_margin(self):
+        """numpy.ndarray: Capacity margin of every row in Mbps km^2
+        """
+        return self.capacity - self.demand
+
+    def clutter_environment(self, row):
+        """Return the clutter environment (geotype) of a row
+        """
+        return self._clutter_geotypes.geotypes[self.clutter_class[row]]
+
+
+def _sector_values(pcd_sector_data, assets):
+    """
+    Return the area, population and user throughput of a postcode
+    sector, and its site counts, or None if any are missing.
+
+    """
+    try:
+        pcd_sector_data["lad_id"]
+        values = (
+            float(pcd_sector_data["area"]),
+            float(pcd_sector_data["population"]),
+            float(pcd_sector_data["user_throughput"]),
+            )
+        return values, count_sites(assets)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def calculate_user_demand(user_throughput, traffic):
+    """
+    Calculate Mb/second from GB/month, see
+    `PostcodeSector._calculate_user_demand`. Accepts scalars or arrays.
+
+    """
+    return user_throughput * 1024 * 8 * traffic / 30 / 3600
+
+
+def count_sites(assets):
+    """
+    Count the sites of a postcode sector as `PostcodeSector` does when
+    calculating capacity.
+
+    Parameters
+    ----------
+    assets: list of dict
+        Assets of the postcode sector
+    Returns
+    -------
+    list of int
+        For each band of `MACRO_FREQUENCIES`, the number of assets
+        listing it (six sector sites count twice), followed by the
+        number of small cells.
+
+    """
+    counts = [0] * (len(MACRO_FREQUENCIES) + 1)
+
+    for asset in assets:
+        for asset_frequency in asset['frequency']:
+            for band, frequency in enumerate(MACRO_FREQUENCIES):
+                if asset_frequency == frequency:
+                    counts[band] += 2 if asset['sectors'] == 6 else 1
+        if asset['type'] == "small_cell":
+            counts[-1] += 1
+
+    return counts
+
+
 def pairwise(iterable):
     """Return iterable of 2-tuples in a sliding window
     Parameters
@@ -428,6 +960,158 @@ def pairwise(iterable):
     return zip(a, b)
 
 
+class CapacityCurves(object):
+    """
+    Capacity lookup table compiled to arrays.
+
+    Each (clutter environment, frequency, bandwidth) curve is converted
+    once, on first use, to sorted lists of site densities and
+    capacities for scalar lookups with `bisect`, and to NumPy arrays
+    for lookups over many site densities. The lookup table must not be
+    changed afterwards; compile a new `CapacityCurves` instead.
+
+    Parameters
+    ----------
+    lookup_table: dict
+        Capacity lookup table, see `NetworkManager`
+
+    """
+    def __init__(self, lookup_table):
+        self.source = lookup_table
+        self._curves = {}
+
+    def curve(self, key):
+        """
+        Return the compiled curve for a key of the lookup table, as a
+        tuple of (density list, capacity list, density array, capacity
+        array).
+
+        Raises
+        ------
+        KeyError
+            If the key is not found in the lookup table.
+
+        """
+        compiled = self._curves.get(key)
+        if compiled is None:
+
+            density_capacities = self.source[key]
+
+            densities = [density for density, capacity in density_capacities]
+            capacities = [capacity for density, capacity in density_capacities]
+
+            compiled = (
+                densities, capacities,
+                np.array(densities, dtype=float),
+                np.array(capacities, dtype=float)
+                )
+            self._curves[key] = compiled
+
+        return compiled
+
+    def capacity(self, key, site_density):
+        """
+        Return the capacity at a site density, or an array of
+        capacities for an array of site densities, see
+        `lookup_capacity`.
+
+        """
+        densities, capacities, density_array, capacity_array = self.curve(key)
+
+        if np.ndim(site_density) == 0:
+            return _curve_capacity(densities, capacities, site_density)
+
+        site_density = np.asarray(site_density, dtype=float)
+
+        position = np.searchsorted(
+            density_array, site_density, side='right'
+            ) - 1
+
+        capacity = np.zeros(site_density.shape)
+
+        above = position >= len(densities) - 1
+        capacity[above] = capacity_array[-1]
+
+        inside = (position >= 0) & ~above
+        lower = position[inside]
+
+        capacity[inside] = interpolate(
+            density_array[lower], capacity_array[lower],
+            density_array[lower + 1], capacity_array[lower + 1],
+            site_density[inside]
+            )
+
+        return capacity
+
+
+def _curve_capacity(densities, capacities, site_density):
+    """
+    Return the capacity at a site density from the sorted densities
+    and capacities of a lookup curve, see `lookup_capacity`.
+
+    """
+    #lower bound of the range containing the density
+    position = bisect_right(densities, site_density) - 1
+
+    if position < 0:
+        return 0
+    if position >= len(densities) - 1:
+        return capacities[-1]
+
+    return interpolate(
+        densities[position], capacities[position],
+        densities[position + 1], capacities[position + 1],
+        site_density
+        )
+
+
+class ClutterGeotypes(object):
+    """
+    Clutter lookup compiled to sorted population density bounds.
+
+    The clutter lookup must not be changed afterwards; compile a new
+    `ClutterGeotypes` instead.
+
+    Parameters
+    ----------
+    clutter_lookup: list of tuple
+        Population density bounds, ascending, and their geotypes, see
+        `lookup_clutter_geotype`
+
+    """
+    def __init__(self, clutter_lookup):
+        self.source = clutter_lookup
+        self.densities = [density for density, geotype in clutter_lookup]
+        self.geotypes = [geotype for density, geotype in clutter_lookup]
+        self._density_array = np.array(self.densities, dtype=float)
+        self._geotype_array = np.array(self.geotypes, dtype=object)
+
+    def classes(self, population_density):
+        """
+        Return the index of the clutter lookup row matching each
+        population density.
+
+        """
+        #densities within (lower, upper] take the lower row's geotype
+        position = np.searchsorted(
+            self._density_array, population_density, side='left'
+            ) - 1
+
+        return np.clip(position, 0, len(self.densities) - 1)
+
+    def geotype(self, population_density):
+        """
+        Return the geotype for a population density, or an array of
+        geotypes for an array of population densities.
+
+        """
+        if np.ndim(population_density) == 0:
+            position = bisect_left(self.densities, population_density) - 1
+            return self.geotypes[min(max(position, 0), len(self.densities) - 1)]
+
+        return self._geotype_array[self.classes(population_density)]
+
+
 def lookup_clutter_geotype(clutter_lookup, population_density):
     """Return geotype based on population density
     Parameters
@@ -441,13 +1125,14 @@ def lookup_clutter_geotype(clutter_lookup, population_density):
             kilometer (p/km^2)
         * 1: :obj:`str`
             Geotype ('Urban', ..)
-    population_density: int
+    population_density: int or array_like
         The population density in persons per square kilometer,
         that needs to be looked up in the clutter lookup table
     Returns
     -------
-    str
-        Geotype match for `population_density`
+    str or numpy.ndarray
+        Geotype match for `population_density`, or an array of
+        geotypes if an array of population densities is given
     Example
     -------
         >>> clutter_lookup = [
@@ -464,18 +1149,16 @@ def lookup_clutter_geotype(clutter_lookup, population_density):
     Returns upper boundary if population density is higher
     than the highest boundary.
 
-    """
-    middle_popd, middle_geotype = clutter_lookup[1]
-    lowest_popd, lowest_geotype = clutter_lookup[0]
-    if population_density < middle_popd:
-        return lowest_geotype
+    Arrays of population densities are looked up through a
+    `ClutterGeotypes` compiled for the call.
 
-    for (middle_popd, middle_geotype), (upper_popd, upper_geotype) in pairwise(clutter_lookup):
-        if middle_popd < population_density and population_density <= upper_popd:
-            return middle_geotype
+    """
+    if np.ndim(population_density) == 0:
+        densities = [density for density, geotype in clutter_lookup]
+        position = bisect_left(densities, population_density) - 1
+        return clutter_lookup[min(max(position, 0), len(densities) - 1)][1]
 
-    highest_popd, highest_geotype = clutter_lookup[-1]
-    return highest_geotype
+    return ClutterGeotypes(clutter_lookup).geotype(population_density)
 
 
 def lookup_capacity(lookup_table, clutter_environment, frequency,
@@ -494,12 +1177,13 @@ def lookup_capacity(lookup_table, clutter_environment, frequency,
         Frequency of the asset configuration (800, 2600, ..)
     bandwidth: str
         Bandwith of the asset configuration (2x10MHz, ..)
-    site_density: int
+    site_density: int or array_like
         The population density in asset area
     Returns
     -------
-    int
-        The capacity for the asset in TODO
+    int or numpy.ndarray
+        The capacity for the asset in TODO, or an array of
+        capacities if an array of site densities is given
     Example
     -------
     >>> lookup_table = {
@@ -522,6 +1206,9 @@ def lookup_capacity(lookup_table, clutter_environment, frequency,
     Returns the maximum capacity when the site density is higher
     than the uppper bound.
 
+    Arrays of site densities are looked up through a `CapacityCurves`
+    compiled for the call.
+
     Raises
     ------
     KeyError
@@ -532,26 +1219,15 @@ def lookup_capacity(lookup_table, clutter_environment, frequency,
         raise KeyError("Combination %s not found in lookup table",
                        (clutter_environment, frequency, bandwidth))
 
-    density_capacities = lookup_table[
-        (clutter_environment, frequency, bandwidth)
-        ]
+    key = (clutter_environment, frequency, bandwidth)
 
-    lowest_density, lowest_capacity = density_capacities[0]
-    if site_density < lowest_density:
-        return 0
+    if np.ndim(site_density) == 0:
+        densities = [density for density, capacity in lookup_table[key]]
+        capacities = [capacity for density, capacity in lookup_table[key]]
+        return _curve_capacity(densities, capacities, site_density)
 
-    for a, b in pairwise(density_capacities):
-        lower_density, lower_capacity = a
-        upper_density, upper_capacity = b
-        if lower_density <= site_density and site_density < upper_density:
-            return interpolate(
-                lower_density, lower_capacity,
-                upper_density, upper_capacity,
-                site_density
-                )
+    return CapacityCurves(lookup_table).capacity(key, site_density)
 
-    highest_density, highest_capacity = density_capacities[-1]
-    return highest_capacity
 
 def interpolate(x0, y0, x1, y1, x):
     """Linear interpolation between two values
@@ -0,0 +1,222 @@
+"""
+Monte Carlo sampling with convergence-based early stopping.
+
+Receivers and fading realisations are drawn in batches. After each
+batch, the percentile used for the cell-edge lookup values is
+re-estimated together with a distribution-free confidence interval.
+Sampling stops once the interval is narrower than the requested
+tolerance, or when the iteration budget is exhausted.
+
+"""
+import numpy as np
+from scipy.stats import binom
+
+class PercentileEstimator(object):
+    """
+    Running estimate of a percentile, with a confidence interval.
+
+    The point estimate uses the same linear interpolation as
+    `numpy.percentile`, so it matches `obtain_threshold_values` for the
+    same samples. The confidence interval brackets the true percentile
+    between two order statistics, chosen from the binomial distribution
+    of the number of samples falling below it. No assumption is made
+    about the shape of the SINR or capacity distribution.
+
+    Parameters
+    ----------
+    percentile : float
+        The percentile to track, between 0 and 100.
+    confidence : float
+        Coverage of the confidence interval, e.g. 0.95.
+
+    """
+    def __init__(self, percentile, confidence=0.95):
+
+        if not 0 <= percentile <= 100:
+            raise ValueError('Percentile must be between 0 and 100')
+
+        if not 0 < confidence < 1:
+            raise ValueError('Confidence must be between 0 and 1')
+
+        self.percentile = percentile
+        self.confidence = confidence
+        self._samples = np.empty(0)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def update(self, values):
+        """
+        Add a batch of samples.
+
+        """
+        values = np.asarray(values, dtype=float).ravel()
+
+        required = self._count + len(values)
+
+        if required > len(self._samples):
+            grown = np.empty(max(required, 2 * len(self._samples)))
+            grown[:self._count] = self._samples[:self._count]
+            self._samples = grown
+
+        self._samples[self._count:required] = values
+        self._count = required
+
+    @property
+    def samples(self):
+        """
+        numpy.ndarray: All samples added so far.
+
+        """
+        return self._samples[:self._count]
+
+    def estimate(self):
+        """
+        Return the current percentile estimate.
+
+        """
+        if not self._count:
+            return np.nan
+
+        return np.percentile(self.samples, self.percentile)
+
+    def confidence_interval(self):
+        """
+        Return the (lower, upper) bounds of the confidence interval.
+
+        With too few samples for the requested coverage, the bounds
+        fall back to the sample minimum and maximum.
+
+        """
+        if not self._count:
+            return np.nan, np.nan
+
+        n = self._count
+        quantile = self.percentile / 100
+        alpha = 1 - self.confidence
+
+        #zero-based ranks of the bracketing order statistics
+        lower_rank = int(binom.ppf(alpha / 2, n, quantile)) - 1
+        upper_rank = int(binom.ppf(1 - alpha / 2, n, quantile))
+
+        lower_rank = min(max(lower_rank, 0), n - 1)
+        upper_rank = min(max(upper_rank, 0), n - 1)
+
+        ordered = np.partition(
+            self.samples, sorted(set([lower_rank, upper_rank]))
+            )
+
+        return ordered[lower_rank], ordered[upper_rank]
+
+    def half_width(self):
+        """
+        Return half the width of the confidence interval.
+
+        """
+        lower, upper = self.confidence_interval()
+
+        return (upper - lower) / 2
+
+    def converged(self, absolute=0, relative=0):
+        """
+        Test whether the confidence interval is within tolerance.
+
+        The test is `half_width <= absolute + relative * |estimate|`,
+        the same form as `numpy.isclose`.
+
+        """
+        if not self._count:
+            return False
+
+        return bool(
+            self.half_width() <=
+            absolute + relative * abs(self.estimate())
+            )
+
+
+def run_monte_carlo(evaluate_batch, percentile, batch_size=100,
+    min_iterations=200, max_iterations=5000, sinr_tolerance=0.5,
+    capacity_tolerance=0.05, confidence=0.95, rng=None):
+    """
+    Sample link budget results in batches until the percentile
+    estimates converge.
+
+    Parameters
+    ----------
+    evaluate_batch : callable
+        Called as `evaluate_batch(quantity, rng)` and returning a list
+        of result dicts with 'spectral_efficiency', 'sinr' and
+        'capacity_mbps' keys, as `NetworkManager.estimate_link_budget`
+        does.
+    percentile : float
+        The percentile reported, as in `obtain_threshold_values`.
+    batch_size : int
+        Number of receivers drawn per batch.
+    min_iterations : int
+        Minimum number of receivers before convergence is tested.
+    max_iterations : int
+        Hard limit on the number of receivers.
+    sinr_tolerance : float
+        Maximum half width of the SINR confidence interval (dB).
+    capacity_tolerance : float
+        Maximum half width of the capacity confidence interval, relative
+        to the capacity estimate.
+    confidence : float
+        Coverage of the confidence intervals.
+    rng : numpy.random.Generator, optional
+        Passed through to `evaluate_batch`.
+
+    Returns
+    -------
+    dict
+        The spectral efficiency, SINR and capacity estimates, the SINR
+        and capacity confidence intervals, the number of iterations
+        used and whether the tolerances were met.
+
+    """
+    if batch_size < 1:
+        raise ValueError('Batch size must be at least 1')
+
+    if max_iterations < min_iterations:
+        raise ValueError('max_iterations must be at least min_iterations')
+
+    spectral_efficiency = PercentileEstimator(percentile, confidence)
+    sinr = PercentileEstimator(percentile, confidence)
+    capacity_mbps = PercentileEstimator(percentile, confidence)
+
+    converged = False
+
+    while len(sinr) < max_iterations:
+
+        quantity = min(batch_size, max_iterations - len(sinr))
+
+        results = evaluate_batch(quantity, rng)
+
+        if not results:
+            raise ValueError('evaluate_batch returned no results')
+
+        spectral_efficiency.update([r['spectral_efficiency'] for r in results])
+        sinr.update([r['sinr'] for r in results])
+        capacity_mbps.update([r['capacity_mbps'] for r in results])
+
+        if len(sinr) < min_iterations:
+            continue
+
+        converged = (
+            sinr.converged(absolute=sinr_tolerance) and
+            capacity_mbps.converged(relative=capacity_tolerance)
+            )
+
+        if converged:
+            break
+
+    return {
+        'spectral_efficiency': spectral_efficiency.estimate(),
+        'sinr': sinr.estimate(),
+        'capacity_mbps': capacity_mbps.estimate(),
+        'sinr_interval': sinr.confidence_interval(),
+        'capacity_interval': capacity_mbps.confidence_interval(),
+        'iterations': len(sinr),
+        'converged': converged,
+    }
@@ -629,7 +629,7 @@ def check_applicability(building_height, street_width, ant_height, ue_height):
 
     return overall_compliant
 
-def generate_log_normal_dist_value(mu, sigma, draws):
+def generate_log_normal_dist_value(mu, sigma, draws, rng=None):
     """
     Generates random values using a lognormal distribution,
     given a specific mean (mu) and standard deviation (sigma).
@@ -649,18 +649,23 @@ def generate_log_normal_dist_value(mu, sigma, draws):
         Standard deviation of the desired distribution.
     draws : int
         Number of required values.
+    rng : numpy.random.Generator, optional
+        Source of randomness. If None, the global NumPy RNG is reseeded
+        with 42 on every call, as in the original model.
 
     """
-    np.random.seed(42)
-
     normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
     normal_mean = np.log10(mu) - normal_std**2 / 2
 
-    hs = np.random.lognormal(normal_mean, normal_std, draws)
+    if rng is None:
+        np.random.seed(42)
+        hs = np.random.lognormal(normal_mean, normal_std, draws)
+    else:
+        hs = rng.lognormal(normal_mean, normal_std, draws)
     # print('random amount {}'.format(round(hs[0],2)))
     return round(hs[0],2)
 
-def outdoor_to_indoor_path_loss(indoor):
+def outdoor_to_indoor_path_loss(indoor, rng=None):
     """
     ITU-R M.1225 suggests building penetration loss for shadow fading can be modelled
     as a log-normal distribution with a mean and  standard deviation of 12 dB and
@@ -670,10 +675,495 @@ def outdoor_to_indoor_path_loss(indoor):
 
     if indoor:
 
-        outdoor_to_indoor_path_loss = generate_log_normal_dist_value(12, 8, 1)
+        outdoor_to_indoor_path_loss = generate_log_normal_dist_value(
+            12, 8, 1, rng
+            )
 
     else:
 
         outdoor_to_indoor_path_loss = 0
     # print('building penetration loss is {}'.format(outdoor_to_indoor_path_loss))
     return outdoor_to_indoor_path_loss
+
+#####################################
+# BATCH (VECTORISED) PATH LOSS
+#####################################
+
+#first standard normal draw after seeding with 42, as used by
+#generate_log_normal_dist_value
+LEGACY_STANDARD_NORMAL = np.random.RandomState(42).standard_normal()
+
+def path_loss_calculator_batch(frequency, distance, ant_height, ant_type,
+    building_height, street_width, settlement_type, type_of_sight, ue_height,
+    above_roof, indoor, rng=None, tables=None):
+    """
+    Calculate path loss for many links at once, for a single frequency
+    and settlement type.
+
+    This is the vectorised equivalent of `path_loss_calculator`. Each
+    model branch is evaluated over the whole array and selected with
+    boolean masks, rather than dispatching link by link in Python.
+
+    Parameters
+    ----------
+    frequency : float
+        Frequency band given in GHz (f)
+    distance : array_like
+        Distances between the transmitter and receivers (d) in m.
+    ant_height : float or array_like
+        Height of the antenna (hBS)
+    ant_type : string
+        Indicates the type of cell (hotspot, micro, macro)
+    building_height : float
+        Average building height (m)
+    street_width : float
+        Width of street (W)
+    settlement_type : string
+        Gives the type of settlement (urban, suburban or rural)
+    type_of_sight : array_like
+        Either 'los'/'nlos' strings or boolean Line of Sight flags.
+    ue_height : float or array_like
+        Height of the User Equipment (hUT)
+    above_roof : int
+        Whether the cell is above (1) or below (0) the roof line.
+    indoor : array_like
+        Boolean flags indicating whether each receiver is indoors.
+    rng : numpy.random.Generator, optional
+        Source of the shadow fading and penetration loss draws. If None,
+        every draw reproduces the legacy seed 42 value.
+    tables : PathLossTables, optional
+        If given, the deterministic terms are looked up in precomputed
+        distance tables (see `path_loss_tables`) rather than evaluated.
+
+    Returns
+    -------
+    numpy.ndarray
+        path_loss (dB) for each link.
+
+    """
+    distance = np.asarray(distance, dtype=float)
+
+    if tables is None:
+        terms = path_loss_terms(
+            frequency, distance, ant_height, ant_type, building_height,
+            street_width, settlement_type, type_of_sight, ue_height, above_roof
+        )
+    else:
+        terms = tables.terms(
+            frequency, distance, ant_height, ant_type, building_height,
+            street_width, settlement_type, type_of_sight, ue_height, above_roof
+        )
+
+    path_loss = combine_path_loss_terms(terms, rng)
+
+    indoor = np.broadcast_to(np.asarray(indoor, dtype=bool), distance.shape)
+    path_loss = path_loss + outdoor_to_indoor_path_loss_batch(indoor, rng)
+
+    return np.round(path_loss, 2)
+
+def path_loss_terms(frequency, distance, ant_height, ant_type,
+    building_height, street_width, settlement_type, type_of_sight, ue_height,
+    above_roof):
+    """
+    Split the path loss for a set of links into deterministic medians
+    and the standard deviations of their stochastic components.
+
+    Returns
+    -------
+    dict
+        * model : str
+            Either 'extended_hata' or 'e_utra'.
+        * free_space_median, free_space_sigma : numpy.ndarray
+            Free Space terms (Extended Hata band only).
+        * median, sigma, sigma_2 : numpy.ndarray
+            Model median path loss and the standard deviations of up
+            to two log-normal components. A sigma of 0 means no draw.
+
+    """
+    distance = np.asarray(distance, dtype=float)
+
+    if 0.03 < frequency <= 3:
+
+        free_space_median = free_space_median_batch(
+            frequency, distance, ant_height, ue_height
+        )
+
+        median, sigma = extended_hata_batch(
+            frequency, distance, ant_height, ue_height,
+            settlement_type, above_roof
+        )
+
+        return {
+            'model': 'extended_hata',
+            'free_space_median': free_space_median,
+            'free_space_sigma': np.full(distance.shape, 2.5),
+            'median': median,
+            'sigma': sigma,
+            'sigma_2': np.zeros(distance.shape),
+        }
+
+    elif 3 <= frequency < 6:
+
+        median, sigma, sigma_2 = e_utra_3gpp_tr36_814_batch(
+            frequency, distance, ant_height, ant_type, building_height,
+            street_width, settlement_type, type_of_sight, ue_height
+        )
+
+        return {
+            'model': 'e_utra',
+            'median': median,
+            'sigma': sigma,
+            'sigma_2': sigma_2,
+        }
+
+    else:
+
+        raise ValueError (
+            "frequency of {} is NOT within correct range".format(frequency)
+        )
+
+def combine_path_loss_terms(terms, rng=None):
+    """
+    Add stochastic components to the deterministic medians produced by
+    `path_loss_terms`, following the same rules as the scalar models.
+
+    """
+    model_path_loss = (
+        terms['median'] +
+        _optional_log_normal_values(terms['sigma'], rng) +
+        _optional_log_normal_values(terms['sigma_2'], rng)
+    )
+    model_path_loss = np.round(model_path_loss, 2)
+
+    if terms['model'] == 'extended_hata':
+
+        free_space_path_loss = np.round(
+            terms['free_space_median'] +
+            generate_log_normal_dist_values(
+                1, terms['free_space_sigma'], rng
+            ), 2
+        )
+
+        return np.maximum(free_space_path_loss, model_path_loss)
+
+    return model_path_loss
+
+def free_space_median_batch(frequency, distance, ant_height, ue_height):
+    """
+    Deterministic part of the Free Space model for an array of
+    distances (m), see `free_space`.
+
+    """
+    frequency = frequency*1000
+    distance = np.asarray(distance, dtype=float) / 1000
+
+    with np.errstate(divide='ignore'):
+        path_loss = (
+            32.4 + 10*np.log10(((np.subtract(ant_height, ue_height)/1000)**2 +
+            distance**2)) + 20*np.log10(frequency)
+        )
+
+    return path_loss
+
+def extended_hata_batch(frequency, distance, ant_height, ue_height,
+    settlement_type, above_roof):
+    """
+    Vectorised Extended Hata model, see `extended_hata`.
+
+    Returns
+    -------
+    tuple
+        The median path loss and the standard deviation of the
+        stochastic component, as arrays of the same shape as distance.
+
+    """
+    frequency = frequency*1000
+    distance = np.asarray(distance, dtype=float) / 1000
+
+    if np.any(distance >= 100):
+        raise ValueError('Distance over 100km not compliant')
+
+    if not 30 < frequency <= 3000:
+        raise ValueError('Carrier frequency incorrect for Extended Hata')
+
+    hm = np.minimum(ant_height, ue_height)
+    hb = np.maximum(ant_height, ue_height)
+
+    alpha_hm = (1.1*np.log10(frequency) - 0.7) * np.minimum(10, hm) - \
+        (1.56*np.log10(frequency) - 0.8) + \
+        np.maximum(0, (20*np.log10(hm/10)))
+
+    beta_hb = np.minimum(0, (20*np.log10(hb/30)))
+
+    alpha_exponent = np.where(
+        distance <= 20, 1,
+        1 + (0.14 + 1.87e-4 * frequency + 1.07e-3 * hb) *
+        (np.log10(np.maximum(distance, 20)/20))**0.8
+    )
+
+    if 30 < frequency <= 150:
+        intercept = 69.6 + 26.2*np.log10(150) - 20*np.log10(150/frequency)
+    elif 150 < frequency <= 1500:
+        intercept = 69.6 + 26.2*np.log10(frequency)
+    elif 1500 < frequency <= 2000:
+        intercept = 46.3 + 33.9*np.log10(frequency)
+    else:
+        intercept = (
+            46.3 + 33.9*np.log10(2000) + 10*np.log10(frequency/2000)
+        )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        log_distance = np.log10(distance)
+
+        far = (
+            intercept - 13.82*np.log10(np.maximum(30, hb)) +
+            (44.9 - 6.55*np.log10(np.maximum(30, hb))) *
+            log_distance**alpha_exponent - alpha_hm - beta_hb
+        )
+
+        if settlement_type == 'suburban':
+            far = far - 2 * \
+                (np.log10((min(max(150, frequency), 2000)/28)))**2 - 5.4
+        elif settlement_type == 'rural':
+            far = far - 4.78 * \
+                (np.log10(min(max(150, frequency), 2000)))**2 + 18.33 * \
+                np.log10(min(max(150, frequency), 2000)) - 40.94
+
+        near = (
+            32.4 + (20*np.log10(frequency)) +
+            (10*np.log10((distance**2) + ((hb - hm)**2) / (10**6)))
+        )
+
+        l_fixed_distance_upper = (
+            32.4 + (20*np.log10(frequency)) + (10*np.log10(0.1**2 +
+            (hb - hm)**2 / 10**6))
+        )
+        l_fixed_distance_lower = (
+            32.4 + (20*np.log10(frequency)) + (10*np.log10(0.04**2 +
+            (hb - hm)**2 / 10**6))
+        )
+        middle = (l_fixed_distance_lower +
+            (log_distance - np.log10(0.04)) /
+            (np.log10(0.1) - np.log10(0.04)) *
+            (l_fixed_distance_upper - l_fixed_distance_lower)
+        )
+
+    median = np.select(
+        [distance < 0.04, distance >= 0.1], [near, far], middle
+    )
+
+    if above_roof == 1:
+        sigma_middle = 3.5 + ((12-3.5)/0.1-0.04) * (distance - 0.04)
+        sigma_short = 12
+        sigma_medium = 12 + ((9-12)/0.6-0.2) * (distance - 0.02)
+    elif above_roof == 0:
+        sigma_middle = 3.5 + ((17-3.5)/0.1-0.04) * (distance - 0.04)
+        sigma_short = 17
+        sigma_medium = 17 + ((9-17)/0.6-0.2) * (distance - 0.02)
+    else:
+        if np.any((distance > 0.04) & (distance <= 0.6)):
+            raise ValueError(
+                'Could not determine if cell is above or below roof line')
+        sigma_middle = sigma_short = sigma_medium = 0
+
+    sigma = np.select(
+        [
+            distance <= 0.04,
+            distance <= 0.1,
+            distance <= 0.2,
+            distance <= 0.6,
+        ],
+        [3.5, sigma_middle, sigma_short, sigma_medium],
+        12
+    )
+
+    return median, np.asarray(sigma, dtype=float)
+
+def e_utra_3gpp_tr36_814_batch(frequency, distance, ant_height, ant_type,
+    building_height, street_width, settlement_type, type_of_sight, ue_height):
+    """
+    Vectorised 3GPP E-UTRA model, see `e_utra_3gpp_tr36_814`.
+
+    Links outside the model's applicability ranges receive the same
+    250 dB fallback value as the scalar model, without stochastic terms.
+
+    Returns
+    -------
+    tuple
+        The median path loss and the standard deviations of the first
+        and second stochastic components.
+
+    """
+    distance = np.asarray(distance, dtype=float)
+    los = _line_of_sight_flags(type_of_sight, distance.shape)
+    ant_height = np.asarray(ant_height, dtype=float)
+    ue_height = np.asarray(ue_height, dtype=float)
+
+    breakpoint_urban = (
+        4 * ant_height * ue_height * (int(frequency*1000000000)) / 300000000
+    )
+    breakpoint_suburban_rural = (
+        2 * pi * ant_height * ue_height * (int(frequency*1000000000)) / 300000000
+    )
+
+    applicable = applicability_mask(
+        building_height, street_width, ant_height, ue_height
+    )
+
+    median = np.full(distance.shape, 250.0)
+    sigma = np.zeros(distance.shape)
+    sigma_2 = np.zeros(distance.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        log_distance = np.log10(distance)
+
+        short_los = 22 * log_distance + 28 + 20*np.log10(frequency)
+        long_los = (
+            40 * log_distance + 7.8 - 18*np.log10(ant_height) -
+            18*np.log10(ue_height) + 2*np.log10(frequency)
+        )
+        macro_nlos = (
+            161.04 - 7.1*np.log10(street_width) +
+            7.5*np.log10(building_height) -
+            (24.37-3.7*(building_height/ant_height)**2) *
+            np.log10(ant_height) + (43.42-3.1*np.log10(ant_height)) *
+            (log_distance-3) + 20*np.log10(frequency) -
+            (3.2*(np.log10(11.75*ue_height))**2-4.97)
+        )
+
+        def suburban_los_pl1(input_distance):
+            return (
+                20*np.log10(40*pi*input_distance*frequency/3) +
+                min(0.03*building_height**1.72,10) *
+                np.log10(input_distance) -
+                min(0.044*building_height**1.72, 14.77) +
+                0.002*np.log10(building_height)*input_distance
+            )
+
+        if ant_type == 'micro' and settlement_type == 'urban':
+
+            short = los & (distance < breakpoint_urban)
+            long = los & (breakpoint_urban < distance) & (distance < 5000)
+            nlos = ~los
+
+            median = np.select(
+                [short, long, nlos],
+                [short_los, long_los,
+                36.7*log_distance + 22.7 + 26*np.log10(frequency)],
+                median
+            )
+            sigma = np.select([short | long, nlos], [3, 4], sigma)
+
+        elif ant_type == 'macro' and settlement_type == 'urban':
+
+            short = los & (10 < distance) & (distance < breakpoint_urban)
+            long = los & (breakpoint_urban < distance) & (distance < 5000)
+            nlos = ~los & (10 < distance) & (distance < 5000) & applicable
+
+            median = np.select(
+                [short, long, nlos], [short_los, long_los, macro_nlos], median
+            )
+            sigma = np.select([short | long, nlos], [4, 6], sigma)
+
+        elif ant_type == 'macro':
+
+            short = (los & (10 < distance) &
+                (distance < breakpoint_suburban_rural) & applicable)
+            long = (los & (breakpoint_suburban_rural < distance) &
+                (distance < 10000) & applicable)
+            nlos = ~los & (10 < distance) & (distance < 5000) & applicable
+
+            median = np.select(
+                [short, long, nlos],
+                [suburban_los_pl1(distance),
+                suburban_los_pl1(breakpoint_suburban_rural) +
+                40*np.log10(distance / breakpoint_suburban_rural),
+                macro_nlos],
+                median
+            )
+            sigma = np.select([short | long, nlos], [4, 8], sigma)
+            sigma_2 = np.where(long, 6, sigma_2)
+
+        else:
+            raise ValueError('Did not recognise parameter combination')
+
+    return (
+        median, np.asarray(sigma, dtype=float), np.asarray(sigma_2, dtype=float)
+    )
+
+def applicability_mask(building_height, street_width, ant_height, ue_height):
+    """
+    Vectorised, silent version of `check_applicability`.
+
+    """
+    ant_height = np.asarray(ant_height, dtype=float)
+    ue_height = np.asarray(ue_height, dtype=float)
+
+    return (
+        (5 <= building_height < 50) &
+        (5 <= street_width < 50) &
+        (10 <= ant_height) & (ant_height < 150) &
+        (1 <= ue_height) & (ue_height < 10)
+    )
+
+def generate_log_normal_dist_values(mu, sigma, rng=None):
+    """
+    Vectorised equivalent of `generate_log_normal_dist_value`, for an
+    array of standard deviations.
+
+    If rng is None, every element equals the value the scalar function
+    returns for the same mu and sigma. Otherwise one independent
+    standard normal block is drawn from rng for the whole array.
+
+    """
+    sigma = np.asarray(sigma, dtype=float)
+
+    normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
+    normal_mean = np.log10(mu) - normal_std**2 / 2
+
+    if rng is None:
+        standard_normal = LEGACY_STANDARD_NORMAL
+    else:
+        standard_normal = rng.standard_normal(sigma.shape)
+
+    hs = np.exp(normal_mean + normal_std * standard_normal)
+
+    return np.round(hs, 2)
+
+def outdoor_to_indoor_path_loss_batch(indoor, rng=None):
+    """
+    Vectorised equivalent of `outdoor_to_indoor_path_loss`.
+
+    """
+    indoor = np.asarray(indoor, dtype=bool)
+    values = np.zeros(indoor.shape)
+    values[indoor] = generate_log_normal_dist_values(
+        12, np.full(np.count_nonzero(indoor), 8), rng
+    )
+
+    return values
+
+def _optional_log_normal_values(sigma, rng=None):
+    """
+    Draw log-normal values where sigma is positive, and zero elsewhere.
+
+    """
+    sigma = np.asarray(sigma, dtype=float)
+    values = np.zeros(sigma.shape)
+    mask = sigma > 0
+    values[mask] = generate_log_normal_dist_values(1, sigma[mask], rng)
+
+    return values
+
+def _line_of_sight_flags(type_of_sight, shape):
+
+    type_of_sight = np.asarray(type_of_sight)
+
+    if type_of_sight.dtype.kind in ('U', 'S', 'O'):
+        los = type_of_sight == 'los'
+    else:
+        los = type_of_sight.astype(bool)
+
+    return np.broadcast_to(los, shape)
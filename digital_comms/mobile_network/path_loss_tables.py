@@ -0,0 +1,290 @@
+"""
+Precomputed path loss tables.
+
+For a fixed frequency, environment, line of sight state and pair of
+antenna heights, the deterministic part of the path loss (the model
+medians and the standard deviations of the fading terms, see
+`path_loss_terms`) only depends on distance. Each combination is
+evaluated once on a 1 m distance grid and kept in memory, and
+optionally in a directory of `.npz` files shared between runs. Links are
+then looked up in the grid rather than re-evaluating the model, and
+the fading draws are added by `combine_path_loss_terms` as before.
+
+Link distances are rounded to whole metres by the system simulator, so
+lookups index the grid directly and give exactly the same values as the
+model. Fractional distances are linearly interpolated between grid
+points.
+
+"""
+import os
+import zlib
+import tempfile
+
+import numpy as np
+
+from digital_comms.mobile_network.path_loss_module import (
+    path_loss_terms, _line_of_sight_flags
+    )
+
+#bump when a path loss model changes, so cached tables are rebuilt
+TABLE_VERSION = 1
+
+#tables are extended in blocks of this many metres
+TABLE_BLOCK = 1000
+
+#Extended Hata is only defined below 100 km
+EXTENDED_HATA_MAX_DISTANCE = 99999
+
+TERM_FIELDS = ('median', 'sigma', 'sigma_2', 'free_space_median',
+    'free_space_sigma')
+
+def path_loss_model(frequency):
+    """
+    Return the name of the model used for a frequency (GHz), as
+    `path_loss_terms` does.
+
+    """
+    if 0.03 < frequency <= 3:
+        return 'extended_hata'
+    elif 3 <= frequency < 6:
+        return 'e_utra'
+    else:
+        raise ValueError (
+            "frequency of {} is NOT within correct range".format(frequency)
+        )
+
+
+class PathLossTables(object):
+    """
+    Distance-indexed tables of the deterministic path loss terms.
+
+    Parameters
+    ----------
+    cache_dir : string, optional
+        Directory in which tables are saved and reused between runs.
+        If None, tables are only kept in memory.
+
+    """
+    def __init__(self, cache_dir=None):
+
+        self.cache_dir = cache_dir
+        self._tables = {}
+
+    def __len__(self):
+        return len(self._tables)
+
+    def table_key(self, frequency, ant_height, ant_type, building_height,
+        street_width, settlement_type, los, ue_height, above_roof):
+        """
+        Return the key of the table for one parameter combination.
+        Parameters the model ignores are left out, so combinations
+        which only differ in those share a table.
+
+        """
+        model = path_loss_model(frequency)
+
+        if model == 'extended_hata':
+            return (model, float(frequency), float(ant_height),
+                settlement_type, float(ue_height), above_roof)
+
+        return (model, float(frequency), float(ant_height), ant_type,
+            float(building_height), float(street_width), settlement_type,
+            bool(los), float(ue_height))
+
+    def table(self, frequency, ant_height, ant_type, building_height,
+        street_width, settlement_type, los, ue_height, above_roof,
+        max_distance):
+        """
+        Return the table for one parameter combination, covering at
+        least 0 to max_distance metres.
+
+        Returns
+        -------
+        dict
+            The model name and an array per field of `TERM_FIELDS`,
+            indexed by distance in metres.
+
+        """
+        key = self.table_key(
+            frequency, ant_height, ant_type, building_height, street_width,
+            settlement_type, los, ue_height, above_roof
+            )
+
+        table = self._tables.get(key)
+
+        if table is None:
+            table = self._load(key)
+
+        if table is None or len(table['median']) <= max_distance:
+
+            length = int(np.ceil((max_distance + 1) / TABLE_BLOCK)) * TABLE_BLOCK
+            if key[0] == 'extended_hata':
+                length = min(length, EXTENDED_HATA_MAX_DISTANCE + 1)
+
+            distance = np.arange(length, dtype=float)
+
+            terms = path_loss_terms(
+                frequency, distance, ant_height, ant_type, building_height,
+                street_width, settlement_type,
+                np.full(distance.shape, bool(los)), ue_height, above_roof
+                )
+
+            table = {'model': terms['model']}
+            for field in TERM_FIELDS:
+                table[field] = np.asarray(
+                    terms.get(field, np.zeros(distance.shape)), dtype=float
+                    )
+
+            self._save(key, table)
+
+        self._tables[key] = table
+
+        return table
+
+    def terms(self, frequency, distance, ant_height, ant_type,
+        building_height, street_width, settlement_type, type_of_sight,
+        ue_height, above_roof):
+        """
+        Table-based equivalent of `path_loss_terms`, taking the same
+        arguments.
+
+        """
+        distance = np.asarray(distance, dtype=float)
+        model = path_loss_model(frequency)
+
+        #out of range distances raise the model's own errors
+        if (not distance.size or np.any(distance < 0) or
+            (model == 'extended_hata' and
+            np.any(distance > EXTENDED_HATA_MAX_DISTANCE))):
+            return path_loss_terms(
+                frequency, distance, ant_height, ant_type, building_height,
+                street_width, settlement_type, type_of_sight, ue_height,
+                above_roof
+                )
+
+        try:
+            return self._lookup_terms(
+                model, frequency, distance, ant_height, ant_type,
+                building_height, street_width, settlement_type,
+                type_of_sight, ue_height, above_roof
+                )
+        #e.g. a grid distance the model rejects but no link uses
+        except ValueError:
+            return path_loss_terms(
+                frequency, distance, ant_height, ant_type, building_height,
+                street_width, settlement_type, type_of_sight, ue_height,
+                above_roof
+                )
+
+    def _lookup_terms(self, model, frequency, distance, ant_height, ant_type,
+        building_height, street_width, settlement_type, type_of_sight,
+        ue_height, above_roof):
+
+        ant_height = np.broadcast_to(
+            np.asarray(ant_height, dtype=float), distance.shape).ravel()
+        ue_height = np.broadcast_to(
+            np.asarray(ue_height, dtype=float), distance.shape).ravel()
+
+        if model == 'e_utra':
+            los = _line_of_sight_flags(type_of_sight, distance.shape).ravel()
+        else:
+            los = np.zeros(distance.size, dtype=bool)
+
+        flat_distance = distance.ravel()
+
+        combinations, inverse = np.unique(
+            np.column_stack([ant_height, ue_height, los]),
+            axis=0, return_inverse=True
+            )
+        inverse = inverse.ravel()
+
+        values = {field: np.empty(distance.size) for field in TERM_FIELDS}
+
+        for position, (ant, ue, line_of_sight) in enumerate(combinations):
+
+            links = np.flatnonzero(inverse == position)
+            link_distance = flat_distance[links]
+
+            table = self.table(
+                frequency, ant, ant_type, building_height, street_width,
+                settlement_type, line_of_sight, ue, above_roof,
+                link_distance.max()
+                )
+
+            whole = link_distance == np.floor(link_distance)
+            grid = np.arange(len(table['median']), dtype=float)
+
+            for field in TERM_FIELDS:
+                values[field][links[whole]] = (
+                    table[field][link_distance[whole].astype(int)]
+                    )
+                values[field][links[~whole]] = np.interp(
+                    link_distance[~whole], grid, table[field]
+                    )
+
+        terms = {'model': model}
+        for field in TERM_FIELDS:
+            terms[field] = values[field].reshape(distance.shape)
+
+        if model == 'e_utra':
+            del terms['free_space_median'], terms['free_space_sigma']
+
+        return terms
+
+    def _path(self, key):
+
+        name = 'path_loss_v{}_{:08x}.npz'.format(
+            TABLE_VERSION, zlib.crc32(repr(key).encode('utf-8'))
+            )
+
+        return os.path.join(self.cache_dir, name)
+
+    def _load(self, key):
+
+        if not self.cache_dir:
+            return None
+
+        path = self._path(key)
+
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            #guard against crc collisions between keys
+            if str(data['key']) != repr(key):
+                return None
+            table = {'model': str(data['model'])}
+            for field in TERM_FIELDS:
+                table[field] = data[field]
+
+        return table
+
+    def _save(self, key, table):
+
+        if not self.cache_dir:
+            return
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        #written to a temporary name first, as workers share the cache
+        handle, temporary_path = tempfile.mkstemp(
+            suffix='.npz', dir=self.cache_dir
+            )
+        with os.fdopen(handle, 'wb') as sink:
+            np.savez(sink, key=repr(key), **table)
+        os.replace(temporary_path, self._path(key))
+
+
+_OPEN_TABLES = {}
+
+def open_path_loss_tables(cache_dir=None):
+    """
+    Return the `PathLossTables` for a cache directory. Tables are kept
+    for the life of the process, so each worker loads them once.
+
+    """
+    if cache_dir not in _OPEN_TABLES:
+        _OPEN_TABLES[cache_dir] = PathLossTables(cache_dir)
+
+    return _OPEN_TABLES[cache_dir]
@@ -0,0 +1,196 @@
+"""
+Opt-in timing and counters for the system simulator.
+
+A `Profiler` times named stages with a context manager and keeps
+counters, such as the number of links evaluated. The result is a small
+JSON report per postcode sector, and `summarise_reports` aggregates
+many reports, to show which stages and sectors use the time.
+
+When profiling is off, `NULL_PROFILER` is used. Its stages and
+counters do nothing, so the hooks can stay in place.
+
+"""
+import os
+import json
+import time
+from contextlib import contextmanager
+from collections import OrderedDict
+
+class Profiler(object):
+    """
+    Accumulate stage timings and counters for one run.
+
+    Stages with the same name are summed, and nested stages are timed
+    independently, so e.g. 'link_budget' includes 'link_budget.path_loss'.
+
+    Parameters
+    ----------
+    name : string, optional
+        Label for the run, e.g. the postcode sector id.
+
+    """
+    enabled = True
+
+    def __init__(self, name=None):
+
+        self.name = name
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time the enclosed block as the named stage.
+
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            seconds, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (seconds + elapsed, calls + 1)
+
+    def count(self, name, value=1):
+        """
+        Add to the named counter.
+
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def report(self):
+        """
+        Return the timings and counters as a JSON-serialisable dict.
+
+        """
+        return {
+            'name': self.name,
+            'total_seconds': round(time.perf_counter() - self._start, 6),
+            'stages': OrderedDict(
+                (name, {'seconds': round(seconds, 6), 'calls': calls})
+                for name, (seconds, calls) in self.stages.items()
+                ),
+            'counters': OrderedDict(self.counters),
+        }
+
+    def write_report(self, path):
+        """
+        Write the report to a JSON file, returning the report.
+
+        """
+        report = self.report()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(path, 'w') as sink:
+            json.dump(report, sink, indent=2)
+
+        return report
+
+
+class NullProfiler(object):
+    """
+    Profiler with the same interface that records nothing.
+
+    """
+    enabled = False
+    name = None
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+def read_report(path):
+    """
+    Read a report written by `Profiler.write_report`.
+
+    """
+    with open(path, 'r') as source:
+        return json.load(source)
+
+def summarise_reports(reports, slowest=10):
+    """
+    Aggregate the reports of many runs.
+
+    Parameters
+    ----------
+    reports : list of dicts or strings
+        Reports, or paths of report files. Missing files are skipped.
+    slowest : int
+        Number of slowest runs to list.
+
+    Returns
+    -------
+    dict
+        * runs : number of reports
+        * total_seconds : summed run time
+        * stages : per stage, the summed seconds and calls, the mean
+          and maximum seconds per run, the run with the maximum and the
+          share of the summed run time
+        * counters : summed counters
+        * slowest : the slowest runs as (name, seconds) pairs
+
+    """
+    loaded = []
+    for report in reports:
+        if isinstance(report, str):
+            if not os.path.exists(report):
+                continue
+            report = read_report(report)
+        loaded.append(report)
+
+    total_seconds = sum(report['total_seconds'] for report in loaded)
+
+    stages = OrderedDict()
+    counters = OrderedDict()
+
+    for report in loaded:
+
+        for name, stage in report['stages'].items():
+
+            summary = stages.setdefault(name, {
+                'seconds': 0.0, 'calls': 0, 'runs': 0,
+                'max_seconds': 0.0, 'max_run': None,
+                })
+
+            summary['seconds'] += stage['seconds']
+            summary['calls'] += stage['calls']
+            summary['runs'] += 1
+
+            if summary['max_run'] is None or (
+                stage['seconds'] > summary['max_seconds']):
+                summary['max_seconds'] = stage['seconds']
+                summary['max_run'] = report['name']
+
+        for name, value in report['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+
+    for summary in stages.values():
+        summary['mean_seconds'] = summary['seconds'] / summary['runs']
+        summary['share'] = (
+            summary['seconds'] / total_seconds if total_seconds else 0
+            )
+
+    ranked = sorted(
+        loaded, key=lambda report: report['total_seconds'], reverse=True
+        )
+
+    return {
+        'runs': len(loaded),
+        'total_seconds': total_seconds,
+        'stages': stages,
+        'counters': counters,
+        'slowest': [
+            (report['name'], report['total_seconds'])
+            for report in ranked[:slowest]
+            ],
+    }
@@ -0,0 +1,96 @@
+"""
+Reproducible, splittable random number streams for the system simulator.
+
+Each stream wraps a `numpy.random.SeedSequence`. Child streams are
+derived from names (postcode sector, spectrum band, iteration, ...)
+rather than from the order in which they are requested, so the same
+name always gives the same draws, whichever process or order it is
+evaluated in.
+
+"""
+from zlib import crc32
+
+import numpy as np
+
+DEFAULT_SEED = 42
+
+def _spawn_word(name):
+    """
+    Map a stream name to a stable 32-bit integer.
+
+    Python's built-in `hash` is salted per process, so a CRC of the
+    string representation is used instead.
+
+    """
+    if isinstance(name, (int, np.integer)) and not isinstance(name, bool):
+        if 0 <= name < 2**32:
+            return int(name)
+
+    return crc32(repr(name).encode('utf-8'))
+
+
+class RandomStreams(object):
+    """
+    A named, hierarchical source of `numpy.random.Generator` objects.
+
+    Parameters
+    ----------
+    seed : int
+        Root entropy for the simulation.
+    spawn_key : tuple of int
+        Position of this stream in the hierarchy. Use `spawn` rather
+        than setting it directly.
+
+    Examples
+    --------
+    >>> streams = RandomStreams(42)
+    >>> rng = streams.spawn('CB11', 'link_budget', 3.5).generator()
+    >>> shadow_fading = rng.standard_normal(500)
+
+    """
+    def __init__(self, seed=DEFAULT_SEED, spawn_key=()):
+
+        self.seed = seed
+        self.spawn_key = tuple(spawn_key)
+        self.seed_sequence = np.random.SeedSequence(
+            seed, spawn_key=self.spawn_key
+            )
+        self._generator = None
+
+    def __repr__(self):
+        return "<RandomStreams seed:{} key:{}>".format(
+            self.seed, self.spawn_key
+            )
+
+    def spawn(self, *names):
+        """
+        Return the child stream identified by one or more names.
+
+        Parameters
+        ----------
+        *names : hashable
+            Labels such as a postcode sector id, a frequency or an
+            iteration number. Non-negative integers below 2**32 are
+            used directly, anything else is mapped with a CRC32 of its
+            repr.
+
+        """
+        return RandomStreams(
+            self.seed,
+            self.spawn_key + tuple(_spawn_word(name) for name in names)
+            )
+
+    def generator(self):
+        """
+        Return the `numpy.random.Generator` for this stream.
+
+        The generator is created once and then reused, so repeated calls
+        continue the same sequence of draws.
+
+        """
+        if self._generator is None:
+            self._generator = np.random.Generator(
+                np.random.PCG64(self.seed_sequence)
+                )
+
+        return self._generator
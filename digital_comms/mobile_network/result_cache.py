@@ -0,0 +1,149 @@
+"""
+Content-addressed cache of postcode sector results.
+
+Each run of the system simulator for a sector is described by a
+fingerprint: a SHA-256 hash of everything its results depend on, such
+as the sector geometry, the sites found around it and the simulation
+parameters. The lookup table of a completed run is stored under its
+fingerprint, so a later run with identical inputs copies the stored
+table rather than repeating the simulation. Any change to the inputs
+gives a new fingerprint, so stale results are never reused.
+
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+
+def _canonical(value):
+    """
+    Convert a value to a JSON-serialisable form with a stable encoding.
+
+    """
+    if isinstance(value, bytes):
+        return {'__bytes__': hashlib.sha256(value).hexdigest()}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float):
+        #repr round-trips, so equal floats always encode the same way
+        return {'__float__': repr(value)}
+    return value
+
+def input_fingerprint(inputs):
+    """
+    Return the fingerprint of a set of run inputs.
+
+    Parameters
+    ----------
+    inputs : dict
+        Values the results depend on. Nested dicts, lists, tuples,
+        numpy values, strings, numbers and bytes (e.g. geometry WKB)
+        are supported. Key order does not matter.
+
+    Returns
+    -------
+    string
+        Hexadecimal SHA-256 digest.
+
+    """
+    encoded = json.dumps(
+        _canonical(inputs), sort_keys=True, separators=(',', ':')
+        )
+
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """
+    Directory of result files keyed by input fingerprint.
+
+    Parameters
+    ----------
+    cache_dir : string
+        Directory holding the cached files. Files are spread over
+        subdirectories named after the first two fingerprint characters.
+
+    """
+    def __init__(self, cache_dir):
+
+        self.cache_dir = cache_dir
+
+    def path(self, fingerprint, extension):
+        """
+        Return where the result with a fingerprint is stored.
+
+        """
+        return os.path.join(
+            self.cache_dir, fingerprint[:2],
+            '{}{}'.format(fingerprint, extension)
+            )
+
+    def restore(self, fingerprint, output_path):
+        """
+        Copy a cached result to output_path.
+
+        Returns
+        -------
+        bool
+            True if the result was cached, False otherwise.
+
+        """
+        cached_path = self.path(
+            fingerprint, os.path.splitext(output_path)[1]
+            )
+
+        if not os.path.exists(cached_path):
+            return False
+
+        _atomic_copy(cached_path, output_path)
+
+        return True
+
+    def store(self, fingerprint, result_path):
+        """
+        Copy a completed result file into the cache.
+
+        Returns
+        -------
+        string
+            The path of the cached copy.
+
+        """
+        cached_path = self.path(
+            fingerprint, os.path.splitext(result_path)[1]
+            )
+
+        _atomic_copy(result_path, cached_path)
+
+        return cached_path
+
+def _atomic_copy(source, destination):
+    """
+    Copy a file via a temporary name, so readers never see a partial
+    copy, even with several workers sharing the cache.
+
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    handle, temporary_path = tempfile.mkstemp(
+        suffix=os.path.splitext(destination)[1], dir=directory
+        )
+    os.close(handle)
+
+    try:
+        shutil.copyfile(source, temporary_path)
+        os.replace(temporary_path, destination)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
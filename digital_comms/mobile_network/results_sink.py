@@ -0,0 +1,326 @@
+"""
+Buffered, columnar writers for system simulator outputs.
+
+Rows are held in memory and written in one go, e.g. once a postcode
+sector has finished, rather than reopening a csv file for every row.
+Tables are written as csv, Parquet, Feather or compressed npz, chosen
+by file extension. Parquet and Feather are written through pandas and
+need pyarrow to be installed.
+
+Csv values are read back as the strings written, so merging csv files
+into a csv file reproduces every value exactly.
+
+"""
+import os
+import csv
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+TABLE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.npz': 'npz',
+}
+
+def table_format(path):
+    """
+    Return the table format for a file path, from its extension.
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension not in TABLE_FORMATS:
+        raise ValueError('Unrecognised results format: {}'.format(path))
+
+    return TABLE_FORMATS[extension]
+
+def read_table(path):
+    """
+    Read a table written by `write_table`.
+
+    Returns
+    -------
+    OrderedDict
+        Column values keyed by field name, in file order.
+
+    """
+    file_format = table_format(path)
+
+    if file_format == 'csv':
+        with open(path, 'r', newline='') as source:
+            reader = csv.reader(source)
+            fields = next(reader, [])
+            columns = OrderedDict((field, []) for field in fields)
+            for line in reader:
+                for field, value in zip(fields, line):
+                    columns[field].append(value)
+        return columns
+
+    if file_format == 'npz':
+        with np.load(path, allow_pickle=False) as data:
+            return OrderedDict((field, data[field]) for field in data.files)
+
+    import pandas as pd
+
+    if file_format == 'parquet':
+        data = pd.read_parquet(path)
+    else:
+        data = pd.read_feather(path)
+
+    return OrderedDict(
+        (field, data[field].to_numpy()) for field in data.columns
+        )
+
+def write_table(path, columns, append=False):
+    """
+    Write columns of values to a table file in one operation.
+
+    Parameters
+    ----------
+    path : string
+        Output file. The extension sets the format.
+    columns : OrderedDict
+        Column values keyed by field name. All columns must have the
+        same length.
+    append : bool
+        Add the rows to an existing file rather than replacing it.
+        Csv files are appended to in place; other formats are read and
+        rewritten.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+
+    """
+    file_format = table_format(path)
+
+    rows = len(next(iter(columns.values()))) if columns else 0
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    exists = os.path.exists(path)
+
+    if file_format == 'csv' and append and exists:
+        with open(path, 'a', newline='') as sink:
+            csv.writer(sink).writerows(zip(*columns.values()))
+        return rows
+
+    if append and exists:
+        existing = read_table(path)
+        columns = OrderedDict(
+            (field, np.concatenate([
+                np.asarray(existing[field]), np.asarray(values)
+                ]))
+            for field, values in columns.items()
+            )
+
+    #written to a temporary name first, so readers never see a partial
+    #table
+    handle, temporary_path = tempfile.mkstemp(
+        suffix=os.path.splitext(path)[1], dir=directory
+        )
+
+    try:
+        if file_format == 'csv':
+            with os.fdopen(handle, 'w', newline='') as sink:
+                writer = csv.writer(sink)
+                writer.writerow(columns.keys())
+                writer.writerows(zip(*columns.values()))
+        elif file_format == 'npz':
+            with os.fdopen(handle, 'wb') as sink:
+                np.savez_compressed(sink, **OrderedDict(
+                    (field, np.asarray(values))
+                    for field, values in columns.items()
+                    ))
+        else:
+            os.close(handle)
+            import pandas as pd
+            data = pd.DataFrame(OrderedDict(
+                (field, np.asarray(values))
+                for field, values in columns.items()
+                ))
+            if file_format == 'parquet':
+                data.to_parquet(temporary_path, index=False)
+            else:
+                data.to_feather(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    return rows
+
+
+class ResultsSink(object):
+    """
+    Accumulate result rows in memory and write them in bulk.
+
+    Parameters
+    ----------
+    path : string
+        Output file. The extension sets the format.
+    fields : list of strings
+        Column names, in order.
+    append : bool
+        Add to an existing file on the first flush, rather than
+        replacing it.
+
+    Examples
+    --------
+    >>> with ResultsSink('lookup_table.csv', ('frequency', 'sinr')) as sink:
+    ...     sink.append((0.7, 5.2))
+
+    """
+    def __init__(self, path, fields, append=False):
+
+        table_format(path)
+
+        self.path = path
+        self.fields = tuple(fields)
+        self.append_to_file = append
+        self.rows_written = 0
+        self._rows = []
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        #rows from a failed run are discarded rather than written
+        if exc_type is None:
+            self.flush()
+
+    def append(self, row):
+        """
+        Buffer one row, given as a sequence in field order or a dict.
+
+        """
+        if isinstance(row, dict):
+            row = tuple(row[field] for field in self.fields)
+        elif len(row) != len(self.fields):
+            raise ValueError('Expected {} values, got {}'.format(
+                len(self.fields), len(row)
+                ))
+
+        self._rows.append(tuple(row))
+
+    def extend(self, rows):
+        """
+        Buffer many rows.
+
+        """
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        """
+        Write all buffered rows. Later flushes add to the same file.
+
+        Returns
+        -------
+        int
+            Number of rows written.
+
+        """
+        if not self._rows and (self.rows_written or self.append_to_file):
+            return 0
+
+        columns = OrderedDict(
+            (field, [row[position] for row in self._rows])
+            for position, field in enumerate(self.fields)
+            )
+
+        rows = write_table(
+            self.path, columns,
+            append=self.append_to_file or self.rows_written > 0
+            )
+
+        self.rows_written += rows
+        self._rows = []
+        self.append_to_file = True
+
+        return rows
+
+
+def merge_tables(tables, output_file, key_field='postcode_sector'):
+    """
+    Merge many tables into one, adding a column identifying the source
+    of each row. Input and output formats may differ.
+
+    Parameters
+    ----------
+    tables : dict
+        Table paths keyed by the value of key_field. Missing paths are
+        skipped.
+    output_file : string
+        Path of the merged table. The extension sets the format.
+    key_field : string
+        Name of the added column.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+
+    """
+    merged = None
+
+    for key in sorted(tables):
+
+        path = tables[key]
+
+        if not path or not os.path.exists(path):
+            continue
+
+        columns = read_table(path)
+
+        if merged is None:
+            merged = OrderedDict([(key_field, [])])
+            merged.update((field, []) for field in columns)
+
+        rows = len(next(iter(columns.values()))) if columns else 0
+
+        merged[key_field].append(np.full(rows, key, dtype=object))
+        for field in merged:
+            if field != key_field:
+                merged[field].append(np.asarray(columns[field], dtype=object))
+
+    if merged is None:
+        merged = OrderedDict([(key_field, np.array([], dtype=object))])
+    else:
+        merged = OrderedDict(
+            (field, np.concatenate(values))
+            for field, values in merged.items()
+            )
+
+    if table_format(output_file) != 'csv':
+        merged = OrderedDict(
+            (field, _typed_column(values)) for field, values in merged.items()
+            )
+
+    return write_table(output_file, merged)
+
+def _typed_column(values):
+    """
+    Convert an object column to a typed array, parsing numeric strings
+    read from csv files.
+
+    """
+    column = np.array(values.tolist())
+
+    if column.dtype.kind in ('U', 'S'):
+        try:
+            return column.astype(float)
+        except ValueError:
+            pass
+
+    return column
@@ -0,0 +1,214 @@
+"""
+Keyed, on-disk store of postcode sector boundaries.
+
+`read_postcode_sector` and `get_local_authority_ids` otherwise scan a
+postcode area shapefile and the national LAD shapefile for every
+sector. This module builds a SQLite database once, holding each sector
+boundary as WKB keyed by its id (without spaces), and a table of the
+local authority districts each sector intersects. Looking up a sector
+is then a primary key read.
+
+"""
+import os
+import json
+import sqlite3
+
+import fiona
+from rtree import index
+from shapely.geometry import shape, mapping
+from shapely import wkb
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sectors (
+    postcode_sector TEXT PRIMARY KEY,
+    properties TEXT NOT NULL,
+    geometry BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sector_lads (
+    postcode_sector TEXT NOT NULL,
+    lad TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (postcode_sector, position)
+);
+"""
+
+def sector_key(postcode_sector):
+    """
+    Normalise a postcode sector id, e.g. 'CB1 1' to 'CB11'.
+
+    """
+    return postcode_sector.replace(" ", "")
+
+def build_sector_index(db_path, postcode_sector_shapefiles, lad_shapefile):
+    """
+    Build the sector database from shapefiles.
+
+    Parameters
+    ----------
+    db_path : string
+        Path of the SQLite database to write. Any existing file is
+        replaced once the new one is complete.
+    postcode_sector_shapefiles : list of strings
+        Postcode sector shapefiles. If a sector appears more than once,
+        the first occurrence is kept.
+    lad_shapefile : string
+        Local authority district shapefile.
+
+    Returns
+    -------
+    int
+        Number of sectors written.
+
+    """
+    lads = []
+    lad_index = index.Index()
+
+    with fiona.open(lad_shapefile, 'r') as source:
+        for position, lad in enumerate(source):
+            geom = shape(lad['geometry'])
+            lads.append((lad['properties']['name'], geom))
+            lad_index.insert(position, geom.bounds)
+
+    directory = os.path.dirname(os.path.abspath(db_path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temporary_path = db_path + '.tmp'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    connection = sqlite3.connect(temporary_path)
+    connection.executescript(SCHEMA)
+
+    count = 0
+
+    for path in postcode_sector_shapefiles:
+        with fiona.open(path, 'r') as source:
+            for sector in source:
+
+                key = sector_key(sector['properties']['postcode'])
+
+                exists = connection.execute(
+                    'SELECT 1 FROM sectors WHERE postcode_sector = ?', (key,)
+                    ).fetchone()
+                if exists:
+                    continue
+
+                geom = shape(sector['geometry'])
+
+                connection.execute(
+                    'INSERT INTO sectors VALUES (?, ?, ?)',
+                    (key, json.dumps(dict(sector['properties'])),
+                    sqlite3.Binary(wkb.dumps(geom)))
+                    )
+
+                #LADs are kept in shapefile order, as the original scan did
+                candidates = sorted(lad_index.intersection(geom.bounds))
+                intersecting = [
+                    lads[position][0] for position in candidates
+                    if geom.intersects(lads[position][1])
+                    ]
+
+                connection.executemany(
+                    'INSERT INTO sector_lads VALUES (?, ?, ?)',
+                    [(key, lad, position)
+                    for position, lad in enumerate(intersecting)]
+                    )
+
+                count += 1
+
+    connection.commit()
+    connection.close()
+
+    os.replace(temporary_path, db_path)
+
+    return count
+
+
+class SectorIndex(object):
+    """
+    Read-only lookups against a database built by `build_sector_index`.
+
+    Parameters
+    ----------
+    db_path : string
+        Path of the SQLite database.
+
+    """
+    def __init__(self, db_path):
+
+        self.db_path = db_path
+        self._connection = sqlite3.connect(
+            'file:{}?mode=ro'.format(os.path.abspath(db_path)), uri=True
+            )
+
+    def __contains__(self, postcode_sector):
+
+        return self._connection.execute(
+            'SELECT 1 FROM sectors WHERE postcode_sector = ?',
+            (sector_key(postcode_sector),)
+            ).fetchone() is not None
+
+    def read_postcode_sector(self, postcode_sector):
+        """
+        Return a postcode sector as a GeoJson feature.
+
+        Raises
+        ------
+        KeyError
+            If the sector is not in the index.
+
+        """
+        row = self._connection.execute(
+            'SELECT properties, geometry FROM sectors WHERE postcode_sector = ?',
+            (sector_key(postcode_sector),)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(postcode_sector)
+
+        return {
+            'type': 'Feature',
+            'geometry': mapping(wkb.loads(bytes(row[1]))),
+            'properties': json.loads(row[0]),
+        }
+
+    def local_authority_ids(self, postcode_sector):
+        """
+        Return the names of the LADs intersecting a postcode sector.
+
+        Raises
+        ------
+        KeyError
+            If the sector is not in the index.
+
+        """
+        if postcode_sector not in self:
+            raise KeyError(postcode_sector)
+
+        return [
+            row[0] for row in self._connection.execute(
+                'SELECT lad FROM sector_lads WHERE postcode_sector = ? '
+                'ORDER BY position', (sector_key(postcode_sector),)
+                )
+            ]
+
+    def close(self):
+
+        self._connection.close()
+
+
+_OPEN_INDEXES = {}
+
+def open_sector_index(db_path):
+    """
+    Return a `SectorIndex` for db_path, or None if it has not been
+    built. Indexes are kept open for the life of the process.
+
+    """
+    if db_path not in _OPEN_INDEXES:
+        if not os.path.exists(db_path):
+            return None
+        _OPEN_INDEXES[db_path] = SectorIndex(db_path)
+
+    return _OPEN_INDEXES[db_path]
@@ -0,0 +1,465 @@
+"""
+Run the system simulator over many postcode sectors in parallel.
+
+Replaces the shell fan-out in `scripts/mobile_run_parallel_preprocessing.sh`
+with a process pool on each node. Each sector runs in a worker process
+with an optional timeout. Failed sectors are retried, and progress is
+recorded in a csv file so an interrupted run resumes where it stopped.
+The per-sector lookup tables are then merged into one file.
+
+With a tile size, neighbouring sectors in the same postcode area are run
+in blocks, each in one worker, so they share one site table rather than
+each loading an overlapping set of sites.
+
+Usage:
+
+    python scripts/mobile_cluster_input_files.py national | \\
+        python -m digital_comms.mobile_network.simulation_runner --workers 8
+
+"""
+import os
+import re
+import sys
+import csv
+import json
+import time
+import signal
+import argparse
+import traceback
+
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from digital_comms.mobile_network.results_sink import merge_tables
+from digital_comms.mobile_network.profiling import summarise_reports
+
+PROGRESS_FIELDS = (
+    'postcode_sector', 'status', 'attempts', 'seconds', 'output', 'error'
+    )
+
+class SectorTimeout(Exception):
+    """
+    Raised inside a worker when a postcode sector exceeds its time limit.
+
+    """
+    pass
+
+def _raise_timeout(signum, frame):
+
+    raise SectorTimeout()
+
+def run_task(task, postcode_sector, timeout=None):
+    """
+    Run a single postcode sector, or a tile of sectors, inside a worker
+    process.
+
+    The timeout is enforced with SIGALRM in the worker, so a sector that
+    overruns is interrupted without killing the pool. On platforms
+    without SIGALRM the timeout is ignored.
+
+    Returns
+    -------
+    tuple
+        (postcode_sector, output, error, seconds). Error is None if the
+        task succeeded.
+
+    """
+    use_alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    start = time.time()
+
+    try:
+        output = task(postcode_sector)
+        error = None
+    except SectorTimeout:
+        output = None
+        error = 'timed out after {}s'.format(timeout)
+    except Exception:
+        output = None
+        error = traceback.format_exc(limit=3).strip().splitlines()[-1]
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    return postcode_sector, output, error, round(time.time() - start, 2)
+
+def _natural_key(postcode_sector):
+
+    return [
+        int(part) if part.isdigit() else part
+        for part in re.split(r'(\d+)', postcode_sector.upper())
+        ]
+
+def postcode_area(postcode_sector):
+    """
+    Return the postcode area of a postcode sector, e.g. 'CB' for 'CB11'.
+
+    """
+    return re.match(r'[A-Za-z]*', postcode_sector).group(0).upper()
+
+def group_postcode_sectors(postcode_sectors, tile_size):
+    """
+    Group postcode sectors into tiles of neighbouring sectors.
+
+    Sectors are grouped by postcode area and split, in natural order
+    (CB2 before CB10), into tiles of at most tile_size sectors.
+
+    Returns
+    -------
+    list of tuples
+        Postcode sector ids of each tile.
+
+    """
+    areas = OrderedDict()
+
+    for postcode_sector in sorted(postcode_sectors, key=_natural_key):
+        areas.setdefault(postcode_area(postcode_sector), []).append(
+            postcode_sector
+            )
+
+    tiles = []
+    for sectors in areas.values():
+        for start in range(0, len(sectors), tile_size):
+            tiles.append(tuple(sectors[start:start + tile_size]))
+
+    return tiles
+
+def read_progress(progress_file):
+    """
+    Read the latest recorded status of each postcode sector.
+
+    Returns
+    -------
+    dict
+        Progress records keyed by postcode sector. Later records
+        replace earlier ones.
+
+    """
+    progress = {}
+
+    if not progress_file or not os.path.exists(progress_file):
+        return progress
+
+    with open(progress_file, 'r', newline='') as source:
+        reader = csv.DictReader(source)
+        for line in reader:
+            progress[line['postcode_sector']] = line
+
+    return progress
+
+def write_progress(progress_file, record):
+    """
+    Append one progress record, flushing it straight to disk.
+
+    """
+    if not progress_file:
+        return
+
+    directory = os.path.dirname(os.path.abspath(progress_file))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    new_file = not os.path.exists(progress_file)
+
+    with open(progress_file, 'a', newline='') as sink:
+        writer = csv.DictWriter(sink, PROGRESS_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerow(record)
+        sink.flush()
+        os.fsync(sink.fileno())
+
+def run_postcode_sectors(postcode_sectors, task=None, workers=None,
+    timeout=None, retries=1, progress_file=None, output_file=None,
+    tile_size=None):
+    """
+    Simulate a list of postcode sectors over a process pool.
+
+    Parameters
+    ----------
+    postcode_sectors : list of strings
+        Postcode sector ids to run.
+    task : callable, optional
+        Picklable function called with a postcode sector id, returning
+        the path of the lookup table written. Defaults to
+        `transmitter_module.run_postcode_sector`. With a tile size, it
+        is called with a tuple of sector ids and returns a dict of
+        lookup table paths keyed by sector, defaulting to
+        `transmitter_module.run_postcode_sector_tile`.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    timeout : float, optional
+        Time limit per sector attempt, in seconds. A tile is allowed
+        this per sector it holds.
+    retries : int
+        Number of further attempts for sectors which fail or time out.
+    progress_file : string, optional
+        Csv file recording the outcome of every attempt. Sectors already
+        marked as done are skipped, so an interrupted run can resume.
+    output_file : string, optional
+        If given, the lookup tables of all completed sectors are merged
+        into this file.
+    tile_size : int, optional
+        If given, sectors are run in tiles of up to this many
+        neighbouring sectors, see `group_postcode_sectors`. If a tile
+        fails, all of its sectors are marked as failed and retried.
+
+    Returns
+    -------
+    dict
+        * completed : dict of postcode sector to lookup table path
+        * failed : dict of postcode sector to the last error message
+        * skipped : list of sectors already completed in a previous run
+
+    """
+    if task is None:
+        from digital_comms.mobile_network.transmitter_module import (
+            run_postcode_sector, run_postcode_sector_tile
+            )
+        task = run_postcode_sector_tile if tile_size else run_postcode_sector
+
+    progress = read_progress(progress_file)
+
+    completed = {}
+    skipped = []
+    pending = []
+
+    for postcode_sector in dict.fromkeys(postcode_sectors):
+        record = progress.get(postcode_sector)
+        if record and record['status'] == 'done':
+            completed[postcode_sector] = record['output']
+            skipped.append(postcode_sector)
+        else:
+            pending.append(postcode_sector)
+
+    attempts = {
+        postcode_sector: int(progress[postcode_sector]['attempts'])
+        if postcode_sector in progress else 0
+        for postcode_sector in pending
+        }
+
+    total = len(skipped) + len(pending)
+    failed = {}
+
+    for _ in range(retries + 1):
+
+        if not pending:
+            break
+
+        failed = {}
+
+        #a fresh pool each round, in case a worker died in the last one
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+
+            if tile_size:
+                batches = group_postcode_sectors(pending, tile_size)
+            else:
+                batches = pending
+
+            futures = {
+                executor.submit(
+                    run_task, task, batch,
+                    timeout * len(batch) if timeout and tile_size else timeout
+                    ):
+                batch
+                for batch in batches
+                }
+
+            for future in as_completed(futures):
+
+                batch = futures[future]
+
+                try:
+                    _, output, error, seconds = future.result()
+                except Exception as ex:
+                    output, error, seconds = None, repr(ex), ''
+
+                if tile_size:
+                    outputs = output or {}
+                    if seconds != '':
+                        seconds = round(seconds / len(batch), 2)
+                else:
+                    outputs = {batch: output}
+                    batch = (batch,)
+
+                for postcode_sector in batch:
+
+                    attempts[postcode_sector] += 1
+
+                    output = outputs.get(postcode_sector)
+                    sector_error = error
+                    if sector_error is None and output is None:
+                        sector_error = 'no lookup table returned'
+
+                    if sector_error is None:
+                        completed[postcode_sector] = output
+                    else:
+                        failed[postcode_sector] = sector_error
+
+                    write_progress(progress_file, {
+                        'postcode_sector': postcode_sector,
+                        'status': 'failed' if sector_error else 'done',
+                        'attempts': attempts[postcode_sector],
+                        'seconds': seconds,
+                        'output': output if output is not None else '',
+                        'error': sector_error or '',
+                        })
+
+                    print('{} {} ({}/{} complete)'.format(
+                        postcode_sector,
+                        'failed: ' + sector_error if sector_error else 'done',
+                        len(completed), total
+                        ))
+
+        pending = [
+            postcode_sector for postcode_sector in pending
+            if postcode_sector in failed
+            ]
+
+    if output_file:
+        merge_lookup_tables(completed, output_file)
+
+    return {
+        'completed': completed,
+        'failed': failed,
+        'skipped': skipped,
+    }
+
+def merge_lookup_tables(lookup_tables, output_file):
+    """
+    Merge per-sector lookup tables into one national table, adding a
+    postcode_sector column.
+
+    Parameters
+    ----------
+    lookup_tables : dict
+        Lookup table paths keyed by postcode sector.
+    output_file : string
+        Path of the merged table. The extension sets the format (csv,
+        parquet, feather or npz, see `results_sink`).
+
+    Returns
+    -------
+    int
+        Number of rows written.
+
+    """
+    return merge_tables(lookup_tables, output_file, 'postcode_sector')
+
+def write_timing_summary(postcode_sectors, output_file, report_path=None):
+    """
+    Aggregate the timing reports of profiled postcode sectors into one
+    JSON file.
+
+    Parameters
+    ----------
+    postcode_sectors : list of strings
+        Postcode sectors to include. Sectors without a report are
+        skipped.
+    output_file : string
+        Path of the JSON summary.
+    report_path : callable, optional
+        Returns the report path for a postcode sector. Defaults to
+        `transmitter_module.timing_report_path`.
+
+    Returns
+    -------
+    dict
+        The summary, see `profiling.summarise_reports`.
+
+    """
+    if report_path is None:
+        from digital_comms.mobile_network.transmitter_module import (
+            timing_report_path
+            )
+        report_path = timing_report_path
+
+    summary = summarise_reports(
+        [report_path(postcode_sector) for postcode_sector in postcode_sectors]
+        )
+
+    directory = os.path.dirname(os.path.abspath(output_file))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(output_file, 'w') as sink:
+        json.dump(summary, sink, indent=2)
+
+    return summary
+
+def read_postcode_sector_list(source):
+    """
+    Read postcode sector ids, one per line, ignoring blank lines.
+
+    """
+    return [line.strip() for line in source if line.strip()]
+
+def main(args=None):
+
+    parser = argparse.ArgumentParser(
+        description='Run the system simulator over many postcode sectors.'
+        )
+    parser.add_argument(
+        'sectors', nargs='?',
+        help='file listing postcode sectors, one per line (default: stdin)'
+        )
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None,
+        help='seconds allowed per postcode sector attempt')
+    parser.add_argument('--retries', type=int, default=1)
+    parser.add_argument('--progress', default='system_simulator_progress.csv',
+        help='csv file used to track and resume progress')
+    parser.add_argument('--profile', default=None, metavar='SUMMARY',
+        help='time each stage of every sector and write a JSON summary '
+        'of the timings to this file')
+    parser.add_argument('--tile-size', type=int, default=None,
+        help='run blocks of up to this many sectors in the same postcode '
+        'area in one worker, sharing their sites')
+    parser.add_argument('--output', default=None,
+        help='file to merge all lookup tables into (csv, parquet, '
+        'feather or npz)')
+
+    args = parser.parse_args(args)
+
+    if args.sectors:
+        with open(args.sectors, 'r') as source:
+            postcode_sectors = read_postcode_sector_list(source)
+    else:
+        postcode_sectors = read_postcode_sector_list(sys.stdin)
+
+    task = None
+    if args.profile:
+        from digital_comms.mobile_network.transmitter_module import (
+            run_postcode_sector, run_postcode_sector_tile
+            )
+        task = partial(
+            run_postcode_sector_tile if args.tile_size else run_postcode_sector,
+            profile=True
+            )
+
+    summary = run_postcode_sectors(
+        postcode_sectors, task=task, workers=args.workers,
+        timeout=args.timeout, retries=args.retries,
+        progress_file=args.progress, output_file=args.output,
+        tile_size=args.tile_size
+        )
+
+    if args.profile:
+        write_timing_summary(summary['completed'], args.profile)
+
+    print('{} completed, {} skipped, {} failed'.format(
+        len(summary['completed']) - len(summary['skipped']),
+        len(summary['skipped']), len(summary['failed'])
+        ))
+
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Gap-filling placement of new sites.
+
+New sites go at the centroid of the largest Delaunay triangle between
+existing sites whose centroid lies within the area. Rather than
+retriangulating for every new site, the triangulation is updated in
+place with the Bowyer-Watson algorithm. Only the triangles whose
+circumcircle contains the new site are replaced. Candidate triangles
+sit in a max-heap on area, and entries for replaced triangles are
+skipped lazily when popped.
+
+"""
+import heapq
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+def _orientation(a, b, c):
+    """
+    Twice the signed area of triangle abc, positive if counter-clockwise.
+
+    """
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+def _in_circumcircle(a, b, c, p):
+    """
+    True if p lies strictly inside the circumcircle of the
+    counter-clockwise triangle abc.
+
+    """
+    adx, ady = a[0] - p[0], a[1] - p[1]
+    bdx, bdy = b[0] - p[0], b[1] - p[1]
+    cdx, cdy = c[0] - p[0], c[1] - p[1]
+
+    determinant = (
+        (adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) -
+        (bdx * bdx + bdy * bdy) * (adx * cdy - cdx * ady) +
+        (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady)
+        )
+
+    return determinant > 0
+
+
+class SitePlacement(object):
+    """
+    Incrementally place new sites in the largest gaps between sites.
+
+    Parameters
+    ----------
+    coordinates : list of (x, y)
+        Existing site coordinates.
+    contains : callable
+        Called as `contains(x, y)`, returning True if a point lies in
+        the area where sites may be placed.
+    fallback : callable
+        Called with no arguments to get an (x, y) location when no
+        triangle centroid lies within the area, e.g. a random point.
+
+    """
+    def __init__(self, coordinates, contains, fallback):
+
+        self.points = [
+            (float(x), float(y)) for x, y in np.asarray(
+                coordinates, dtype=float).reshape(-1, 2)
+            ]
+        self.contains = contains
+        self.fallback = fallback
+
+        self._triangulate()
+
+    def _triangulate(self):
+        """
+        Build the triangulation of all points from scratch.
+
+        """
+        self._triangles = {}
+        self._edges = {}
+        self._heap = []
+        self._next_id = 0
+
+        if len(self.points) < 3:
+            return
+
+        try:
+            tri = Delaunay(np.array(self.points))
+        #QhullError, e.g. for collinear or duplicate sites
+        except (RuntimeError, ValueError):
+            return
+
+        for a, b, c in tri.simplices:
+            self._add_triangle(int(a), int(b), int(c))
+
+    def _add_triangle(self, a, b, c):
+
+        orientation = _orientation(self.points[a], self.points[b], self.points[c])
+
+        if orientation == 0:
+            return
+        elif orientation < 0:
+            b, c = c, b
+
+        triangle_id = self._next_id
+        self._next_id += 1
+
+        self._triangles[triangle_id] = (a, b, c)
+        for edge in ((a, b), (b, c), (c, a)):
+            self._edges[edge] = triangle_id
+
+        #ties are broken by creation order
+        heapq.heappush(self._heap, (-abs(orientation) / 2, triangle_id))
+
+    def _remove_triangle(self, triangle_id):
+
+        a, b, c = self._triangles.pop(triangle_id)
+        for edge in ((a, b), (b, c), (c, a)):
+            if self._edges.get(edge) == triangle_id:
+                del self._edges[edge]
+
+    def _insert(self, triangle_id, point):
+        """
+        Insert a point lying inside the given triangle (Bowyer-Watson).
+
+        """
+        new_index = len(self.points)
+        self.points.append(point)
+
+        #triangles whose circumcircle contains the point form a cavity
+        cavity = set([triangle_id])
+        stack = [triangle_id]
+
+        while stack:
+            a, b, c = self._triangles[stack.pop()]
+            for i, j in ((a, b), (b, c), (c, a)):
+                neighbour = self._edges.get((j, i))
+                if neighbour is None or neighbour in cavity:
+                    continue
+                if _in_circumcircle(
+                    *[self.points[v] for v in self._triangles[neighbour]],
+                    point):
+                    cavity.add(neighbour)
+                    stack.append(neighbour)
+
+        boundary = []
+        for cavity_triangle in cavity:
+            a, b, c = self._triangles[cavity_triangle]
+            for i, j in ((a, b), (b, c), (c, a)):
+                if self._edges.get((j, i)) not in cavity:
+                    boundary.append((i, j))
+
+        for cavity_triangle in cavity:
+            self._remove_triangle(cavity_triangle)
+
+        #the cavity is star-shaped around the point, so each boundary
+        #edge forms a counter-clockwise triangle with it
+        for i, j in boundary:
+            self._add_triangle(i, j, new_index)
+
+    def place(self):
+        """
+        Choose the location of the next site and add it to the
+        triangulation.
+
+        Returns
+        -------
+        tuple
+            The (x, y) coordinates of the new site.
+
+        """
+        while self._heap:
+
+            _, triangle_id = heapq.heappop(self._heap)
+
+            if triangle_id not in self._triangles:
+                continue
+
+            vertices = [self.points[v] for v in self._triangles[triangle_id]]
+            centroid = (
+                sum(v[0] for v in vertices) / 3,
+                sum(v[1] for v in vertices) / 3,
+                )
+
+            if self.contains(*centroid):
+                self._insert(triangle_id, centroid)
+                return centroid
+
+        #no gap left within the area, so the point may fall outside
+        #the current hull and the triangulation is rebuilt
+        x, y = self.fallback()
+        point = (float(x), float(y))
+        self.points.append(point)
+        self._triangulate()
+
+        return point
@@ -0,0 +1,241 @@
+"""
+Compiled, memory-mappable store of the processed Sitefinder sites.
+
+`sitefinder_processed.csv` is parsed once into a NumPy structured array,
+sorted by x coordinate and saved as a `.npy` file. Worker processes map
+the file read-only, so the operating system shares one copy of the
+pages between them. A bounding box query is a binary search over the
+sorted x column followed by a y filter, so no text is parsed per
+postcode sector.
+
+Neighbouring postcode sectors search heavily overlapping boxes. A
+`SiteTile` holds the sites for a block of sectors in memory, queried
+in the same way, with their WGS84 coordinates projected once for the
+whole block.
+
+"""
+import os
+import csv
+import tempfile
+
+import numpy as np
+
+#csv columns kept as text, in the order they are stored
+SITE_STORE_TEXT_FIELDS = ('Antennaht', 'Transtype', 'Freqband', 'Anttype')
+
+def compile_site_store(csv_path, store_path):
+    """
+    Parse a processed Sitefinder csv file into a site store.
+
+    The file is written to a temporary name and then moved into place,
+    so parallel workers never map a partly written store.
+
+    Parameters
+    ----------
+    csv_path : string
+        Path of `sitefinder_processed.csv`.
+    store_path : string
+        Path of the `.npy` file to write.
+
+    Returns
+    -------
+    numpy.ndarray
+        The compiled records.
+
+    """
+    columns = {field: [] for field in ('longitude', 'latitude') +
+        SITE_STORE_TEXT_FIELDS}
+
+    with open(csv_path, 'r') as system_file:
+        reader = csv.DictReader(system_file)
+        for line in reader:
+            for field, values in columns.items():
+                values.append(line[field])
+
+    dtype = [
+        ('x', np.float64),
+        ('y', np.float64),
+        ('row', np.int64),
+        ] + [
+        (field, 'U{}'.format(max([len(v) for v in columns[field]] + [1])))
+        for field in SITE_STORE_TEXT_FIELDS
+        ]
+
+    records = np.zeros(len(columns['longitude']), dtype=dtype)
+    records['x'] = np.array(columns['longitude'], dtype=np.float64)
+    records['y'] = np.array(columns['latitude'], dtype=np.float64)
+    records['row'] = np.arange(len(records))
+    for field in SITE_STORE_TEXT_FIELDS:
+        records[field] = columns[field]
+
+    records = records[np.argsort(records['x'], kind='stable')]
+
+    directory = os.path.dirname(os.path.abspath(store_path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    handle, temporary_path = tempfile.mkstemp(
+        suffix='.npy', dir=directory
+        )
+    with os.fdopen(handle, 'wb') as sink:
+        np.save(sink, records)
+    os.replace(temporary_path, store_path)
+
+    return records
+
+
+class SiteStore(object):
+    """
+    Read-only bounding box queries over a compiled site store.
+
+    Parameters
+    ----------
+    store_path : string
+        Path of a `.npy` file written by `compile_site_store`.
+    mmap : bool
+        Map the file rather than reading it into memory.
+
+    """
+    def __init__(self, store_path, mmap=True):
+
+        self.store_path = store_path
+        self.records = np.load(store_path, mmap_mode='r' if mmap else None)
+        self._x = self.records['x']
+
+    def __len__(self):
+        return len(self.records)
+
+    def query_bbox(self, minx, miny, maxx, maxy):
+        """
+        Return the sites within a bounding box, inclusive of its edges,
+        in their original csv order.
+
+        """
+        start = np.searchsorted(self._x, minx, side='left')
+        end = np.searchsorted(self._x, maxx, side='right')
+
+        candidates = self.records[start:end]
+        inside = (candidates['y'] >= miny) & (candidates['y'] <= maxy)
+        selected = candidates[inside]
+
+        return selected[np.argsort(selected['row'], kind='stable')]
+
+    def tile(self, minx, miny, maxx, maxy):
+        """
+        Return the sites within a bounding box as a `SiteTile`, which
+        answers any query inside the box exactly as the store does.
+
+        """
+        start = np.searchsorted(self._x, minx, side='left')
+        end = np.searchsorted(self._x, maxx, side='right')
+
+        candidates = self.records[start:end]
+        inside = (candidates['y'] >= miny) & (candidates['y'] <= maxy)
+
+        return SiteTile(candidates[inside], (minx, miny, maxx, maxy))
+
+
+class SiteTile(SiteStore):
+    """
+    In-memory block of a site store, shared by the postcode sectors
+    within it.
+
+    Parameters
+    ----------
+    records : numpy.ndarray
+        Site records sorted by x coordinate, as held by `SiteStore`.
+    bounds : tuple
+        (minx, miny, maxx, maxy) of the block. Queries must lie within
+        it to find every site.
+
+    """
+    def __init__(self, records, bounds):
+
+        self.store_path = None
+        self.records = np.array(records)
+        self.bounds = tuple(bounds)
+        self._x = self.records['x']
+        self._lonlat = None
+
+    def covers(self, minx, miny, maxx, maxy):
+        """
+        Return True if a bounding box lies within the tile.
+
+        """
+        return (minx >= self.bounds[0] and miny >= self.bounds[1] and
+            maxx <= self.bounds[2] and maxy <= self.bounds[3])
+
+    def query_bbox(self, minx, miny, maxx, maxy):
+
+        if not self.covers(minx, miny, maxx, maxy):
+            raise ValueError(
+                'Query {} extends beyond the tile {}'.format(
+                    (minx, miny, maxx, maxy), self.bounds
+                    )
+                )
+
+        return super(SiteTile, self).query_bbox(minx, miny, maxx, maxy)
+
+    def lonlat(self, project):
+        """
+        Return the WGS84 coordinates of every site in the tile, keyed by
+        their (x, y) coordinates. All sites are projected in one call
+        the first time.
+
+        Parameters
+        ----------
+        project : callable
+            Takes a list of (x, y) coordinates and returns arrays of
+            longitudes and latitudes, e.g.
+            `transmitter_module.project_coordinates`.
+
+        """
+        if self._lonlat is None:
+
+            coordinates = list(zip(
+                self.records['x'].tolist(), self.records['y'].tolist()
+                ))
+
+            if coordinates:
+                lons, lats = project(coordinates)
+            else:
+                lons, lats = [], []
+
+            self._lonlat = {
+                xy: (lon, lat)
+                for xy, lon, lat in zip(coordinates, lons, lats)
+                }
+
+        return self._lonlat
+
+
+_OPEN_STORES = {}
+
+def open_site_store(csv_path, store_path=None):
+    """
+    Return a `SiteStore` for a processed Sitefinder csv file.
+
+    The store is compiled the first time it is needed, or if the csv
+    file is newer than it. Stores are kept open for the life of the
+    process, so each worker maps the file once.
+
+    Parameters
+    ----------
+    csv_path : string
+        Path of `sitefinder_processed.csv`.
+    store_path : string, optional
+        Defaults to the csv path with a `.npy` extension.
+
+    """
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + '.npy'
+
+    if (not os.path.exists(store_path) or
+        os.path.getmtime(store_path) < os.path.getmtime(csv_path)):
+        _OPEN_STORES.pop(store_path, None)
+        compile_site_store(csv_path, store_path)
+
+    if store_path not in _OPEN_STORES:
+        _OPEN_STORES[store_path] = SiteStore(store_path)
+
+    return _OPEN_STORES[store_path]
@@ -4,21 +4,40 @@ import glob
 
 from rtree import index
 import fiona
-from shapely.geometry import shape, Point, Polygon, MultiPoint, mapping
-from shapely.geometry.polygon import Polygon
+from shapely.geometry import shape, Point, MultiPoint, mapping
 from shapely.wkt import loads
 from shapely.prepared import prep
 import numpy as np
-from pyproj import Proj, transform, Geod
-from geographiclib.geodesic import Geodesic
+from pyproj import transform, Geod, Transformer
 import matplotlib.pyplot as plt
 import pandas as pd
-from scipy.spatial import Delaunay
+from scipy.spatial import cKDTree
+
+try:
+    from shapely import contains_xy
+except ImportError:
+    contains_xy = None
 
 from itertools import tee
 from collections import OrderedDict
+from functools import lru_cache
 
-from digital_comms.mobile_network.path_loss_module import path_loss_calculator
+from digital_comms.mobile_network.path_loss_module import (
+    path_loss_calculator, path_loss_calculator_batch
+    )
+from digital_comms.mobile_network.random_streams import RandomStreams
+from digital_comms.mobile_network.monte_carlo import run_monte_carlo
+from digital_comms.mobile_network.site_store import open_site_store
+from digital_comms.mobile_network.sector_index import open_sector_index
+from digital_comms.mobile_network.site_placement import SitePlacement
+from digital_comms.mobile_network.path_loss_tables import (
+    open_path_loss_tables, TABLE_VERSION
+    )
+from digital_comms.mobile_network.results_sink import ResultsSink
+from digital_comms.mobile_network.profiling import Profiler, NULL_PROFILER
+from digital_comms.mobile_network.result_cache import (
+    ResultCache, input_fingerprint
+    )
 
 #set seed for stochastic predictablity
 np.random.seed(42)
@@ -36,7 +55,32 @@ RX_MISC_LOSSES = 4
 RX_HEIGHT = 1.5
 PERCENTILE = 95
 DESIRED_TRANSMITTER_DENSITY = 10 #per km^2
+DENSITY_STEPS = 2 #densities from the existing network to the desired one
+INCREMENTAL_LINK_BUDGETS = True
+PATH_LOSS_TABLES = True #look up path loss medians on a distance grid
 SECTORISATION = 3
+NEAREST_SITES = 4
+#interference from every site within this distance (m) rather than from
+#the NEAREST_SITES - 1 nearest, and only from sites received above the
+#power floor (dBm). None switches either off.
+INTERFERENCE_RADIUS = None
+INTERFERENCE_POWER_FLOOR = None
+GEODESIC_DISTANCES = False
+SEED = 42
+#adaptive Monte Carlo sampling, used instead of a fixed ITERATIONS
+MONTE_CARLO = False
+MONTE_CARLO_BATCH_SIZE = 100
+MIN_ITERATIONS = 200
+MAX_ITERATIONS = 5000
+SINR_TOLERANCE = 0.5 #dB
+CAPACITY_TOLERANCE = 0.05 #relative
+RESULTS_FORMAT = 'csv' #or parquet, feather or npz
+PROFILE = False #write per-stage timings for each postcode sector
+RESULT_CACHE = True #reuse lookup tables of runs with identical inputs
+#bump when a change to the simulation alters results for the same inputs.
+#Changes to path_loss_module bump path_loss_tables.TABLE_VERSION instead,
+#which is part of the fingerprint too.
+RESULT_CACHE_VERSION = 1
 SYSTEM_INPUT = os.path.join('data', 'raw')
 
 CONFIG = configparser.ConfigParser()
@@ -55,7 +99,125 @@ DATA_RESULTS = os.path.join(BASE_PATH, '..' ,'results', 'system_simulator')
 #set numpy seed
 np.random.seed(42)
 
-def read_postcode_sector(postcode_sector):
+#WGS84 ellipsoid, used when geodesic link distances are requested
+GEOD = Geod(ellps='WGS84')
+
+#output columns, see write_lookup_table and write_results
+LOOKUP_TABLE_FIELDS = (
+    'environment', 'operator', 'technology',
+    'frequency', 'bandwidth', 'mast_height',
+    'area_site_density', 'area_isd',
+    'cell_edge_spectral_efficency', 'cell_edge_sinr',
+    'area_capacity_mbps', 'network_efficiency',
+    )
+
+RESULTS_FIELDS = (
+    'frequency','bandwidth','site_density','r_density',
+    'sinr','throughput',
+    )
+
+#columnar site table, see NetworkManager.site_table
+SITE_DTYPE = np.dtype([
+    ('x', np.float64),
+    ('y', np.float64),
+    ('ant_height', np.float64),
+    ('power', np.float64),
+    ('gain', np.float64),
+    ('losses', np.float64),
+    ('eirp', np.float64),
+    ])
+
+#compact receiver table, see generate_receiver_table
+RECEIVER_DTYPE = np.dtype([
+    ('ue_id', np.int32),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('misc_losses', np.float64),
+    ('gain', np.float64),
+    ('losses', np.float64),
+    ('ue_height', np.float64),
+    ('indoor', np.bool_),
+    ])
+
+def default_sector_index():
+    """
+    Return the prebuilt postcode sector index, or None if it has not
+    been built (see scripts/mobile_preprocess_sector_index.py).
+
+    """
+    return open_sector_index(
+        os.path.join(DATA_INTERMEDIATE, 'postcode_sector_index',
+        'postcode_sectors.sqlite')
+        )
+
+def default_path_loss_tables():
+    """
+    Return the path loss tables shared by every postcode sector run,
+    saved between runs, or None if they are switched off.
+
+    """
+    if not PATH_LOSS_TABLES:
+        return None
+
+    return open_path_loss_tables(
+        os.path.join(DATA_INTERMEDIATE, 'path_loss_tables')
+        )
+
+#passed as result_cache to use default_result_cache(), as None disables it
+DEFAULT_RESULT_CACHE = object()
+
+def default_result_cache():
+    """
+    Return the cache of postcode sector lookup tables, or None if it is
+    switched off.
+
+    """
+    if not RESULT_CACHE:
+        return None
+
+    return ResultCache(
+        os.path.join(DATA_INTERMEDIATE, 'system_simulator_cache')
+        )
+
+def simulation_parameters():
+    """
+    Return the global parameters which affect the simulation results,
+    used to fingerprint postcode sector runs.
+
+    """
+    return {
+        'version': RESULT_CACHE_VERSION,
+        'path_loss_tables': (PATH_LOSS_TABLES, TABLE_VERSION),
+        'iterations': ITERATIONS,
+        'transmitter': (TX_HEIGHT_BASE, TX_HEIGHT_HIGH, TX_POWER, TX_GAIN,
+            TX_LOSSES),
+        'receiver': (RX_GAIN, RX_LOSSES, RX_MISC_LOSSES, RX_HEIGHT),
+        'percentile': PERCENTILE,
+        'desired_transmitter_density': DESIRED_TRANSMITTER_DENSITY,
+        'density_steps': DENSITY_STEPS,
+        'incremental_link_budgets': INCREMENTAL_LINK_BUDGETS,
+        'sectorisation': SECTORISATION,
+        'nearest_sites': NEAREST_SITES,
+        'geodesic_distances': GEODESIC_DISTANCES,
+        'interference': (INTERFERENCE_RADIUS, INTERFERENCE_POWER_FLOOR),
+        'monte_carlo': (MONTE_CARLO, MONTE_CARLO_BATCH_SIZE, MIN_ITERATIONS,
+            MAX_ITERATIONS, SINR_TOLERANCE, CAPACITY_TOLERANCE),
+        'spectrum_portfolio': SPECTRUM_PORTFOLIO,
+        'mast_height': MAST_HEIGHT,
+        'modulation_and_coding_lut': MODULATION_AND_CODING_LUT,
+    }
+
+def read_postcode_sector(postcode_sector, sector_index=None):
+    """
+    Get a postcode sector boundary, from the sector index if one has
+    been built, otherwise by scanning the postcode area shapefile.
+
+    """
+    if sector_index is None:
+        sector_index = default_sector_index()
+
+    if sector_index is not None and postcode_sector in sector_index:
+        return sector_index.read_postcode_sector(postcode_sector)
 
     postcode_area = ''.join(
         [i for i in postcode_sector[:2] if not i.isdigit()]
@@ -72,7 +234,20 @@ def read_postcode_sector(postcode_sector):
             if sector['properties']['postcode'].replace(
                 " ", "") == postcode_sector][0]
 
-def get_local_authority_ids(postcode_sector):
+def get_local_authority_ids(postcode_sector, sector_index=None):
+    """
+    Get the local authority districts intersecting a postcode sector,
+    from the sector index if one has been built, otherwise by scanning
+    the LAD shapefile.
+
+    """
+    if sector_index is None:
+        sector_index = default_sector_index()
+
+    postcode_sector_name = postcode_sector['properties']['postcode']
+
+    if sector_index is not None and postcode_sector_name in sector_index:
+        return sector_index.local_authority_ids(postcode_sector_name)
 
     with fiona.open(os.path.join(
         DATA_RAW, 'd_shapes','lad_uk_2016-12', 'lad_uk_2016-12.shp'),
@@ -133,61 +308,119 @@ def determine_environment(postcode_sector_lut):
 
     return environment
 
-def get_sites(postcode_sector):
+def default_site_store():
+    """
+    Return the site store for `sitefinder_processed.csv`, which is
+    compiled on first use.
 
-    sites = []
+    """
+    return open_site_store(
+        os.path.join(
+            DATA_INTERMEDIATE, 'sitefinder', 'sitefinder_processed.csv'
+            )
+        )
+
+def site_search_bounds(postcode_sector):
+    """
+    Return the bounding box searched for the sites around a postcode
+    sector: the sector buffered by its perimeter.
 
+    """
     geom = shape(postcode_sector['geometry'])
     geom_length = geom.length
     geom_buffer = geom.buffer(geom_length)
-    geom_box = geom_buffer.bounds
 
-    id_number = 0
+    return geom_buffer.bounds
 
-    with open(
-        os.path.join(
-            DATA_INTERMEDIATE, 'sitefinder', 'sitefinder_processed.csv'), 'r'
-            ) as system_file:
-            reader = csv.DictReader(system_file)
-            for line in reader:
-                if (
-                    geom_box[0] <= float(line['longitude']) and
-                    geom_box[1] <= float(line['latitude']) and
-                    geom_box[2] >= float(line['longitude']) and
-                    geom_box[3] >= float(line['latitude'])
-                    ):
-                    sites.append({
-                        'type': "Feature",
-                        'geometry': {
-                            "type": "Point",
-                            "coordinates": [
-                                float(line['longitude']),
-                                float(line['latitude'])
-                                ]
-                        },
-                        'properties': {
-                            # "operator": line[2],
-                            "sitengr": 'site_id_{}'.format(id_number),
-                            "ant_height": line['Antennaht'],
-                            "tech": line['Transtype'],
-                            "freq": line['Freqband'],
-                            "type": line['Anttype'],
-                            "power": TX_POWER,
-                            # "power_dbw": line['Powerdbw'],
-                            # "max_power_dbw": line['Maxpwrdbw'],
-                            # "max_power_dbm": line['Maxpwrdbm'],
-                            "gain": TX_GAIN,
-                            "losses": TX_LOSSES,
-                        }
-                    })
-
-                    id_number += 1
-                else:
-                    pass
+def get_sites(postcode_sector, site_store=None):
+    """
+    Get the Sitefinder sites within a buffered bounding box around a
+    postcode sector.
+
+    Parameters
+    ----------
+    postcode_sector : GeoJson
+        The postcode sector boundary.
+    site_store : SiteStore or SiteTile, optional
+        A compiled site store, or a tile covering the sector (see
+        `load_site_tile`). Defaults to `default_site_store()`.
+
+    Returns
+    -------
+    sites : list of GeoJson points
+        Sites in their original csv order.
+
+    """
+    if site_store is None:
+        site_store = default_site_store()
+
+    sites = []
+
+    geom_box = site_search_bounds(postcode_sector)
+
+    for id_number, line in enumerate(site_store.query_bbox(*geom_box)):
+        sites.append({
+            'type': "Feature",
+            'geometry': {
+                "type": "Point",
+                "coordinates": [
+                    float(line['x']),
+                    float(line['y'])
+                    ]
+            },
+            'properties': {
+                # "operator": line[2],
+                "sitengr": 'site_id_{}'.format(id_number),
+                "ant_height": str(line['Antennaht']),
+                "tech": str(line['Transtype']),
+                "freq": str(line['Freqband']),
+                "type": str(line['Anttype']),
+                "power": TX_POWER,
+                # "power_dbw": line['Powerdbw'],
+                # "max_power_dbw": line['Maxpwrdbw'],
+                # "max_power_dbm": line['Maxpwrdbm'],
+                "gain": TX_GAIN,
+                "losses": TX_LOSSES,
+            }
+        })
 
     return sites
 
-def generate_receivers(postcode_sector, postcode_sector_lut, quantity):
+def load_site_tile(postcode_sectors, site_store=None):
+    """
+    Load the sites for a block of neighbouring postcode sectors once,
+    so the sectors share one in-memory site table and projection
+    rather than each querying and projecting an overlapping set.
+
+    Parameters
+    ----------
+    postcode_sectors : list of GeoJson
+        The postcode sector boundaries.
+    site_store : SiteStore, optional
+        Defaults to `default_site_store()`.
+
+    Returns
+    -------
+    SiteTile
+        Covers the search box of every sector, so `get_sites` returns
+        the same sites for each sector as the full store.
+
+    """
+    if site_store is None:
+        site_store = default_site_store()
+
+    bounds = np.array([
+        site_search_bounds(postcode_sector)
+        for postcode_sector in postcode_sectors
+        ])
+
+    return site_store.tile(
+        bounds[:, 0].min(), bounds[:, 1].min(),
+        bounds[:, 2].max(), bounds[:, 3].max()
+        )
+
+def generate_receivers(postcode_sector, postcode_sector_lut, quantity,
+    rng=None):
     """
     The indoor probability provides a likelihood of a user being indoor,
     given the building footprint area and number of floors for all
@@ -201,6 +434,9 @@ def generate_receivers(postcode_sector, postcode_sector_lut, quantity):
         Contains information on indoor and outdoor probability.
     quantity: int
         Number of receivers we want to generate within the desired area.
+    rng : numpy.random.Generator, optional
+        Source of the receiver locations and indoor draws. If None, the
+        global NumPy RNG is used.
 
     Output
     ------
@@ -208,151 +444,222 @@ def generate_receivers(postcode_sector, postcode_sector_lut, quantity):
         Contains the quantity of desired receivers within the area boundary.
 
     """
-    indoor_probability = postcode_sector_lut['indoor_probability']
+    receiver_table = generate_receiver_table(
+        postcode_sector, postcode_sector_lut, quantity, rng
+        )
 
-    coordinates = []
+    return receiver_table_to_geojson(receiver_table)
 
-    geom = shape(postcode_sector['geometry'])
-    geom_box = geom.bounds
-
-    minx = geom_box[0]
-    miny = geom_box[1]
-    maxx = geom_box[2]
-    maxy = geom_box[3]
-
-    receivers = []
-
-    id_number = 0
-
-    while len(receivers) < quantity:
-
-        x_coord = np.random.uniform(low=minx, high=maxx, size=1)
-        y_coord = np.random.uniform(low=miny, high=maxy, size=1)
-
-        indoor_outdoor_probability = np.random.rand(1,1)[0][0]
-
-        coordinates = list(zip(x_coord, y_coord))
-
-        # Join the two
-        postcode_sector_shape = shape(postcode_sector['geometry'])
-        receiver = Point((x_coord, y_coord))
-        if postcode_sector_shape.contains(receiver):
-            receivers.append({
-                'type': "Feature",
-                'geometry': {
-                    "type": "Point",
-                    "coordinates": [coordinates[0][0],coordinates[0][1]],
-                },
-                'properties': {
-                    'ue_id': "id_{}".format(id_number),
-                    #"sitengr": 'TL4454059600',
-                    "misc_losses": RX_MISC_LOSSES,
-                    "gain": RX_GAIN,
-                    "losses": RX_LOSSES,
-                    "ue_height": float(RX_HEIGHT),
-                    "indoor": (True if float(indoor_outdoor_probability) < \
-                        float(indoor_probability) else False),
-                }
-            })
-            id_number += 1
+def generate_receiver_table(postcode_sector, postcode_sector_lut, quantity,
+    rng=None):
+    """
+    Generate receivers as a structured array (see `RECEIVER_DTYPE`).
 
-        else:
-            pass
+    Candidate points are drawn in blocks over the bounding box and
+    tested for containment in bulk, with the block size scaled by the
+    expected acceptance rate of the area.
+
+    Parameters
+    ----------
+    postcode_sector : GeoJson
+        Shape of the area we want to generate receivers within.
+    postcode_sector_lut : dict
+        Contains information on indoor and outdoor probability.
+    quantity: int
+        Number of receivers we want to generate within the desired area.
+    rng : numpy.random.Generator, optional
+        Source of the receiver locations and indoor draws. If None, the
+        global NumPy RNG is used.
+
+    Returns
+    -------
+    numpy.ndarray
+        One record per receiver.
+
+    """
+    random = np.random if rng is None else rng
+
+    indoor_probability = postcode_sector_lut['indoor_probability']
+
+    x_coords, y_coords = sample_points_in_polygon(
+        shape(postcode_sector['geometry']), quantity, rng
+        )
+
+    receivers = np.zeros(quantity, dtype=RECEIVER_DTYPE)
+
+    receivers['ue_id'] = np.arange(quantity)
+    receivers['x'] = x_coords
+    receivers['y'] = y_coords
+    receivers['misc_losses'] = RX_MISC_LOSSES
+    receivers['gain'] = RX_GAIN
+    receivers['losses'] = RX_LOSSES
+    receivers['ue_height'] = RX_HEIGHT
+    receivers['indoor'] = (
+        random.uniform(0, 1, quantity) < float(indoor_probability)
+        )
 
     return receivers
 
-def find_and_deploy_new_site(
-    existing_sites, new_sites, geojson_postcode_sector, idx):
+def sample_points_in_polygon(geom, quantity, rng=None,
+    max_block_size=1000000):
     """
-    Given existing site locations, try deploy a new one in the area
-    which has the largest existing gap between sites.
+    Draw points uniformly within a polygon by batched rejection
+    sampling over its bounding box.
 
     Parameters
     ----------
-    existing_sites : List of objects
-        Contains existing sites
-    iteration_number : int
-        The loop index, used for the providing the id for a new asset
-    geojson_postcode_sector : GeoJson
-        The postcode sector boundary in GeoJson format.
+    geom : shapely Polygon or MultiPolygon
+        The area to sample within.
+    quantity : int
+        Number of points required.
+    rng : numpy.random.Generator, optional
+        Source of randomness. If None, the global NumPy RNG is used.
+    max_block_size : int
+        Upper bound on the number of candidates drawn at once.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The x and y coordinates of the accepted points.
 
     """
-    NEW_TRANSMITTERS = []
+    random = np.random if rng is None else rng
 
-    for n in range(0, new_sites):
+    minx, miny, maxx, maxy = geom.bounds
 
-        existing_site_coordinates = []
-        for existing_site in existing_sites.values():
-            existing_site_coordinates.append(
-                existing_site.coordinates
-                )
+    box_area = (maxx - minx) * (maxy - miny)
+
+    if quantity > 0 and (geom.is_empty or box_area <= 0):
+        raise ValueError('Cannot sample points within an empty area')
+
+    acceptance_rate = max(geom.area / box_area, 0.01) if box_area else 1
 
-        #convert to numpy array
-        existing_site_coordinates = np.array(
-            existing_site_coordinates
+    contains = _containment_test(geom)
+
+    x_coords = []
+    y_coords = []
+    accepted = 0
+
+    while accepted < quantity:
+
+        remaining = quantity - accepted
+        block_size = min(
+            int(np.ceil(1.1 * remaining / acceptance_rate)) + 16,
+            max_block_size
             )
 
-        #get delaunay grid
-        tri = Delaunay(existing_site_coordinates)
+        x_candidates = random.uniform(minx, maxx, block_size)
+        y_candidates = random.uniform(miny, maxy, block_size)
 
-        #get coordinates from gri
-        coord_groups = [tri.points[x] for x in tri.simplices]
+        inside = contains(x_candidates, y_candidates)
 
-        #convert coordinate groups to polygons
-        polygons = [Polygon(x) for x in coord_groups]
+        x_coords.append(x_candidates[inside][:remaining])
+        y_coords.append(y_candidates[inside][:remaining])
+        accepted += len(x_coords[-1])
 
-        #sort based on area
-        polygons = sorted(polygons, key=lambda x: x.area, reverse=True)
+    if not x_coords:
+        return np.empty(0), np.empty(0)
 
-        geom = shape(geojson_postcode_sector['geometry'])
+    return np.concatenate(x_coords), np.concatenate(y_coords)
 
-        #try to allocate using the delauney polygon with the largest area first
-        try:
-            for new_site_area in polygons:
+def _containment_test(geom):
+    """
+    Return a function testing arrays of x and y coordinates for
+    containment in geom.
 
-                #get the centroid from the largest area
-                centroid = new_site_area.centroid
+    Uses the vectorised `shapely.contains_xy` where available (Shapely
+    2), otherwise a prepared geometry.
 
-                if geom.contains(centroid):
-                    break
-                else:
-                    continue
+    """
+    if contains_xy is not None:
+        return lambda x, y: contains_xy(geom, x, y)
 
-            x_coord = np.random.uniform(low=minx, high=maxx, size=1)
-            y_coord = np.random.uniform(low=miny, high=maxy, size=1)
+    prepared_geom = prep(geom)
 
-        #if no delauney polygon centroids are in the area boundary, randomly allocate
-        except:
+    return lambda x, y: np.array(
+        [prepared_geom.contains(Point(point)) for point in zip(x, y)],
+        dtype=bool
+        )
 
-            geom_box = geom.bounds
+def receiver_table_to_geojson(receivers):
+    """
+    Convert a receiver table to the list of GeoJson points used by
+    `NetworkManager`.
 
-            minx = geom_box[0]
-            miny = geom_box[1]
-            maxx = geom_box[2]
-            maxy = geom_box[3]
+    """
+    return [
+        {
+            'type': "Feature",
+            'geometry': {
+                "type": "Point",
+                "coordinates": [float(receiver['x']), float(receiver['y'])],
+            },
+            'properties': {
+                'ue_id': "id_{}".format(receiver['ue_id']),
+                "misc_losses": float(receiver['misc_losses']),
+                "gain": float(receiver['gain']),
+                "losses": float(receiver['losses']),
+                "ue_height": float(receiver['ue_height']),
+                "indoor": bool(receiver['indoor']),
+            }
+        }
+        for receiver in receivers
+        ]
 
-            random_site_location = []
+def find_and_deploy_new_site(
+    existing_sites, new_sites, geojson_postcode_sector, idx, rng=None):
+    """
+    Given existing site locations, try deploy a new one in the area
+    which has the largest existing gap between sites.
 
-            while len(random_site_location) == 0:
+    Each new site is placed at the centroid of the largest Delaunay
+    triangle whose centroid is within the area, and then joins the
+    triangulation for the next placement (see
+    `site_placement.SitePlacement`). If no such triangle exists, a
+    random location within the area is used.
 
-                x_coord = np.random.uniform(low=minx, high=maxx, size=1)
-                y_coord = np.random.uniform(low=miny, high=maxy, size=1)
+    Parameters
+    ----------
+    existing_sites : List of objects
+        Contains existing sites
+    new_sites : int
+        The number of new sites to deploy.
+    geojson_postcode_sector : GeoJson
+        The postcode sector boundary in GeoJson format.
+    idx : int
+        The loop index, used for the providing the id for a new asset
+    rng : numpy.random.Generator, optional
+        Source of random fallback locations. If None, the global NumPy
+        RNG is used.
+
+    """
+    NEW_TRANSMITTERS = []
 
-                receiver = Point((x_coord, y_coord))
+    if new_sites <= 0:
+        return NEW_TRANSMITTERS
 
-                if geom.contains(receiver):
-                    centroid = receiver.centroid
-                    random_site_location.append(receiver)
+    geom = shape(geojson_postcode_sector['geometry'])
+    prepared_geom = prep(geom)
 
-                else:
+    def random_location():
+        x_coords, y_coords = sample_points_in_polygon(geom, 1, rng)
+        return x_coords[0], y_coords[0]
 
-                    continue
+    placement = SitePlacement(
+        [existing_site.coordinates for existing_site in existing_sites.values()],
+        lambda x, y: prepared_geom.contains(Point(x, y)),
+        random_location
+        )
+
+    for n in range(0, new_sites):
+
+        x_coord, y_coord = placement.place()
 
         NEW_TRANSMITTERS.append({
             'type': "Feature",
             'geometry': {
                 "type": "Point",
-                "coordinates": [centroid.x, centroid.y]
+                "coordinates": [x_coord, y_coord]
             },
             'properties': {
                     "operator": 'unknown',
@@ -370,20 +677,83 @@ def find_and_deploy_new_site(
     return NEW_TRANSMITTERS
 
 class NetworkManager(object):
+    """
+    Holds the sites and receivers for an area and estimates link budgets.
 
-    def __init__(self, area, sites, receivers):
+    Parameters
+    ----------
+    area : GeoJson
+        The postcode sector boundary.
+    sites : list of GeoJson points
+        Transmitter sites.
+    receivers : list of GeoJson points
+        Receivers (user equipment).
+    geodesic : bool
+        If True, link distances are WGS84 geodesics. Otherwise planar
+        British National Grid distances are used, which is much faster.
+    interference_radius : float, optional
+        If given, every site within this distance (m) of a receiver,
+        other than its serving site, interferes with it. Otherwise the
+        nearest sites up to `NEAREST_SITES` in total interfere.
+    interference_power_floor : float, optional
+        If given, interfering sites received below this power (dBm)
+        are ignored. Without a radius, every site is a candidate.
+    profiler : Profiler, optional
+        Records the time spent in each link budget stage and counts
+        links and spatial index queries.
+    projected_sites : dict, optional
+        WGS84 (lon, lat) coordinates keyed by British National Grid
+        (x, y), e.g. from `SiteTile.lonlat`. Sites found in it are not
+        projected again.
+
+    """
+    def __init__(self, area, sites, receivers, geodesic=False,
+        interference_radius=None, interference_power_floor=None,
+        profiler=None, projected_sites=None):
 
         self.area = {}
         self.sites = {}
         self.receivers = {}
 
+        self.geodesic = geodesic
+        self.interference_radius = interference_radius
+        self.interference_power_floor = interference_power_floor
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+
+        #WGS84 (lon, lat) coordinates, filled in bulk when needed
+        self._site_lonlat = {}
+        self._projected_sites = projected_sites or {}
+        self._receiver_lonlat = {}
+
+        #receiver-by-site geometry, see build_distance_matrix
+        self._geometry_key = None
+        self.distance_matrix = None
+        self.site_index_matrix = None
+        self.interference_mask = None
+
+        #per-receiver link budget results, see estimate_link_budget
+        self._link_cache = {}
+        self._receiver_version = 0
+        self.recomputed_receivers = 0
+
+        #spatial index over all sites, kept up to date as sites are built
+        self._site_index = index.Index()
+        self._site_index_ids = {}
+        self._site_version = 0
+
+        #typed columns, one row per site or receiver in insertion order
+        self.site_table = RecordTable(SITE_DTYPE)
+        self.receiver_table = RecordTable(RECEIVER_DTYPE)
+        self._site_rows = {}
+        self._receiver_rows = {}
+
         area_id = area['properties']['postcode']
         self.area[area_id] = Area(area)
 
         for site in sites:
             site_id = site['properties']["sitengr"]
             site = Transmitter(site)
-            self.sites[site_id] = site
+            self._add_site(site_id, site)
 
             area_containing_sites = self.area[area_id]
             area_containing_sites.add_site(site)
@@ -391,10 +761,7 @@ class NetworkManager(object):
         for receiver in receivers:
             receiver_id = receiver['properties']["ue_id"]
             receiver = Receiver(receiver)
-            self.receivers[receiver_id] = receiver
-
-            area_containing_receivers = self.area[area_id]
-            area_containing_receivers.add_receiver(receiver)
+            self._add_receiver(receiver_id, receiver)
 
     def build_new_assets(self, list_of_new_assets, area_id):
 
@@ -402,15 +769,107 @@ class NetworkManager(object):
             site_id = site['properties']["sitengr"]
             site = Transmitter(site)
 
-            self.sites[site_id] = site
+            self._add_site(site_id, site)
 
             for area_containing_sites in self.area.values():
                 if area_containing_sites.id == area_id:
                     area_containing_sites.add_site(site)
 
+    def _add_site(self, site_id, site):
+        """
+        Register a site and insert it into the spatial index. A site
+        with an existing id replaces the previous one.
+
+        """
+        self.sites[site_id] = site
+
+        bounds = Point(site.coordinates).bounds
+
+        if site_id in self._site_index_ids:
+            index_id, previous_bounds = self._site_index_ids[site_id]
+            self._site_index.delete(index_id, previous_bounds)
+            #project the new position when next needed
+            self._site_lonlat.pop(site_id, None)
+        else:
+            index_id = len(self._site_index_ids)
+
+        self._site_index.insert(index_id, bounds, site)
+        self._site_index_ids[site_id] = (index_id, bounds)
+        self._site_version += 1
+
+        record = (
+            site.coordinates[0], site.coordinates[1], site.ant_height,
+            site.power, site.gain, site.losses, site.eirp
+            )
+
+        if site_id in self._site_rows:
+            self.site_table.update(self._site_rows[site_id], record)
+        else:
+            self._site_rows[site_id] = self.site_table.append(record)
+
+    def _add_receiver(self, receiver_id, receiver):
+
+        self.receivers[receiver_id] = receiver
+        self._receiver_version += 1
+
+        if receiver_id in self._receiver_rows:
+            row = self._receiver_rows[receiver_id]
+        else:
+            row = len(self.receiver_table)
+
+        #string ids stay in self.receivers, the table holds the row number
+        record = (
+            row, receiver.coordinates[0], receiver.coordinates[1],
+            receiver.misc_losses, receiver.gain, receiver.losses,
+            receiver.ue_height, receiver.indoor
+            )
+
+        if receiver_id in self._receiver_rows:
+            self.receiver_table.update(row, record)
+        else:
+            self._receiver_rows[receiver_id] = self.receiver_table.append(
+                record
+                )
+
+        for area_containing_receivers in self.area.values():
+            area_containing_receivers.add_receiver(receiver)
+
+    def replace_receivers(self, receivers):
+        """
+        Swap the current receivers for a new set, for example a fresh
+        Monte Carlo batch. Sites and their spatial index are kept.
+
+        Parameters
+        ----------
+        receivers : list of GeoJson points
+            Receivers (user equipment).
+
+        """
+        self._set_receivers([
+            (receiver['properties']["ue_id"], Receiver(receiver))
+            for receiver in receivers
+            ])
+
+    def _set_receivers(self, receivers):
+
+        self.receivers = {}
+        self._receiver_lonlat = {}
+        self._geometry_key = None
+        self._receiver_version += 1
+
+        self.receiver_table.clear()
+        self._receiver_rows = {}
+
+        for area in self.area.values():
+            area._receivers = {}
+
+        for receiver_id, receiver in receivers:
+            self._add_receiver(receiver_id, receiver)
+
     def estimate_link_budget(
         self, frequency, bandwidth, generation, mast_height,
-        environment, modulation_and_coding_lut):
+        environment, modulation_and_coding_lut, rng=None, incremental=False,
+        path_loss_tables=None):
         """
         Takes propagation parameters and calculates link budget capacity.
 
@@ -425,6 +884,18 @@ class NetworkManager(object):
         modulation_and_coding_lut : list of tuples
             A lookup table containing modulation and coding rates,
             spectral efficiencies and SINR estimates.
+        rng : numpy.random.Generator, optional
+            Source of the shadow fading, penetration loss and line of
+            sight draws. If None, the legacy fixed seed values are used.
+        incremental : bool
+            If True, reuse the results of the previous call with the same
+            parameters for every receiver whose serving and interfering
+            sites have not changed since, e.g. after `build_new_assets`
+            adds sites elsewhere in the area. Only the affected receivers
+            are recomputed.
+        path_loss_tables : PathLossTables, optional
+            Look up the deterministic path loss terms in precomputed
+            distance tables rather than evaluating the models.
 
         Returns
         -------
@@ -434,85 +905,542 @@ class NetworkManager(object):
             The estimated link budget capacity.
 
         """
-        results = []
+        if self._geometry_is_stale():
+            self.build_distance_matrix()
+
+        link_eirp = self._geometry_sites['eirp'][self.site_index_matrix]
 
-        for receiver in self.receivers.values():
-            # print(receiver.id)
-            closest_site, interfering_sites = (
-                self.find_closest_available_sites(receiver)
+        key = (
+            frequency, bandwidth, generation, mast_height, environment,
+            tuple(tuple(row) for row in modulation_and_coding_lut),
+            self.interference_power_floor
             )
-            # print('closest_site is {}'.format(closest_site))
-            # print('interfering_sites is {}'.format(interfering_sites))
-            path_loss = self.calculate_path_loss(
-                closest_site, receiver, frequency, mast_height, environment
+
+        cached = self._link_cache.get(key) if incremental else None
+
+        if (cached is not None and
+            cached['receiver_version'] == self._receiver_version and
+            cached['site_index_matrix'].shape == self.site_index_matrix.shape):
+
+            changed = (
+                (cached['site_index_matrix'] != self.site_index_matrix) |
+                (cached['distance_matrix'] != self.distance_matrix) |
+                (cached['link_eirp'] != link_eirp)
+                ).any(axis=1)
+
+            #e.g. after the interference radius changes
+            changed |= (
+                cached['interference_mask'] != self.interference_mask
+                ).any(axis=1)
+
+            rows = np.flatnonzero(changed)
+
+            sinr = cached['sinr'].copy()
+            spectral_efficiency = cached['spectral_efficiency'].copy()
+            estimated_capacity = cached['capacity_mbps'].copy()
+
+            if len(rows):
+                (sinr[rows], spectral_efficiency[rows],
+                    estimated_capacity[rows]) = self._link_budget_rows(
+                    rows, frequency, bandwidth, generation, mast_height,
+                    environment, modulation_and_coding_lut, rng,
+                    path_loss_tables
+                    )
+
+        else:
+
+            rows = np.arange(len(self._geometry_receivers))
+
+            sinr, spectral_efficiency, estimated_capacity = (
+                self._link_budget_rows(
+                    rows, frequency, bandwidth, generation, mast_height,
+                    environment, modulation_and_coding_lut, rng,
+                    path_loss_tables
+                    )
+                )
+
+        self.recomputed_receivers = len(rows)
+
+        if incremental:
+            self._link_cache[key] = {
+                'receiver_version': self._receiver_version,
+                'site_index_matrix': self.site_index_matrix,
+                'distance_matrix': self.distance_matrix,
+                'link_eirp': link_eirp,
+                'interference_mask': self.interference_mask,
+                'sinr': sinr,
+                'spectral_efficiency': spectral_efficiency,
+                'capacity_mbps': estimated_capacity,
+            }
+
+        results = [
+            {
+                'spectral_efficiency': spectral_efficiency[i],
+                'sinr': sinr[i],
+                'capacity_mbps': estimated_capacity[i]
+            }
+            for i in range(len(self._geometry_receivers))
+            ]
+
+        return results
+
+    def _link_budget_rows(self, rows, frequency, bandwidth, generation,
+        mast_height, environment, modulation_and_coding_lut, rng=None,
+        path_loss_tables=None):
+        """
+        Calculate SINR, spectral efficiency and capacity for the given
+        rows (receivers) of the distance matrix.
+
+        """
+        sites = self._geometry_sites
+        receivers = self._geometry_receivers[rows]
+
+        serving_sites = self.serving_site_indices[rows]
+        interfering_sites = self.interfering_site_indices[rows]
+
+        profiler = self.profiler
+        profiler.count('receivers', len(rows))
+
+        with profiler.stage('link_budget.path_loss'):
+
+            #received power from the serving site
+            serving_distances = np.round(self.distance_matrix[rows, 0], 0)
+
+            path_loss = path_loss_calculator_batch(
+                frequency,
+                serving_distances,
+                mast_height,
+                'macro',
+                20,
+                20,
+                environment,
+                serving_distances < 250,
+                receivers['ue_height'],
+                0,
+                receivers['indoor'],
+                rng,
+                path_loss_tables,
+                )
+
+            eirp = sites['eirp']
+
+            received_power = (
+                eirp[serving_sites] - path_loss - receivers['misc_losses'] +
+                receivers['gain'] - receivers['losses']
+                )
+
+        with profiler.stage('link_budget.interference'):
+
+            #received power from the interfering sites, evaluated for the
+            #valid links only and -inf (no power) elsewhere
+            interference_distances = np.round(
+                self.distance_matrix[rows, 1:], 0
+                )
+            links = self.interference_mask[rows]
+            shape = interference_distances.shape
+
+            profiler.count('links', len(rows) + np.count_nonzero(links))
+
+            types_of_sight = randomly_select_los_batch(shape, rng)
+
+            interference = np.full(shape, -np.inf)
+
+            if links.any():
+
+                interference_path_loss = path_loss_calculator_batch(
+                    frequency,
+                    interference_distances[links],
+                    20,
+                    'macro',
+                    20,
+                    20,
+                    environment,
+                    types_of_sight[links],
+                    np.broadcast_to(
+                        receivers['ue_height'][:, np.newaxis], shape)[links],
+                    0,
+                    np.broadcast_to(
+                        receivers['indoor'][:, np.newaxis], shape)[links],
+                    rng,
+                    path_loss_tables,
+                    )
+
+                interference[links] = (
+                    eirp[interfering_sites][links] - interference_path_loss -
+                    np.broadcast_to(
+                        receivers['misc_losses'][:, np.newaxis], shape)[links] +
+                    np.broadcast_to(
+                        receivers['gain'][:, np.newaxis], shape)[links] -
+                    np.broadcast_to(
+                        receivers['losses'][:, np.newaxis], shape)[links]
+                    )
+
+            if self.interference_power_floor is not None:
+                interference[interference < self.interference_power_floor] = (
+                    -np.inf
+                    )
+
+        with profiler.stage('link_budget.sinr'):
+
+            noise = self.calculate_noise(
+                bandwidth
             )
 
-            received_power = self.calc_received_power(
-                closest_site, receiver, path_loss
+            sinr = self.calculate_sinr(received_power, interference, noise)
+
+            spectral_efficiency = self.modulation_scheme_and_coding_rate(
+                sinr, generation, modulation_and_coding_lut
+                )
+
+            estimated_capacity = self.link_budget_capacity(
+                bandwidth, spectral_efficiency
             )
 
-            interference = self.calculate_interference(
-                interfering_sites, receiver, frequency, environment)
+        return sinr, spectral_efficiency, estimated_capacity
+
+    def estimate_link_budget_monte_carlo(
+        self, frequency, bandwidth, generation, mast_height, environment,
+        modulation_and_coding_lut, postcode_sector_lut,
+        percentile=PERCENTILE, rng=None, path_loss_tables=None, **options):
+        """
+        Estimate the percentile link budget values by adaptive Monte
+        Carlo sampling, rather than from a fixed set of receivers.
+
+        Each batch draws new receivers within the area and new fading
+        realisations, and sampling stops once the percentile SINR and
+        capacity have converged (see `monte_carlo.run_monte_carlo`).
+        The original receivers are restored afterwards.
+
+        Parameters
+        ----------
+        postcode_sector_lut : dict
+            Contains the indoor probability used to draw receivers.
+        percentile : float
+            The percentile reported, as in `obtain_threshold_values`.
+        rng : numpy.random.Generator, optional
+            Source of receiver locations and fading draws.
+        path_loss_tables : PathLossTables, optional
+            Passed through to `estimate_link_budget`.
+        **options
+            Batch size, iteration limits and tolerances passed to
+            `run_monte_carlo`.
+
+        Returns
+        -------
+        dict
+            Percentile estimates, confidence intervals, the number of
+            iterations used and whether the tolerances were met.
+
+        """
+        original_receivers = list(self.receivers.items())
+
+        area = [a for a in self.area.values()][0]
+        postcode_sector = {'geometry': area.geometry}
+
+        def evaluate_batch(quantity, batch_rng):
+
+            self.replace_receivers(generate_receivers(
+                postcode_sector, postcode_sector_lut, quantity, batch_rng
+                ))
+
+            return self.estimate_link_budget(
+                frequency, bandwidth, generation, mast_height, environment,
+                modulation_and_coding_lut, batch_rng,
+                path_loss_tables=path_loss_tables
+                )
+
+        try:
+            estimates = run_monte_carlo(
+                evaluate_batch, percentile, rng=rng, **options
+                )
+        finally:
+            self._set_receivers(original_receivers)
+
+        return estimates
+
+    def build_distance_matrix(self, k=NEAREST_SITES):
+        """
+        Precompute the receiver-by-site geometry used by
+        `estimate_link_budget`.
+
+        Geometry only changes when sites or receivers are added, so the
+        result is reused for every spectrum band and mast height.
+
+        Parameters
+        ----------
+        k : int or None
+            Number of nearest sites to keep for each receiver (serving
+            site plus interferers). If None, a dense matrix over all
+            sites is built. Ignored if the manager has an interference
+            radius, and treated as None if it only has a power floor.
+
+        Notes
+        -----
+        Sets `distance_matrix`, with each row sorted by ascending
+        distance, and `site_index_matrix`, which gives the position of
+        the matching site in the site list. The first column is the
+        serving site.
+
+        With an interference radius, rows are as wide as the largest
+        number of sites within the radius of any receiver.
+        `interference_mask` flags which interfering columns of each row
+        are real links, i.e. within the radius. Without a radius every
+        column is a link.
+
+        """
+        with self.profiler.stage('link_budget.nearest_sites'):
+            self._build_distance_matrix(k)
+
+        self.profiler.count('nearest_site_queries', len(self.receivers))
+
+    def _build_distance_matrix(self, k):
+
+        sites = self.site_table.records.copy()
+        receivers = self.receiver_table.records.copy()
+
+        site_coordinates = np.column_stack((sites['x'], sites['y']))
+        receiver_coordinates = np.column_stack((receivers['x'], receivers['y']))
+
+        radius = self.interference_radius
+
+        if radius is not None:
+
+            #the serving site is kept even if it is outside the radius
+            within_radius = cKDTree(site_coordinates).query_ball_point(
+                receiver_coordinates, radius, return_length=True
+                )
+            k = max(int(np.max(within_radius, initial=0)), 1)
+
+        elif self.interference_power_floor is not None:
+            k = None
+
+        if k is None or k >= len(sites):
+
+            distances = planar_distance(
+                receiver_coordinates[:, 0, np.newaxis],
+                receiver_coordinates[:, 1, np.newaxis],
+                site_coordinates[:, 0], site_coordinates[:, 1]
+                )
+
+            site_indices = np.argsort(distances, axis=1, kind='stable')
+
+            if k is not None:
+                site_indices = site_indices[:, :k]
+
+        else:
+
+            tree = cKDTree(site_coordinates)
+            distances, site_indices = tree.query(receiver_coordinates, k)
+
+            #a single neighbour comes back without the k axis
+            distances = distances.reshape(len(receivers), k)
+            site_indices = site_indices.reshape(len(receivers), k)
+
+        if self.geodesic:
+
+            #sites are ranked on the national grid, then measured
+            #along the ellipsoid
+            self.project_sites_and_receivers()
+
+            site_lonlat = np.array(
+                [self._site_lonlat[site.id] for site in self.sites.values()]
+                )
+            receiver_lonlat = np.array([
+                self._receiver_lonlat[receiver.id]
+                for receiver in self.receivers.values()
+                ])
+
+            distances = geodesic_distance(
+                site_lonlat[site_indices, 0], site_lonlat[site_indices, 1],
+                receiver_lonlat[:, 0, np.newaxis],
+                receiver_lonlat[:, 1, np.newaxis]
+                )
+
+        else:
+
+            distances = planar_distance(
+                receiver_coordinates[:, 0, np.newaxis],
+                receiver_coordinates[:, 1, np.newaxis],
+                site_coordinates[site_indices, 0],
+                site_coordinates[site_indices, 1]
+                )
+
+        if radius is not None:
+            interference_mask = distances[:, 1:] <= radius
+        else:
+            interference_mask = np.ones(
+                (len(receivers), max(distances.shape[1] - 1, 0)), dtype=bool
+                )
+
+        self._geometry_sites = sites
+        self._geometry_receivers = receivers
+        self._geometry_key = self._current_geometry_key()
+
+        self.distance_matrix = distances
+        self.site_index_matrix = site_indices
+        self.interference_mask = interference_mask
+
+    @property
+    def serving_site_indices(self):
+        """
+        numpy.ndarray: Position of each receiver's serving site in the
+        site list used by the distance matrix.
+
+        """
+        return self.site_index_matrix[:, 0]
+
+    @property
+    def interfering_site_indices(self):
+        """
+        numpy.ndarray: Positions of each receiver's interfering sites,
+        nearest first.
+
+        """
+        return self.site_index_matrix[:, 1:]
+
+    def _current_geometry_key(self):
+
+        return (
+            self._site_version, len(self.receivers),
+            self.interference_radius, self.interference_power_floor is None
+            )
+
+    def _geometry_is_stale(self):
+
+        return self._geometry_key != self._current_geometry_key()
+
+    def find_closest_available_sites(self, receiver, k=NEAREST_SITES):
+        """
+        Returns the closest site to the receiver, plus the next
+        closest sites which act as interferers.
+
+        Parameters
+        ----------
+        receiver : Receiver
+            The receiver to find sites for.
+        k : int
+            Number of nearest sites to query, including the serving site.
+            Ignored if the manager has an interference radius, in which
+            case every other site within the radius interferes.
+
+        """
+        if self.interference_radius is not None:
+            return self.find_sites_within_radius(
+                receiver, self.interference_radius
+                )
+
+        all_closest_sites = self.find_nearest_sites(receiver.coordinates, k)
+
+        closest_site = all_closest_sites[0]
+
+        interfering_sites = all_closest_sites[1:k]
+
+        return closest_site, interfering_sites
+
+    def find_sites_within_radius(self, receiver, radius):
+        """
+        Return the closest site to the receiver, and every other site
+        within the radius (m) ranked on distance.
+
+        """
+        closest_site = self.find_nearest_sites(receiver.coordinates, 1)[0]
+
+        self.profiler.count('rtree_queries')
+
+        x, y = receiver.coordinates
+        candidates = [
+            site for site in self._site_index.intersection(
+                (x - radius, y - radius, x + radius, y + radius),
+                objects='raw')
+            if site.id != closest_site.id
+            ]
+
+        distances = self.link_distances(candidates, receiver)
+
+        interfering_sites = [
+            candidates[i] for i in np.argsort(distances, kind='stable')
+            if distances[i] <= radius
+            ]
+
+        return closest_site, interfering_sites
+
+    def find_nearest_sites(self, coordinates, k):
+        """
+        Query the spatial index for the k sites nearest to a point,
+        ranked based on proximity.
+
+        """
+        self.profiler.count('rtree_queries')
+
+        return list(
+            self._site_index.nearest(
+                Point(coordinates).bounds, k, objects='raw')
+            )[:k]
 
-            noise = self.calculate_noise(
-                bandwidth
-            )
+    def project_sites_and_receivers(self):
+        """
+        Project all sites and receivers from British National Grid to
+        WGS84 in one bulk transformation, caching the results.
 
-            sinr = self.calculate_sinr(
-                received_power, interference, noise
-            )
+        Only objects which have not already been projected are
+        transformed, so this is cheap to call again after new sites
+        have been built.
 
-            spectral_efficiency = self.modulation_scheme_and_coding_rate(
-                sinr, generation, modulation_and_coding_lut
-            )
+        """
+        for objects, cache in [
+            (self.sites.values(), self._site_lonlat),
+            (self.receivers.values(), self._receiver_lonlat)]:
 
-            estimated_capacity = self.link_budget_capacity(
-                bandwidth, spectral_efficiency
-            )
+            missing = [obj for obj in objects if obj.id not in cache]
 
-            data = {
-                'spectral_efficiency': spectral_efficiency,
-                'sinr': sinr,
-                'capacity_mbps': estimated_capacity
-                }
+            if cache is self._site_lonlat and self._projected_sites:
+                for obj in missing:
+                    lonlat = self._projected_sites.get(tuple(obj.coordinates))
+                    if lonlat is not None:
+                        cache[obj.id] = lonlat
+                missing = [obj for obj in missing if obj.id not in cache]
 
-            results.append(data)
+            if not missing:
+                continue
 
-            # print('received_power is {}'.format(received_power))
-            # print('interference is {}'.format(interference))
-            # print('noise is {}'.format(noise))
-            # print('sinr is {}'.format(sinr))
-            # print('spectral_efficiency is {}'.format(spectral_efficiency))
-            # print('estimated_capacity is {}'.format(estimated_capacity))
-            # print('path_loss is {}'.format(path_loss))
-            # print('-----------------------------')
+            lons, lats = project_coordinates(
+                [obj.coordinates for obj in missing]
+                )
 
-        return results
+            for obj, lon, lat in zip(missing, lons, lats):
+                cache[obj.id] = (lon, lat)
 
-    def find_closest_available_sites(self, receiver):
+    def link_distances(self, sites, receiver):
         """
-        Returns a list of all sites, ranked based on proximity
-        to the receiver.
+        Calculate the distance (m) from each site to the receiver.
+
+        Planar distances are computed directly from the British National
+        Grid coordinates. Geodesic distances are only used when the
+        manager was created with `geodesic=True`.
 
         """
-        idx = index.Index()
+        if len(sites) == 0:
+            return np.array([])
 
-        for site in self.sites.values():
-            idx.insert(0, Point(site.coordinates).bounds, site)
+        if not self.geodesic:
 
-        number_of_sites = len(self.sites.values())
+            site_coordinates = np.array([site.coordinates for site in sites])
 
-        all_closest_sites =  list(
-            idx.nearest(
-                Point(receiver.coordinates).bounds,
-                number_of_sites, objects='raw')
+            return planar_distance(
+                site_coordinates[:, 0], site_coordinates[:, 1],
+                receiver.coordinates[0], receiver.coordinates[1]
                 )
 
-        closest_site = all_closest_sites[0]
+        if (receiver.id not in self._receiver_lonlat or
+            any(site.id not in self._site_lonlat for site in sites)):
+            self.project_sites_and_receivers()
 
-        interfering_sites = all_closest_sites[1:4]
+        site_lonlat = np.array([self._site_lonlat[site.id] for site in sites])
+        receiver_lon, receiver_lat = self._receiver_lonlat[receiver.id]
 
-        return closest_site, interfering_sites
+        return geodesic_distance(
+            site_lonlat[:, 0], site_lonlat[:, 1], receiver_lon, receiver_lat
+            )
 
     def calculate_path_loss(self, closest_site, receiver,
         frequency, mast_height, environment):
@@ -520,29 +1448,10 @@ class NetworkManager(object):
         # for area in self.area.values():
         #     local_authority_ids = area.local_authority_ids
 
-        x2_receiver = receiver.coordinates[0]
-        y2_receiver = receiver.coordinates[1]
-
-        x1_site, y1_site = transform_coordinates(
-            Proj(init='epsg:27700'), Proj(init='epsg:4326'),
-            closest_site.coordinates[0],
-            closest_site.coordinates[1],
-            )
-
-        x2_receiver, y2_receiver = transform_coordinates(
-            Proj(init='epsg:27700'), Proj(init='epsg:4326'),
-            receiver.coordinates[0],
-            receiver.coordinates[1],
-            )
-
-        Geo = Geodesic.WGS84
-
-        i_strt_distance = Geo.Inverse(
-            y1_site, x1_site,  y2_receiver, x2_receiver
+        interference_strt_distance = round(
+            self.link_distances([closest_site], receiver)[0], 0
             )
 
-        interference_strt_distance = round(i_strt_distance['s12'],0)
-
         ant_height = mast_height
         ant_type =  'macro'
 
@@ -583,12 +1492,9 @@ class NetworkManager(object):
         Equivalent Isotropically Radiated Power (EIRP) = Power + Gain - Losses
 
         """
-        #calculate Equivalent Isotropically Radiated Power (EIRP)
-        eirp = float(site.power) + \
-            float(site.gain) - \
-            float(site.losses)
-
-        received_power = eirp - \
+        #Equivalent Isotropically Radiated Power (EIRP) is cast and
+        #summed once, when the site is created
+        received_power = site.eirp - \
             path_loss - \
             receiver.misc_losses + \
             receiver.gain - \
@@ -608,71 +1514,45 @@ class NetworkManager(object):
         """
         interference = []
 
-        x1_receiver, y1_receiver = transform_coordinates(
-            Proj(init='epsg:27700'),
-            Proj(init='epsg:4326'),
-            receiver.coordinates[0],
-            receiver.coordinates[1]
-            )
-
-        #calculate interference from other power sources
-        for interference_site in closest_sites:
-
-            #get distance
-            x2_interference = interference_site.coordinates[0]
-            y2_interference = interference_site.coordinates[1]
-
-            x2_interference, y2_interference = transform_coordinates(
-                Proj(init='epsg:27700'),
-                Proj(init='epsg:4326'),
-                interference_site.coordinates[0],
-                interference_site.coordinates[1]
-                )
-
-            Geo = Geodesic.WGS84
+        #get distance to other power sources
+        distances = [
+            int(distance) for distance in
+            np.round(self.link_distances(closest_sites, receiver), 0)
+            ]
 
-            i_strt_distance = Geo.Inverse(
-                y2_interference,
-                x2_interference,
-                y1_receiver,
-                x1_receiver,
-                )
+        types_of_sight = [randomly_select_los() for site in closest_sites]
 
-            interference_strt_distance = int(
-                round(i_strt_distance['s12'], 0)
-                )
+        if not distances:
+            return interference
 
-            ant_height = 20
-            ant_type =  'macro'
-            building_height = 20
-            street_width = 20
-            type_of_sight = randomly_select_los()
-            above_roof = 0
-            indoor = receiver.indoor
+        ant_height = 20
+        ant_type =  'macro'
+        building_height = 20
+        street_width = 20
+        above_roof = 0
 
-            path_loss = path_loss_calculator(
-                frequency,
-                interference_strt_distance,
-                ant_height,
-                ant_type,
-                building_height,
-                street_width,
-                environment,
-                type_of_sight,
-                receiver.ue_height,
-                above_roof,
-                indoor,
-                )
+        #evaluate all interfering links in one call
+        path_losses = path_loss_calculator_batch(
+            frequency,
+            distances,
+            ant_height,
+            ant_type,
+            building_height,
+            street_width,
+            environment,
+            types_of_sight,
+            receiver.ue_height,
+            above_roof,
+            receiver.indoor,
+            )
 
-            # print('path loss for {} to {} is {}'.format(
-            #     receiver.id, interference_site.id, path_loss)
-            #     )
+        for interference_site, path_loss in zip(closest_sites, path_losses):
 
             #calc interference from other cells
             received_interference = self.calc_received_power(
                 interference_site,
                 receiver,
-                path_loss
+                float(path_loss)
                 )
 
             #add cell interference to list
@@ -713,22 +1593,31 @@ class NetworkManager(object):
         """
         Calculate the Signal-to-Interference-plus-Noise-Ration (SINR).
 
-        """
-        raw_received_power = 10**received_power
+        Works on a single receiver or on arrays of receivers, with the
+        interference values along the last axis. The linear sums are
+        taken in the log domain with `np.logaddexp`, so very weak or
+        very strong signals do not underflow or overflow.
 
-        interference_values = []
-        for value in interference:
-            output_value = 10**value
-            interference_values.append(output_value)
+        """
+        received_power = np.asarray(received_power, dtype=float)
+        interference = np.asarray(interference, dtype=float)
 
-        raw_sum_of_interference = sum(interference_values)
-        raw_noise = 10**noise
+        #10**x == e**(x * ln10)
+        ln10 = np.log(10)
 
-        sinr = np.log10(
-            raw_received_power / (raw_sum_of_interference + raw_noise)
+        interference_and_noise = np.logaddexp(
+            np.logaddexp.reduce(
+                interference * ln10, axis=-1, initial=-np.inf
+                ),
+            noise * ln10
             )
 
-        return round(sinr, 2)
+        sinr = np.round(received_power - interference_and_noise / ln10, 2)
+
+        if sinr.ndim == 0:
+            return float(sinr)
+
+        return sinr
 
     def modulation_scheme_and_coding_rate(self, sinr,
         generation, modulation_and_coding_lut):
@@ -736,18 +1625,25 @@ class NetworkManager(object):
         Uses the SINR to allocate a modulation scheme and affliated
         coding rate.
 
+        Works on a single SINR value or an array of them. The lookup
+        table is compiled once per generation into sorted SINR
+        thresholds, which are searched with `np.searchsorted`.
+
         """
-        spectral_efficiency = 0
+        thresholds, spectral_efficiencies = modulation_and_coding_table(
+            modulation_and_coding_lut, generation
+            )
 
-        for lower, upper in pairwise(modulation_and_coding_lut):
-            if lower[0] and upper[0] == generation:
+        #below the first threshold the position is -1, which takes the
+        #final 0 entry, as do SINRs at or above the last threshold
+        position = np.searchsorted(
+            thresholds, np.asarray(sinr, dtype=float), side='right'
+            ) - 1
 
-                lower_sinr = lower[5]
-                upper_sinr = upper[5]
+        spectral_efficiency = spectral_efficiencies[position]
 
-                if sinr >= lower_sinr and sinr < upper_sinr:
-                    spectral_efficiency = lower[4]
-                    break
+        if spectral_efficiency.ndim == 0:
+            return float(spectral_efficiency)
 
         return spectral_efficiency
 
@@ -773,17 +1669,13 @@ class NetworkManager(object):
             return 0
 
         area_geometry = ([(d.geometry) for d in self.area.values()][0])
-
-        idx = index.Index()
-
-        for site in self.sites.values():
-            idx.insert(0, Point(site.coordinates).bounds, site)
+        area_shape = shape(area_geometry)
 
         sites_in_area = []
 
-        for n in idx.intersection(shape(area_geometry).bounds, objects=True):
+        for n in self._site_index.intersection(area_shape.bounds, objects=True):
             point = Point(n.object.coordinates)
-            if shape(area_geometry).contains(point):
+            if area_shape.contains(point):
                 sites_in_area.append(n.object)
 
         return sites_in_area
@@ -875,6 +1767,75 @@ class NetworkManager(object):
 
         return total_power_watts
 
+class RecordTable(object):
+    """
+    A growable NumPy structured array, used as a columnar store for
+    sites and receivers.
+
+    Rows are appended in insertion order. Capacity doubles as needed,
+    so appending is amortised O(1) and the columns stay contiguous for
+    vectorised link budget code.
+
+    Parameters
+    ----------
+    dtype : numpy.dtype
+        Structured dtype giving the table columns.
+    capacity : int
+        Initial number of rows allocated.
+
+    """
+    def __init__(self, dtype, capacity=16):
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(capacity, dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, column):
+        return self.records[column]
+
+    @property
+    def records(self):
+        """
+        numpy.ndarray: A view of the filled rows.
+
+        """
+        return self._data[:self._size]
+
+    def append(self, record):
+        """
+        Append a row, given as a tuple in column order, and return its
+        position.
+
+        """
+        if self._size == len(self._data):
+            grown = np.zeros(max(2 * len(self._data), 16), dtype=self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size] = record
+        self._size += 1
+
+        return self._size - 1
+
+    def update(self, row, record):
+        """
+        Overwrite the row at the given position.
+
+        """
+        if not 0 <= row < self._size:
+            raise IndexError('Row {} is out of range'.format(row))
+
+        self._data[row] = record
+
+    def clear(self):
+        """
+        Remove all rows, keeping the allocated capacity.
+
+        """
+        self._size = 0
+
 class Area(object):
     """
     The geographic area which holds all sites and receivers.
@@ -907,6 +1868,11 @@ class Transmitter(object):
     A site object is specific site.
 
     """
+    __slots__ = (
+        'id', 'coordinates', 'geometry', 'ant_type', 'ant_height', 'power',
+        'gain', 'losses', 'eirp'
+        )
+
     def __init__(self, data):
         #id and geographic info
         self.id = data['properties']['sitengr']
@@ -914,10 +1880,12 @@ class Transmitter(object):
         self.geometry = data['geometry']
         #antenna properties
         self.ant_type = 'macro'
-        self.ant_height = TX_HEIGHT_BASE
-        self.power = TX_POWER
-        self.gain = TX_GAIN
-        self.losses = TX_LOSSES
+        self.ant_height = float(TX_HEIGHT_BASE)
+        self.power = float(TX_POWER)
+        self.gain = float(TX_GAIN)
+        self.losses = float(TX_LOSSES)
+        #Equivalent Isotropically Radiated Power (EIRP)
+        self.eirp = self.power + self.gain - self.losses
 
     def __repr__(self):
         return "<Transmitter id:{}>".format(self.id)
@@ -928,25 +1896,33 @@ class Receiver(object):
     connect to a site.
 
     """
+    __slots__ = (
+        'id', 'coordinates', 'misc_losses', 'gain', 'losses', 'ue_height',
+        'indoor'
+        )
+
     def __init__(self, data):
         #id and geographic info
         self.id = data['properties']['ue_id']
         #self.site_id = data['properties']['sitengr']
         self.coordinates = data['geometry']["coordinates"]
         #parameters
-        self.misc_losses = data['properties']['misc_losses']
-        self.gain = data['properties']['gain']
-        self.losses = data['properties']['losses']
-        self.ue_height = data['properties']['ue_height']
-        self.indoor = data['properties']['indoor']
+        self.misc_losses = float(data['properties']['misc_losses'])
+        self.gain = float(data['properties']['gain'])
+        self.losses = float(data['properties']['losses'])
+        self.ue_height = float(data['properties']['ue_height'])
+        self.indoor = bool(data['properties']['indoor'])
 
     def __repr__(self):
         return "<Receiver id:{}>".format(self.id)
 
-def randomly_select_los():
+def randomly_select_los(rng=None):
 
-    np.random.seed(42)
-    number = round(np.random.rand(1,1)[0][0], 2)
+    if rng is None:
+        np.random.seed(42)
+        number = round(np.random.rand(1,1)[0][0], 2)
+    else:
+        number = round(rng.random(), 2)
     if number > 0.5:
         los = 'los'
     else:
@@ -954,12 +1930,84 @@ def randomly_select_los():
 
     return los
 
+def randomly_select_los_batch(shape, rng=None):
+    """
+    Vectorised equivalent of `randomly_select_los`, returning boolean
+    line of sight flags.
+
+    If rng is None every flag takes the legacy seed 42 value, otherwise
+    one independent draw is made per link.
+
+    """
+    if rng is None:
+        number = round(np.random.RandomState(42).rand(), 2)
+        return np.full(shape, number > 0.5)
+
+    return np.round(rng.random(shape), 2) > 0.5
+
 def transform_coordinates(old_proj, new_proj, x, y):
 
     new_x, new_y = transform(old_proj, new_proj, x, y)
 
     return new_x, new_y
 
+def get_transformer(source_crs='epsg:27700', target_crs='epsg:4326'):
+    """
+    Return a reusable coordinate transformer, built once per pair of
+    coordinate reference systems.
+
+    Coordinates are always handled in (x, y) / (lon, lat) order.
+
+    """
+    return _cached_transformer(source_crs.lower(), target_crs.lower())
+
+@lru_cache(maxsize=None)
+def _cached_transformer(source_crs, target_crs):
+
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+def project_coordinates(coordinates, source_crs='epsg:27700',
+    target_crs='epsg:4326'):
+    """
+    Project a list of (x, y) coordinates in a single bulk call.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The projected x (longitude) and y (latitude) values.
+
+    """
+    coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+
+    transformer = get_transformer(source_crs, target_crs)
+
+    new_x, new_y = transformer.transform(coordinates[:, 0], coordinates[:, 1])
+
+    return np.asarray(new_x), np.asarray(new_y)
+
+def planar_distance(x1, y1, x2, y2):
+    """
+    Straight line distance between projected (British National Grid)
+    coordinates, in metres. Accepts scalars or arrays.
+
+    """
+    return np.hypot(np.subtract(x1, x2), np.subtract(y1, y2))
+
+def geodesic_distance(lon1, lat1, lon2, lat2):
+    """
+    Distance along the WGS84 ellipsoid between geographic coordinates,
+    in metres. Accepts scalars or arrays.
+
+    """
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        np.asarray(lon1, dtype=float), np.asarray(lat1, dtype=float),
+        np.asarray(lon2, dtype=float), np.asarray(lat2, dtype=float)
+        )
+
+    azimuth_forward, azimuth_back, distance = GEOD.inv(lon1, lat1, lon2, lat2)
+
+    return np.asarray(distance)
+
 def obtain_threshold_values(results, percentile):
     """
     Get the threshold capacity based on a given percentile.
@@ -1004,87 +2052,120 @@ def pairwise(iterable):
     next(b, None)
     return zip(a, b)
 
+def modulation_and_coding_table(modulation_and_coding_lut, generation):
+    """
+    Compile the lookup table rows of one generation into SINR
+    thresholds and the spectral efficiency applying from each threshold
+    up to the next.
+
+    The result follows the original pairwise scan exactly: a SINR takes
+    the spectral efficiency of the first pair of rows bracketing it, and
+    SINRs below the first or at or above the last row of the generation
+    are given 0. Compiled tables are cached.
+
+    Returns
+    -------
+    tuple
+        The sorted thresholds and the spectral efficiency from each
+        threshold up to the next. The last entry is always 0.
+
+    """
+    return _compile_modulation_and_coding_table(
+        tuple(tuple(row) for row in modulation_and_coding_lut), generation
+        )
+
+@lru_cache(maxsize=None)
+def _compile_modulation_and_coding_table(modulation_and_coding_lut,
+    generation):
+
+    intervals = [
+        (lower[5], upper[5], lower[4])
+        for lower, upper in pairwise(modulation_and_coding_lut)
+        if lower[0] and upper[0] == generation
+        ]
+
+    thresholds = np.unique(
+        [value for lower, upper, _ in intervals for value in (lower, upper)]
+        ).astype(float)
+
+    spectral_efficiencies = np.zeros(max(len(thresholds), 1))
+
+    #each span between thresholds lies wholly inside or outside a pair
+    for position, start in enumerate(thresholds[:-1]):
+        for lower, upper, spectral_efficiency in intervals:
+            if lower <= start < upper:
+                spectral_efficiencies[position] = spectral_efficiency
+                break
+
+    thresholds.flags.writeable = False
+    spectral_efficiencies.flags.writeable = False
+
+    return thresholds, spectral_efficiencies
+
 def calculate_network_efficiency(spectral_efficency, energy_consumption):
 
     if spectral_efficency == 0 or energy_consumption == 0:
         network_efficiency = 0
     else:
         network_efficiency = (
-            float(spectral_efficency) // float(MANAGER.energy_consumption(SECTORISATION))
+            float(spectral_efficency) // float(energy_consumption)
             )
 
     return network_efficiency
 
 def write_results(results, frequency, bandwidth, site_density,
-    r_density, postcode_sector_name):
-
-    suffix = 'freq_{}_bandwidth_{}_density_{}'.format(
-        frequency, bandwidth, site_density
-        )
-
-    directory = os.path.join(DATA_RESULTS, postcode_sector_name)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    r_density, postcode_sector_name, sink=None):
+    """
+    Write the result for every receiver.
 
-    filename = '{}.csv'.format(suffix)
-    directory = os.path.join(directory, filename)
+    If a `ResultsSink` is given, the rows are buffered in it and written
+    when it is flushed. Otherwise they are added to the results file
+    straight away.
 
-    if not os.path.exists(directory):
-        results_file = open(directory, 'w', newline='')
-        results_writer = csv.writer(results_file)
-        results_writer.writerow(
-            ('frequency','bandwidth','site_density','r_density',
-            'sinr','throughput')
+    """
+    if sink is None:
+        suffix = 'freq_{}_bandwidth_{}_density_{}'.format(
+            frequency, bandwidth, site_density
             )
-    else:
-        results_file = open(directory, 'a', newline='')
-        results_writer = csv.writer(results_file)
+        sink = ResultsSink(
+            os.path.join(DATA_RESULTS, postcode_sector_name,
+            '{}.{}'.format(suffix, RESULTS_FORMAT)),
+            RESULTS_FIELDS, append=True
+            )
+        write_results(
+            results, frequency, bandwidth, site_density, r_density,
+            postcode_sector_name, sink
+            )
+        sink.flush()
+        return
 
     # output and report results for this timestep
     for result in results:
         # Output metrics
-        results_writer.writerow(
+        sink.append(
             (frequency,
             bandwidth,
             site_density,
             r_density,
             result['sinr'],
-            result['estimated_capacity'])
+            result['capacity_mbps'])
             )
 
-    results_file.close()
-
 def write_lookup_table(
     cell_edge_spectral_efficency, cell_edge_sinr, area_capacity_mbps,
     network_efficiency, environment, operator, technology,frequency,
-    bandwidth, mast_height, area_site_density, area_isd, postcode_sector_name):
-
-    suffix = 'lookup_table_{}'.format(postcode_sector_name)
-
-    directory = os.path.join(DATA_RESULTS, postcode_sector_name)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    filename = '{}.csv'.format(suffix)
-    directory = os.path.join(directory, filename)
+    bandwidth, mast_height, area_site_density, area_isd, postcode_sector_name,
+    sink=None):
+    """
+    Write one row of the lookup table for a postcode sector.
 
-    if not os.path.exists(directory):
-        lut_file = open(directory, 'w', newline='')
-        lut_writer = csv.writer(lut_file)
-        lut_writer.writerow(
-            ('environment', 'operator', 'technology',
-            'frequency', 'bandwidth', 'mast_height',
-            'area_site_density', 'area_isd',
-            'cell_edge_spectral_efficency', 'cell_edge_sinr',
-            'area_capacity_mbps', 'network_efficiency')
-            )
-    else:
-        lut_file = open(directory, 'a', newline='')
-        lut_writer = csv.writer(lut_file)
+    If a `ResultsSink` is given, the row is buffered in it and written
+    when it is flushed. Otherwise it is added to the lookup table file
+    straight away.
 
-    # output and report results for this timestep
-    lut_writer.writerow(
-        (environment,
+    """
+    row = (
+        environment,
         operator,
         technology,
         frequency,
@@ -1095,10 +2176,39 @@ def write_lookup_table(
         cell_edge_spectral_efficency,
         cell_edge_sinr,
         area_capacity_mbps,
-        network_efficiency)
+        network_efficiency,
+        )
+
+    if sink is None:
+        sink = ResultsSink(
+            lookup_table_path(postcode_sector_name), LOOKUP_TABLE_FIELDS,
+            append=True
+            )
+        sink.append(row)
+        sink.flush()
+    else:
+        sink.append(row)
+
+def timing_report_path(postcode_sector_name):
+    """
+    Return the path of the timing report written for a postcode sector
+    when profiling is switched on.
+
+    """
+    return os.path.join(
+        DATA_RESULTS, postcode_sector_name,
+        'timings_{}.json'.format(postcode_sector_name)
         )
 
-    lut_file.close()
+def lookup_table_path(postcode_sector_name):
+    """
+    Return the path of the lookup table written for a postcode sector.
+
+    """
+    return os.path.join(
+        DATA_RESULTS, postcode_sector_name,
+        'lookup_table_{}.{}'.format(postcode_sector_name, RESULTS_FORMAT)
+        )
 
 def write_shapefile(data, postcode_sector_name, filename):
 
@@ -1282,22 +2392,59 @@ MODULATION_AND_CODING_LUT =[
     ('5G', 15, '256QAM', 948, 7.4063, 22.7),
 ]
 
-if __name__ == "__main__":
+def run_postcode_sector(postcode_sector_name, seed=SEED, profile=None,
+    result_cache=DEFAULT_RESULT_CACHE, site_tile=None):
+    """
+    Run the system simulation for a single postcode sector and write its
+    lookup table.
 
-    if len(sys.argv) != 2:
-        print("Error: no postcode sector provided")
-        #print("Usage: {} <postcode>".format(os.path.basename(__file__)))
-        exit(-1)
+    Any lookup table left by an earlier, interrupted run is replaced, so
+    a sector can safely be rerun.
+
+    Parameters
+    ----------
+    postcode_sector_name : string
+        The postcode sector id, e.g. 'CB11'.
+    seed : int
+        Root seed for the sector's random streams.
+    profile : bool, optional
+        Write a JSON report of the time spent in each stage to
+        `timing_report_path`. Defaults to PROFILE.
+    result_cache : ResultCache, optional
+        If the sector has been run before with identical inputs (sector
+        boundary, sites, lookup data, seed and `simulation_parameters`),
+        its cached lookup table is copied rather than running the
+        simulation again. Defaults to `default_result_cache()`, and
+        None runs the simulation without a cache.
+    site_tile : SiteTile, optional
+        Sites shared with neighbouring sectors, see
+        `run_postcode_sector_tile`. Results are the same as without it.
 
-    print('Process ' + sys.argv[1])
-    postcode_sector_name = sys.argv[1]
-    postcode_sector_abbr = sys.argv[1].replace('postcode_sector_', '')
+    Returns
+    -------
+    string
+        Path of the lookup table written.
+
+    """
+    output_path = lookup_table_path(postcode_sector_name)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    if profile is None:
+        profile = PROFILE
+
+    PROFILER = Profiler(postcode_sector_name) if profile else NULL_PROFILER
+
+    #rows are written together once the sector is complete
+    LOOKUP_TABLE = ResultsSink(output_path, LOOKUP_TABLE_FIELDS)
+
+    with PROFILER.stage('read_sector'):
 
-    #get postcode sector
-    geojson_postcode_sector = read_postcode_sector(postcode_sector_name)
+        #get postcode sector
+        geojson_postcode_sector = read_postcode_sector(postcode_sector_name)
 
-    #get local authority district
-    local_authority_ids = get_local_authority_ids(geojson_postcode_sector)
+        #get local authority district
+        local_authority_ids = get_local_authority_ids(geojson_postcode_sector)
 
     #add lad information to postcode sectors
     geojson_postcode_sector['properties']['local_authority_ids'] = (
@@ -1313,89 +2460,174 @@ if __name__ == "__main__":
     environment = determine_environment(postcode_sector_lut)
 
     #get list of sites
-    TRANSMITTERS = get_sites(geojson_postcode_sector)
+    with PROFILER.stage('get_sites'):
+        TRANSMITTERS = get_sites(geojson_postcode_sector, site_tile)
+
+    PROFILER.count('sites', len(TRANSMITTERS))
+
+    if result_cache is DEFAULT_RESULT_CACHE:
+        result_cache = default_result_cache()
+
+    if result_cache is not None:
+
+        with PROFILER.stage('result_cache'):
+
+            fingerprint = input_fingerprint({
+                'postcode_sector': postcode_sector_name,
+                'geometry': shape(geojson_postcode_sector['geometry']).wkb,
+                'local_authority_ids': local_authority_ids,
+                'postcode_sector_lut': postcode_sector_lut,
+                'environment': environment,
+                'sites': TRANSMITTERS,
+                'seed': seed,
+                'parameters': simulation_parameters(),
+                })
+
+            cached = result_cache.restore(fingerprint, output_path)
+
+        if cached:
+
+            print('{} unchanged, using cached results'.format(
+                postcode_sector_name
+                ))
+
+            PROFILER.count('cached', 1)
+            if PROFILER.enabled:
+                PROFILER.write_report(timing_report_path(postcode_sector_name))
+
+            return output_path
+
     # {'operator': 'O2', 'sitengr': 'TL4491058710', 'ant_height': '5',
     # 'tech': 'GSM', 'freq': '900', 'type': '3.2', 'power': 30,
     # 'gain': 18, 'losses': 2}
 
+    PATH_LOSS = default_path_loss_tables()
+
+    #independent random streams per postcode sector
+    STREAMS = RandomStreams(seed).spawn(postcode_sector_name)
+
     #generate receivers
-    RECEIVERS = generate_receivers(
-        geojson_postcode_sector,
-        postcode_sector_lut,
-        ITERATIONS
+    with PROFILER.stage('generate_receivers'):
+        RECEIVERS = generate_receivers(
+            geojson_postcode_sector,
+            postcode_sector_lut,
+            ITERATIONS,
+            STREAMS.spawn('receivers').generator()
+            )
+
+    #load system model with data
+    with PROFILER.stage('load_network'):
+        MANAGER = NetworkManager(
+            geojson_postcode_sector, TRANSMITTERS, RECEIVERS,
+            GEODESIC_DISTANCES, INTERFERENCE_RADIUS, INTERFERENCE_POWER_FLOOR,
+            PROFILER,
+            site_tile.lonlat(project_coordinates)
+            if site_tile is not None and GEODESIC_DISTANCES else None
+            )
+
+    #calculate site density
+    starting_site_density = MANAGER.site_density()
+    # print('starting_site_density {}'.format(starting_site_density))
+    # my_range = np.linspace(
+    #     starting_site_density, DESIRED_TRANSMITTER_DENSITY, 10
+    #     )
+    # site_densities = list(set([round(x) for x in my_range]))
+    site_densities = np.linspace(
+        starting_site_density, DESIRED_TRANSMITTER_DENSITY, DENSITY_STEPS
         )
 
-    idx = 0
+    postcode_sector_object = [a for a in MANAGER.area.values()][0]
+
+    postcode_sector_area = postcode_sector_object.area/1e6
+
+    for idx, site_density in enumerate(site_densities):
+
+        current_site_density = MANAGER.site_density()
 
-    for mast_height in MAST_HEIGHT:
-        for operator, technology, frequency, bandwidth, generation in SPECTRUM_PORTFOLIO:
+        number_of_new_sites = int(
+            (site_density - current_site_density) * postcode_sector_area
+        )
+
+        print('number_of_new_sites {}'.format(number_of_new_sites))
+        with PROFILER.stage('deploy_sites'):
+            NEW_TRANSMITTERS = find_and_deploy_new_site(
+                MANAGER.sites, number_of_new_sites,
+                geojson_postcode_sector, idx,
+                STREAMS.spawn('sites', idx).generator()
+                )
 
-            #load system model with data
-            MANAGER = NetworkManager(
-                geojson_postcode_sector, TRANSMITTERS, RECEIVERS
+            MANAGER.build_new_assets(
+                NEW_TRANSMITTERS, geojson_postcode_sector
                 )
 
-            #calculate site density
-            starting_site_density = MANAGER.site_density()
-            # print('starting_site_density {}'.format(starting_site_density))
-            # my_range = np.linspace(
-            #     starting_site_density, DESIRED_TRANSMITTER_DENSITY, 10
-            #     )
-            # site_densities = list(set([round(x) for x in my_range]))
-            site_densities = [starting_site_density, 10]
+        PROFILER.count('new_sites', len(NEW_TRANSMITTERS))
+
+        #geometry only depends on the sites and receivers, so it is
+        #shared by every spectrum band and mast height below
+        MANAGER.build_distance_matrix()
 
-            postcode_sector_object = [a for a in MANAGER.area.values()][0]
+        site_density = MANAGER.site_density()
+        # print('site_density is {}'.format(site_density))
 
-            postcode_sector_area = postcode_sector_object.area/1e6
+        isd = 'tbc'
 
-            idx = 0
+        energy_consumption = MANAGER.energy_consumption(SECTORISATION)
 
-            for site_density in site_densities:
+        for mast_height in MAST_HEIGHT:
+            for operator, technology, frequency, bandwidth, generation in SPECTRUM_PORTFOLIO:
 
                 print("{} GHz {}m Height {} Density".format(
                     frequency, mast_height, round(site_density, 4)
                     ))
 
-                current_site_density = MANAGER.site_density()
+                rng = STREAMS.spawn(
+                    'link_budget', idx, mast_height, frequency
+                    ).generator()
 
-                number_of_new_sites = int(
-                    (site_density - current_site_density) * postcode_sector_area
-                )
+                with PROFILER.stage('link_budget'):
 
-                print('number_of_new_sites {}'.format(number_of_new_sites))
-                NEW_TRANSMITTERS = find_and_deploy_new_site(
-                    MANAGER.sites, number_of_new_sites,
-                    geojson_postcode_sector, idx
-                    )
+                    if MONTE_CARLO:
 
-                MANAGER.build_new_assets(
-                    NEW_TRANSMITTERS, geojson_postcode_sector
-                    )
+                        estimates = MANAGER.estimate_link_budget_monte_carlo(
+                            frequency, bandwidth, generation, mast_height,
+                            environment, MODULATION_AND_CODING_LUT,
+                            postcode_sector_lut, PERCENTILE, rng, PATH_LOSS,
+                            batch_size=MONTE_CARLO_BATCH_SIZE,
+                            min_iterations=MIN_ITERATIONS,
+                            max_iterations=MAX_ITERATIONS,
+                            sinr_tolerance=SINR_TOLERANCE,
+                            capacity_tolerance=CAPACITY_TOLERANCE
+                            )
 
-                results = MANAGER.estimate_link_budget(
-                    frequency, bandwidth, generation, mast_height,
-                    environment, MODULATION_AND_CODING_LUT
-                    )
+                        print('{} iterations, converged: {}'.format(
+                            estimates['iterations'], estimates['converged']
+                            ))
 
-                site_density = MANAGER.site_density()
-                # print('site_density is {}'.format(site_density))
+                        spectral_efficency = estimates['spectral_efficiency']
+                        sinr = estimates['sinr']
+                        capacity_mbps = estimates['capacity_mbps']
 
-                isd = 'tbc'
+                    else:
 
-                r_density = MANAGER.receiver_density()
+                        #only receivers near newly built sites are recomputed
+                        results = MANAGER.estimate_link_budget(
+                            frequency, bandwidth, generation, mast_height,
+                            environment, MODULATION_AND_CODING_LUT, rng,
+                            INCREMENTAL_LINK_BUDGETS, PATH_LOSS
+                            )
 
-                # write_results(results, frequency, bandwidth, site_density,
-                #     r_density, postcode_sector_name
-                #     )
+                        # write_results(results, frequency, bandwidth, site_density,
+                        #     r_density, postcode_sector_name
+                        #     )
 
-                #find percentile values
-                spectral_efficency, sinr, capacity_mbps = (
-                    obtain_threshold_values(results, PERCENTILE)
-                    )
+                        #find percentile values
+                        spectral_efficency, sinr, capacity_mbps = (
+                            obtain_threshold_values(results, PERCENTILE)
+                            )
 
                 network_efficiency = calculate_network_efficiency(
                     spectral_efficency,
-                    MANAGER.energy_consumption(SECTORISATION)
+                    energy_consumption
                     )
 
                 area_capacity_mbps = capacity_mbps * SECTORISATION
@@ -1405,17 +2637,74 @@ if __name__ == "__main__":
                 # print('capacity_mbps is {}'.format(capacity_mbps))
 
                 #env, frequency, bandwidth, site_density, capacity
-                write_lookup_table(
-                    spectral_efficency, sinr, area_capacity_mbps,
-                    network_efficiency, environment, operator, technology,
-                    frequency, bandwidth, mast_height, site_density, isd,
-                    postcode_sector_name
-                    )
-
-                idx += 1
+                with PROFILER.stage('write'):
+                    write_lookup_table(
+                        spectral_efficency, sinr, area_capacity_mbps,
+                        network_efficiency, environment, operator, technology,
+                        frequency, bandwidth, mast_height, site_density, isd,
+                        postcode_sector_name, LOOKUP_TABLE
+                        )
 
                 #print('------------------------------------')
 
+    with PROFILER.stage('write'):
+        LOOKUP_TABLE.flush()
+
+        if result_cache is not None:
+            result_cache.store(fingerprint, output_path)
+
+    if PROFILER.enabled:
+        PROFILER.write_report(timing_report_path(postcode_sector_name))
+
+    return output_path
+
+def run_postcode_sector_tile(postcode_sector_names, seed=SEED, profile=None,
+    result_cache=DEFAULT_RESULT_CACHE):
+    """
+    Run a block of neighbouring postcode sectors, e.g. those in one
+    postcode area, in one process.
+
+    The sites around all the sectors are loaded and projected once, see
+    `load_site_tile`, and each sector's receivers are then run against
+    them. Each sector's results are the same as from
+    `run_postcode_sector`.
+
+    Returns
+    -------
+    OrderedDict
+        Path of the lookup table written, keyed by postcode sector.
+
+    """
+    site_tile = load_site_tile([
+        read_postcode_sector(postcode_sector_name)
+        for postcode_sector_name in postcode_sector_names
+        ])
+
+    print('{} sites shared by {} postcode sectors'.format(
+        len(site_tile), len(postcode_sector_names)
+        ))
+
+    return OrderedDict(
+        (postcode_sector_name, run_postcode_sector(
+            postcode_sector_name, seed, profile, result_cache, site_tile
+            ))
+        for postcode_sector_name in postcode_sector_names
+        )
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < 2:
+        print("Error: no postcode sector provided")
+        #print("Usage: {} <postcode>".format(os.path.basename(__file__)))
+        exit(-1)
+
+    print('Process ' + ', '.join(sys.argv[1:]))
+
+    if len(sys.argv) == 2:
+        run_postcode_sector(sys.argv[1])
+    else:
+        run_postcode_sector_tile(sys.argv[1:])
+
 #     # print('write buildings')
 #     # write_shapefile(buildings,  postcode_sector_name, 'buildings.shp')
 
@@ -0,0 +1,52 @@
+"""
+Build the postcode sector index used by the system simulator.
+
+Stores every postcode sector boundary, keyed by sector id, together with
+the local authority districts it intersects, so that each simulation
+run can look its sector up directly rather than scanning shapefiles.
+
+"""
+import os
+import glob
+import configparser
+
+from digital_comms.mobile_network.sector_index import build_sector_index
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+
+#####################################
+# setup file locations and data files
+#####################################
+
+DATA_RAW_SHAPES = os.path.join(BASE_PATH, 'raw', 'd_shapes')
+DATA_INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
+
+####################################
+# run script
+####################################
+
+if __name__ == "__main__":
+
+    #postcode area files, e.g. cb.shp, not the national _postcode_sectors.shp
+    postcode_sector_shapefiles = sorted(
+        path for path in glob.glob(
+            os.path.join(DATA_RAW_SHAPES, 'postcode_sectors', '*.shp')
+            )
+        if not os.path.basename(path).startswith('_')
+        )
+
+    print('building index from {} shapefiles'.format(
+        len(postcode_sector_shapefiles)
+        ))
+
+    count = build_sector_index(
+        os.path.join(
+            DATA_INTERMEDIATE, 'postcode_sector_index', 'postcode_sectors.sqlite'
+            ),
+        postcode_sector_shapefiles,
+        os.path.join(DATA_RAW_SHAPES, 'lad_uk_2016-12', 'lad_uk_2016-12.shp')
+        )
+
+    print('indexed {} postcode sectors'.format(count))
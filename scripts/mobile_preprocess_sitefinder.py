@@ -6,6 +6,8 @@ from shapely.ops import unary_union, cascaded_union
 import fiona
 from collections import OrderedDict
 
+from digital_comms.mobile_network.site_store import compile_site_store
+
 CONFIG = configparser.ConfigParser()
 CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
 BASE_PATH = CONFIG['file_locations']['base_path']
@@ -202,3 +204,10 @@ if __name__ == "__main__":
 
     #write csv
     csv_writer(points, 'sitefinder_processed.csv')
+
+    #compile the memory-mappable site store used by the system simulator
+    sitefinder_directory = os.path.join(BASE_PATH, 'intermediate', 'sitefinder')
+    compile_site_store(
+        os.path.join(sitefinder_directory, 'sitefinder_processed.csv'),
+        os.path.join(sitefinder_directory, 'sitefinder_processed.npy')
+        )
@@ -495,13 +495,13 @@ for pop_scenario, throughput_scenario, intervention_strategy in [
         # accumulate decisions
         assets += interventions_built
         print(interventions_built)
-        # simulate with decisions
-        system = NetworkManager(
-            lads, postcode_sectors, assets,
-            capacity_lookup_table, clutter_lookup,
-            service_obligation_capacity, traffic,
-            market_share
+        # simulate with decisions, only re-evaluating the postcode
+        # sectors whose population or assets changed
+        system.update_population(
+            population_by_scenario_year_pcd[pop_scenario][year],
+            user_throughput_by_scenario_year[throughput_scenario][year]
             )
+        system.apply_interventions(interventions_built)
 
         cost_by_lad = defaultdict(int)
         cost_by_pcd = defaultdict(int)
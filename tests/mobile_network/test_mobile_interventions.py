@@ -8,6 +8,8 @@ import pytest
 from digital_comms.mobile_network.interventions import(
     decide_interventions,
     _area_satisfied,
+    INTERVENTIONS,
+    SectorCapacity,
     )
 from digital_comms.mobile_network.model import (
     NetworkManager, PostcodeSector
@@ -112,6 +114,47 @@ def test_decide_interventions(basic_system, setup_traffic,
 
 
 
+def test_sector_capacity(basic_system, setup_traffic, setup_market_share):
+
+    area = basic_system.postcode_sectors['CB11']
+    macro_site = INTERVENTIONS['build_macro_site']['assets_to_build'][0]
+
+    area_capacity = SectorCapacity(area, 10)
+    assert area_capacity.capacity() == area.capacity
+
+    #matches a postcode sector rebuilt with the added assets
+    built_interventions = [macro_site] * 3
+    test_area = PostcodeSector(
+        {
+            "id": area.id,
+            "lad_id": area.lad_id,
+            "population": area.population,
+            "area": area.area,
+            "user_throughput": area.user_throughput,
+        },
+        area.assets + built_interventions,
+        area._capacity_lookup_table, area._clutter_lookup,
+        10, setup_traffic, setup_market_share
+        )
+
+    assert area_capacity.capacity(macro_site, 3) == test_area.capacity
+
+    area_capacity.update(built_interventions)
+    assert area_capacity.capacity() == test_area.capacity
+
+    #the fewest sites reaching the target, found without adding each
+    sites_needed = SectorCapacity(area, 10).sites_needed(macro_site)
+    assert area_capacity.capacity(macro_site, sites_needed - 3) >= 10
+    assert area_capacity.capacity(macro_site, sites_needed - 4) < 10
+
+    assert not _area_satisfied(area, [], 10, setup_traffic, setup_market_share)
+    assert _area_satisfied(area, [macro_site] * sites_needed, 10,
+        setup_traffic, setup_market_share)
+
+    #capacity stops increasing beyond the lookup table
+    assert SectorCapacity(area, 1000).sites_needed(macro_site) is None
+
+
     # expected_result = [
     #     ('CB11', 1, 'carrier_700', 50917),
     #     ('CB11', 1, 'carrier_3500', 50917),
@@ -4,8 +4,13 @@ Test Mobile Network model.py
 Written by Edward J. Oughton
 
 """
+import pytest
+import numpy as np
+
 from digital_comms.mobile_network.model import (
-    NetworkManager, LAD, PostcodeSector, lookup_clutter_geotype
+    NetworkManager, LAD, PostcodeSector, CapacityEngine,
+    lookup_clutter_geotype, lookup_capacity, count_sites,
+    CapacityCurves, ClutterGeotypes
     )
 
 class TestNetworkManager():
@@ -21,6 +26,247 @@ class TestNetworkManager():
             setup_service_obligation_capacity,
             setup_traffic, setup_market_share)
 
+        engine = Manager.capacity_engine
+
+        for pcd_sector in Manager.postcode_sectors.values():
+            row = engine.index[pcd_sector.id]
+            assert pcd_sector.capacity == engine.capacity[row]
+            assert pcd_sector.demand == engine.demand[row]
+
+    def test_create_incomplete(self, setup_lad, setup_pcd_sector,
+        setup_assets, setup_capacity_lookup, setup_clutter_lookup,
+        setup_service_obligation_capacity, setup_traffic,
+        setup_market_share):
+
+        #sectors missing data are skipped
+        del setup_pcd_sector[0]['population']
+        setup_pcd_sector.append({
+            "id": "CB13", "lad_id": 1, "population": 100, "area": 0,
+            "user_throughput": 2,
+            })
+
+        Manager = NetworkManager(setup_lad, setup_pcd_sector, setup_assets,
+            setup_capacity_lookup, setup_clutter_lookup,
+            setup_service_obligation_capacity,
+            setup_traffic, setup_market_share)
+
+        assert list(Manager.postcode_sectors) == ['CB12']
+        assert list(Manager.capacity_engine.valid) == [False, True, False]
+
+
+    def test_update_population(self, setup_lad, setup_pcd_sector,
+        setup_assets, setup_capacity_lookup, setup_clutter_lookup,
+        setup_service_obligation_capacity, setup_traffic,
+        setup_market_share):
+
+        del setup_pcd_sector[0]['population']
+
+        Manager = NetworkManager(setup_lad, setup_pcd_sector, setup_assets,
+            setup_capacity_lookup, setup_clutter_lookup,
+            setup_service_obligation_capacity,
+            setup_traffic, setup_market_share)
+
+        assert list(Manager.postcode_sectors) == ['CB12']
+
+        changed = Manager.update_population({'CB11': 500, 'CB12': 200})
+
+        #only CB11 changed, and it now has the data it was missing
+        assert changed == ['CB11']
+        assert list(Manager.postcode_sectors) == ['CB11', 'CB12']
+        assert 'population' not in setup_pcd_sector[0]
+
+        changed = Manager.update_population({'CB12': 1000, 'CB99': 10}, 3)
+
+        assert changed == ['CB12']
+
+        setup_pcd_sector[0]['population'] = 500
+        setup_pcd_sector[1].update({'population': 1000, 'user_throughput': 3})
+
+        expected = NetworkManager(setup_lad, setup_pcd_sector, setup_assets,
+            setup_capacity_lookup, setup_clutter_lookup,
+            setup_service_obligation_capacity,
+            setup_traffic, setup_market_share)
+
+        for pcd_sector_id, pcd_sector in expected.postcode_sectors.items():
+            updated = Manager.postcode_sectors[pcd_sector_id]
+            assert updated.population == pcd_sector.population
+            assert updated.clutter_environment == (
+                pcd_sector.clutter_environment)
+            assert updated.capacity == pcd_sector.capacity
+            assert updated.demand == pcd_sector.demand
+
+        assert Manager.lads[1].population == 1500
+        assert Manager.lads[1].demand() == expected.lads[1].demand()
+
+    def test_apply_interventions(self, setup_lad, setup_pcd_sector,
+        setup_assets, setup_capacity_lookup, setup_clutter_lookup,
+        setup_service_obligation_capacity, setup_traffic,
+        setup_market_share):
+
+        Manager = NetworkManager(setup_lad, setup_pcd_sector, setup_assets,
+            setup_capacity_lookup, setup_clutter_lookup,
+            setup_service_obligation_capacity,
+            setup_traffic, setup_market_share)
+
+        unchanged = Manager.postcode_sectors['CB12']
+
+        built = [
+            {"pcd_sector": "CB11", "site_ngr": "new_macro_site",
+                "type": "macro_site", "frequency": ["700", "800", "2600"],
+                "sectors": 3},
+            {"pcd_sector": "CB11", "site_ngr": "small_cell_sites",
+                "type": "small_cell", "frequency": "3700", "sectors": 1},
+            ]
+
+        assert Manager.apply_interventions(built) == ['CB11']
+
+        assert Manager.postcode_sectors['CB12'] is unchanged
+        assert len(Manager.postcode_sectors['CB11'].assets) == 3
+        assert len(setup_assets) == 2
+
+        expected = NetworkManager(setup_lad, setup_pcd_sector,
+            setup_assets + built, setup_capacity_lookup,
+            setup_clutter_lookup, setup_service_obligation_capacity,
+            setup_traffic, setup_market_share)
+
+        assert Manager.postcode_sectors['CB11'].capacity == (
+            expected.postcode_sectors['CB11'].capacity)
+        assert Manager.lads[1].capacity() == expected.lads[1].capacity()
+
+
+class TestCapacityEngine():
+
+    def test_matches_postcode_sector(self, setup_capacity_lookup,
+        setup_clutter_lookup, setup_service_obligation_capacity,
+        setup_traffic, setup_market_share):
+
+        setup_capacity_lookup[("Suburban", "800", "2x10MHz")] = [
+            (0, 0), (1, 2), (1, 4), (2, 6)]
+        for frequency in ("700", "2600", "3500"):
+            setup_capacity_lookup[("Suburban", frequency, "2x10MHz")] = [
+                (0.5, 1), (3, 5)]
+
+        pcd_sectors = []
+        assets_by_pcd = {}
+
+        for number, (population, area) in enumerate([(100, 2), (2000, 2),
+            (20000, 2), (500, 0.25), (0, 1), (1564, 2)]):
+
+            pcd_sector_id = 'CB{}'.format(number)
+
+            pcd_sectors.append({
+                "id": pcd_sector_id, "lad_id": 1, "population": population,
+                "area": area, "user_throughput": number,
+                })
+
+            assets_by_pcd[pcd_sector_id] = [
+                {"frequency": ["800", "2600"], "sectors": 3 * (number % 3),
+                    "type": "macrocell_site"},
+                {"frequency": ["700", "800"], "sectors": 3,
+                    "type": "macro_site"},
+                {"frequency": "3700", "sectors": 1,
+                    "type": "small_cell"},
+                ][:number % 4]
+
+        engine = CapacityEngine.from_sectors(
+            pcd_sectors, assets_by_pcd, setup_capacity_lookup,
+            setup_clutter_lookup, setup_traffic, setup_market_share
+            )
+
+        assert len(engine) == 6
+        assert engine.valid.all()
+
+        for row, pcd_sector_data in enumerate(pcd_sectors):
+
+            pcd_sector = PostcodeSector(pcd_sector_data,
+                assets_by_pcd[pcd_sector_data['id']],
+                setup_capacity_lookup, setup_clutter_lookup,
+                setup_service_obligation_capacity,
+                setup_traffic, setup_market_share)
+
+            assert engine.clutter_environment(row) == (
+                pcd_sector.clutter_environment)
+            assert engine.capacity[row] == pcd_sector.capacity
+            assert engine.demand[row] == pcd_sector.demand
+            assert engine.capacity_margin[row] == pcd_sector.capacity_margin
+
+    def test_missing_lookup(self, setup_capacity_lookup,
+        setup_clutter_lookup, setup_traffic, setup_market_share):
+
+        #no suburban capacities in the lookup table
+        engine = CapacityEngine(['CB11', 'CB12'], [2, 2], [100, 2000],
+            [2, 2], np.zeros((2, 5)), setup_capacity_lookup,
+            setup_clutter_lookup, setup_traffic, setup_market_share)
+
+        assert list(engine.valid) == [True, False]
+        assert engine.clutter_environment(1) == 'Suburban'
+
+    def test_evaluate(self, setup_capacity_lookup, setup_clutter_lookup,
+        setup_traffic, setup_market_share):
+
+        engine = CapacityEngine(['CB11'], [2], [500], [2], [[1, 1, 0, 0, 0]],
+            setup_capacity_lookup, setup_clutter_lookup, setup_traffic,
+            setup_market_share)
+
+        assert round(engine.capacity[0], 2) == 1.83
+
+        engine.site_counts[0] = [2, 2, 2, 2, 0]
+        engine.evaluate()
+
+        assert round(engine.capacity[0], 2) == 7.33
+
+
+def test_count_sites(setup_assets):
+
+    assert count_sites(setup_assets) == [2, 2, 0, 0, 0]
+
+    assets = setup_assets + [
+        {"frequency": ["700", "800"], "sectors": 6, "type": "macro_site"},
+        {"frequency": "3700", "sectors": 1, "type": "small_cell"},
+        ]
+
+    assert count_sites(assets) == [4, 2, 2, 0, 1]
+
+def test_capacity_curves():
+
+    lookup_table = {('Urban', '800', '2x10MHz'): [(1, 2), (2, 4), (2, 5),
+        (4, 9)]}
+
+    curves = CapacityCurves(lookup_table)
+
+    densities = np.array([0, 1, 1.5, 2, 3, 4, 5])
+    expected = [
+        lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', density)
+        for density in densities
+        ]
+
+    assert list(curves.capacity(('Urban', '800', '2x10MHz'), densities)) == \
+        expected
+    assert [curves.capacity(('Urban', '800', '2x10MHz'), density)
+        for density in densities] == expected
+
+    #lookups are not cached, so changes to the table are seen
+    lookup_table[('Urban', '800', '2x10MHz')][2] = (2, 10)
+    assert lookup_capacity(
+        lookup_table, 'Urban', '800', '2x10MHz', 2
+        ) == 10
+
+def test_clutter_geotypes(setup_clutter_lookup):
+
+    geotypes = ClutterGeotypes(setup_clutter_lookup)
+
+    densities = np.array([0, 200, 782, 1000, 7959, 10000])
+
+    assert list(geotypes.classes(densities)) == [0, 0, 0, 1, 1, 2]
+    assert list(geotypes.geotype(densities)) == [
+        lookup_clutter_geotype(setup_clutter_lookup, density)
+        for density in densities
+        ]
+
+    #lookups are not cached, so changes to the lookup are seen
+    setup_clutter_lookup[1] = (2000, 'Suburban')
+    assert lookup_clutter_geotype(setup_clutter_lookup, 1000) == 'Rural'
+
 class TestLAD():
 
     def test_create(self, setup_lad, setup_service_obligation_capacity):
@@ -95,6 +341,51 @@ class TestLAD():
         testCoverage = testLAD.coverage()
         assert testCoverage == 1
 
+    def test_cached_totals(self, setup_lad, setup_pcd_sector,
+        setup_assets, setup_capacity_lookup,
+        setup_clutter_lookup, setup_service_obligation_capacity,
+        setup_traffic, setup_market_share):
+
+        testLAD = LAD(setup_lad[0], setup_service_obligation_capacity)
+
+        pcd_sectors = [
+            PostcodeSector(data, setup_assets,
+                setup_capacity_lookup, setup_clutter_lookup,
+                setup_service_obligation_capacity,
+                setup_traffic, setup_market_share)
+            for data in setup_pcd_sector
+            ]
+
+        for pcd_sector in pcd_sectors:
+            testLAD.add_pcd_sector(pcd_sector)
+
+        totals = testLAD._summed()
+
+        #summed once, then reused until a sector changes
+        assert testLAD._summed() is totals
+        assert testLAD.population == 700
+        assert testLAD._summed() is totals
+
+        testLAD.remove_pcd_sector('CB12')
+        assert testLAD.population == 500
+        assert testLAD.demand() == pcd_sectors[0].demand
+        assert testLAD.capacity() == pcd_sectors[0].capacity
+
+        #a sector that cannot reach the obligation is not covered
+        unserved = PostcodeSector(setup_pcd_sector[1], setup_assets,
+            setup_capacity_lookup, setup_clutter_lookup,
+            pcd_sectors[1].capacity + 1,
+            setup_traffic, setup_market_share)
+
+        testLAD.service_obligation_capacity = pcd_sectors[1].capacity + 1
+        testLAD.add_pcd_sector(unserved)
+        assert testLAD.population == 700
+        assert testLAD.coverage() == 0
+
+        testLAD.sort_pcd_sectors(lambda pcd_sector_id: pcd_sector_id != 'CB12')
+        assert list(testLAD._pcd_sectors) == ['CB12', 'CB11']
+        assert testLAD.population == 700
+
 def test_lookup_clutter_geotype():
 
     clutter_lookup = [
@@ -120,3 +411,40 @@ def test_lookup_clutter_geotype():
     actual_result = lookup_clutter_geotype(clutter_lookup, population_density)
 
     assert actual_result == 'Urban'
+
+    #arrays of population densities give the same geotypes
+    population_densities = np.array([0, 200, 782, 782.5, 1000, 7959, 10000])
+
+    actual_result = lookup_clutter_geotype(clutter_lookup, population_densities)
+
+    assert list(actual_result) == [
+        lookup_clutter_geotype(clutter_lookup, population_density)
+        for population_density in population_densities
+        ]
+
+def test_lookup_capacity():
+
+    lookup_table = {
+        ('Urban', '800', '2x10MHz'): [(1, 2), (2, 4), (2, 5), (4, 9)],
+    }
+
+    assert lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', 0.5) == 0
+    assert lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', 1.5) == 3
+    #repeated densities take the capacity of the last
+    assert lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', 2) == 5
+    assert lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', 3) == 7
+    assert lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', 10) == 9
+
+    site_densities = np.array([0, 0.99, 1, 1.5, 2, 3, 4, 10])
+
+    capacities = lookup_capacity(
+        lookup_table, 'Urban', '800', '2x10MHz', site_densities
+        )
+
+    assert list(capacities) == [
+        lookup_capacity(lookup_table, 'Urban', '800', '2x10MHz', site_density)
+        for site_density in site_densities
+        ]
+
+    with pytest.raises(KeyError):
+        lookup_capacity(lookup_table, 'Rural', '800', '2x10MHz', 1)
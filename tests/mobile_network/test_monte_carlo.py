@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+
+from digital_comms.mobile_network.monte_carlo import (
+    PercentileEstimator,
+    run_monte_carlo,
+    )
+
+def test_percentile_estimator():
+
+    rng = np.random.default_rng(42)
+    values = rng.normal(10, 3, 1000)
+
+    estimator = PercentileEstimator(95)
+
+    for batch in np.split(values, 10):
+        estimator.update(batch)
+
+    assert len(estimator) == 1000
+    assert estimator.estimate() == np.percentile(values, 95)
+
+    lower, upper = estimator.confidence_interval()
+
+    assert lower <= estimator.estimate() <= upper
+
+    small = PercentileEstimator(95)
+    small.update(values[:100])
+
+    assert small.half_width() > estimator.half_width()
+
+def test_percentile_estimator_coverage():
+
+    #the interval should contain the true 95th percentile of a standard
+    #normal in roughly 95% of repeated experiments
+    rng = np.random.default_rng(1)
+    true_value = 1.6448536269514722
+
+    covered = 0
+    for _ in range(400):
+        estimator = PercentileEstimator(95)
+        estimator.update(rng.standard_normal(300))
+        lower, upper = estimator.confidence_interval()
+        covered += lower <= true_value <= upper
+
+    assert 0.9 < covered / 400 < 0.99
+
+def test_percentile_estimator_converged():
+
+    estimator = PercentileEstimator(95)
+
+    assert not estimator.converged(absolute=1)
+    assert np.isnan(estimator.estimate())
+
+    estimator.update(np.full(50, 4.0))
+
+    assert estimator.half_width() == 0
+    assert estimator.converged()
+
+    with pytest.raises(ValueError):
+        PercentileEstimator(120)
+
+    with pytest.raises(ValueError):
+        PercentileEstimator(95, confidence=1)
+
+def batch_function(spread):
+
+    def evaluate_batch(quantity, rng):
+        sinr = rng.normal(10, spread, quantity)
+        return [
+            {'spectral_efficiency': 2, 'sinr': value, 'capacity_mbps': 20}
+            for value in sinr
+            ]
+
+    return evaluate_batch
+
+def test_run_monte_carlo_stops_early():
+
+    results = run_monte_carlo(
+        batch_function(0.1), 95, batch_size=50, min_iterations=100,
+        max_iterations=2000, rng=np.random.default_rng(42)
+        )
+
+    assert results['converged']
+    assert results['iterations'] == 100
+    assert results['capacity_mbps'] == 20
+
+    lower, upper = results['sinr_interval']
+
+    assert lower <= results['sinr'] <= upper
+
+def test_run_monte_carlo_iteration_limit():
+
+    results = run_monte_carlo(
+        batch_function(50), 95, batch_size=64, min_iterations=100,
+        max_iterations=300, sinr_tolerance=0.01,
+        rng=np.random.default_rng(42)
+        )
+
+    assert not results['converged']
+    assert results['iterations'] == 300
+
+    with pytest.raises(ValueError):
+        run_monte_carlo(batch_function(1), 95, min_iterations=10,
+            max_iterations=5)
+
+    with pytest.raises(ValueError):
+        run_monte_carlo(lambda quantity, rng: [], 95)
@@ -1,6 +1,8 @@
 import pytest
+import numpy as np
 from digital_comms.mobile_network.path_loss_module import (
     path_loss_calculator,
+    path_loss_calculator_batch,
     determine_path_loss,
     free_space,
     extended_hata,
@@ -191,6 +193,100 @@ def test_eval_path_loss_calc(frequency, distance, ant_height, ant_type,
         ue_height)
         ) == expected
 
+#Prepare for testing the batch path loss calculator
+@pytest.mark.parametrize("frequency, ant_height, settlement_type, \
+    type_of_sight, indoor", [
+    (0.7, 30, 'urban', 'nlos', False),
+    (0.8, 40, 'suburban', 'los', True),
+    (1.8, 30, 'rural', 'los', False),
+    (2.6, 40, 'urban', 'los', True),
+    (3.5, 30, 'urban', 'los', False),
+    (3.5, 30, 'urban', 'nlos', True),
+    (3.5, 40, 'suburban', 'los', False),
+    (3.5, 40, 'rural', 'nlos', True),
+    ])
+
+def test_path_loss_calculator_batch(frequency, ant_height, settlement_type,
+    type_of_sight, indoor):
+
+    distances = [20, 60, 150, 400, 900, 2500, 4500, 8000]
+
+    actual_result = path_loss_calculator_batch(
+        frequency, distances, ant_height, 'macro', 20, 20,
+        settlement_type, type_of_sight, 1.5, 0, indoor
+        )
+
+    expected_result = [
+        path_loss_calculator(frequency, distance, ant_height, 'macro', 20,
+        20, settlement_type, type_of_sight, 1.5, 0, indoor)
+        for distance in distances
+        ]
+
+    assert actual_result.shape == (len(distances),)
+    assert actual_result == pytest.approx(expected_result, abs=0.011)
+
+def test_path_loss_calculator_batch_mixed_links():
+
+    distances = np.array([150, 150, 3000, 3000])
+    type_of_sight = np.array([True, False, True, False])
+    indoor = np.array([False, True, False, True])
+
+    actual_result = path_loss_calculator_batch(
+        3.5, distances, 30, 'macro', 20, 20, 'urban',
+        type_of_sight, 1.5, 0, indoor
+        )
+
+    for i in range(len(distances)):
+        expected_result = path_loss_calculator(
+            3.5, distances[i], 30, 'macro', 20, 20, 'urban',
+            'los' if type_of_sight[i] else 'nlos', 1.5, 0, indoor[i]
+            )
+        assert actual_result[i] == pytest.approx(expected_result, abs=0.011)
+
+def test_path_loss_calculator_batch_errors():
+
+    msg = 'frequency of 0.01 is NOT within correct range'
+
+    with pytest.raises(ValueError) as ex1:
+        path_loss_calculator_batch(
+            0.01, [500], 10, 'macro', 20, 20, 'urban', 'los', 1.5, 1, True
+            )
+
+    assert msg in str(ex1)
+
+    msg = 'Distance over 100km not compliant'
+
+    with pytest.raises(ValueError) as ex2:
+        path_loss_calculator_batch(
+            0.8, [500, 200000], 10, 'macro', 20, 20, 'urban', 'los', 1.5, 1,
+            True
+            )
+
+    assert msg in str(ex2)
+
+def test_path_loss_calculator_batch_rng():
+
+    distances = np.full(50, 500)
+
+    legacy = path_loss_calculator_batch(
+        3.5, distances, 20, 'macro', 20, 20, 'urban', 'nlos', 1.5, 1, True
+        )
+
+    #without a generator every link receives the same seeded draw
+    assert len(set(legacy)) == 1
+
+    first = path_loss_calculator_batch(
+        3.5, distances, 20, 'macro', 20, 20, 'urban', 'nlos', 1.5, 1, True,
+        np.random.default_rng(1)
+        )
+    second = path_loss_calculator_batch(
+        3.5, distances, 20, 'macro', 20, 20, 'urban', 'nlos', 1.5, 1, True,
+        np.random.default_rng(1)
+        )
+
+    assert (first == second).all()
+    assert len(set(first)) > 1
+
 # #Prepare for testing 3GPP compatability function
 # @pytest.mark.parametrize("building_height, street_width, ant_height, \
 #     ue_height, expected", [
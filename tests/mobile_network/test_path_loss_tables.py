@@ -0,0 +1,148 @@
+import pytest
+import os
+import numpy as np
+
+from digital_comms.mobile_network.path_loss_module import (
+    path_loss_terms,
+    path_loss_calculator_batch
+    )
+from digital_comms.mobile_network.path_loss_tables import (
+    PathLossTables,
+    open_path_loss_tables,
+    TABLE_BLOCK
+    )
+
+@pytest.mark.parametrize("frequency, ant_height, settlement_type", [
+    (0.7, 30, 'urban'),
+    (0.8, 40, 'suburban'),
+    (1.8, 30, 'rural'),
+    (2.6, 40, 'urban'),
+    (3.5, 30, 'urban'),
+    (3.5, 40, 'suburban'),
+    (3.7, 20, 'rural'),
+    ])
+
+def test_terms_match_models(frequency, ant_height, settlement_type):
+
+    rng = np.random.default_rng(3)
+    distances = np.round(rng.uniform(1, 12000, 500))
+    type_of_sight = rng.random(500) < 0.5
+
+    expected = path_loss_terms(
+        frequency, distances, ant_height, 'macro', 20, 20, settlement_type,
+        type_of_sight, 1.5, 0
+        )
+
+    actual = PathLossTables().terms(
+        frequency, distances, ant_height, 'macro', 20, 20, settlement_type,
+        type_of_sight, 1.5, 0
+        )
+
+    assert actual.keys() == expected.keys()
+    assert actual['model'] == expected['model']
+    for field in expected:
+        if field != 'model':
+            assert np.array_equal(actual[field], expected[field])
+
+def test_interpolation():
+
+    tables = PathLossTables()
+
+    actual = tables.terms(
+        0.8, [1500.25, 1500.5], 30, 'macro', 20, 20, 'urban', 'los', 1.5, 0
+        )
+    grid = path_loss_terms(
+        0.8, [1500, 1501], 30, 'macro', 20, 20, 'urban', 'los', 1.5, 0
+        )['median']
+
+    assert actual['median'] == pytest.approx([
+        grid[0] + 0.25 * (grid[1] - grid[0]),
+        grid[0] + 0.5 * (grid[1] - grid[0]),
+        ])
+
+def test_mixed_heights_share_tables():
+
+    tables = PathLossTables()
+
+    distances = np.array([[100, 2000], [100, 2000]])
+    ue_height = np.array([[1.5], [3]])
+
+    actual = tables.terms(
+        3.5, distances, 30, 'macro', 20, 20, 'urban', 'nlos', ue_height, 0
+        )
+    expected = path_loss_terms(
+        3.5, distances, 30, 'macro', 20, 20, 'urban', 'nlos', ue_height, 0
+        )
+
+    assert actual['median'].shape == (2, 2)
+    assert np.array_equal(actual['median'], expected['median'])
+    assert len(tables) == 2
+
+    #Extended Hata ignores the line of sight and building parameters
+    tables.terms(0.8, [100], 30, 'macro', 20, 20, 'urban', 'los', 1.5, 0)
+    tables.terms(0.8, [100], 30, 'micro', 10, 30, 'urban', 'nlos', 1.5, 0)
+
+    assert len(tables) == 3
+
+def test_tables_grow_and_persist(tmpdir):
+
+    cache_dir = os.path.join(str(tmpdir), 'path_loss_tables')
+
+    tables = PathLossTables(cache_dir)
+    tables.terms(0.8, [500], 30, 'macro', 20, 20, 'urban', 'los', 1.5, 0)
+
+    table = tables.table(
+        0.8, 30, 'macro', 20, 20, 'urban', True, 1.5, 0, 500
+        )
+    assert len(table['median']) == TABLE_BLOCK
+    assert len(os.listdir(cache_dir)) == 1
+
+    tables.terms(0.8, [5500], 30, 'macro', 20, 20, 'urban', 'los', 1.5, 0)
+
+    table = tables.table(
+        0.8, 30, 'macro', 20, 20, 'urban', True, 1.5, 0, 500
+        )
+    assert len(table['median']) == 6 * TABLE_BLOCK
+
+    #a new process reads the saved table rather than rebuilding it
+    reloaded = PathLossTables(cache_dir)
+    loaded = reloaded._load(reloaded.table_key(
+        0.8, 30, 'macro', 20, 20, 'urban', True, 1.5, 0
+        ))
+
+    assert np.array_equal(loaded['median'], table['median'])
+    assert open_path_loss_tables(cache_dir) is open_path_loss_tables(cache_dir)
+
+def test_errors():
+
+    tables = PathLossTables()
+
+    with pytest.raises(ValueError) as ex1:
+        tables.terms(0.01, [500], 10, 'macro', 20, 20, 'urban', 'los', 1.5, 1)
+
+    assert 'frequency of 0.01 is NOT within correct range' in str(ex1)
+
+    with pytest.raises(ValueError) as ex2:
+        tables.terms(
+            0.8, [500, 200000], 10, 'macro', 20, 20, 'urban', 'los', 1.5, 1
+            )
+
+    assert 'Distance over 100km not compliant' in str(ex2)
+
+def test_path_loss_calculator_batch_tables():
+
+    rng = np.random.default_rng(5)
+    distances = np.round(rng.uniform(10, 5000, (100, 3)))
+    indoor = rng.random((100, 1)) < 0.5
+
+    expected = path_loss_calculator_batch(
+        3.5, distances, 30, 'macro', 20, 20, 'urban', 'nlos', 1.5, 0,
+        indoor, np.random.default_rng(1)
+        )
+
+    actual = path_loss_calculator_batch(
+        3.5, distances, 30, 'macro', 20, 20, 'urban', 'nlos', 1.5, 0,
+        indoor, np.random.default_rng(1), PathLossTables()
+        )
+
+    assert np.array_equal(actual, expected)
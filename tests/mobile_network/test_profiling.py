@@ -0,0 +1,92 @@
+import os
+import time
+import pytest
+
+from digital_comms.mobile_network.profiling import (
+    Profiler,
+    NULL_PROFILER,
+    read_report,
+    summarise_reports,
+    )
+
+def make_report(name, total_seconds, path_loss_seconds, links):
+
+    return {
+        'name': name,
+        'total_seconds': total_seconds,
+        'stages': {
+            'get_sites': {'seconds': 0.5, 'calls': 1},
+            'link_budget.path_loss': {
+                'seconds': path_loss_seconds, 'calls': 4
+                },
+        },
+        'counters': {'links': links},
+    }
+
+def test_profiler(tmpdir):
+
+    profiler = Profiler('CB11')
+
+    with profiler.stage('get_sites'):
+        time.sleep(0.01)
+
+    for _ in range(3):
+        with profiler.stage('link_budget'):
+            profiler.count('links', 10)
+
+    with pytest.raises(ValueError):
+        with profiler.stage('write'):
+            raise ValueError()
+
+    report = profiler.report()
+
+    assert report['name'] == 'CB11'
+    assert list(report['stages']) == ['get_sites', 'link_budget', 'write']
+    assert report['stages']['get_sites']['seconds'] >= 0.01
+    assert report['stages']['link_budget']['calls'] == 3
+    assert report['stages']['write']['calls'] == 1
+    assert report['counters'] == {'links': 30}
+    assert report['total_seconds'] >= report['stages']['get_sites']['seconds']
+
+    path = os.path.join(str(tmpdir), 'CB11', 'timings_CB11.json')
+    profiler.write_report(path)
+
+    assert read_report(path)['counters'] == {'links': 30}
+
+def test_null_profiler():
+
+    with NULL_PROFILER.stage('get_sites'):
+        NULL_PROFILER.count('links', 10)
+
+    assert not NULL_PROFILER.enabled
+    assert not hasattr(NULL_PROFILER, 'report')
+
+def test_summarise_reports(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'timings_CB12.json')
+    profiler = Profiler('CB12')
+    profiler.write_report(path)
+
+    summary = summarise_reports([
+        make_report('CB11', 10, 6, 1000),
+        make_report('CB13', 30, 12, 5000),
+        path,
+        os.path.join(str(tmpdir), 'missing.json'),
+        ], slowest=2)
+
+    assert summary['runs'] == 3
+    assert summary['total_seconds'] == pytest.approx(40, abs=1)
+    assert summary['counters'] == {'links': 6000}
+    assert [name for name, _ in summary['slowest']] == ['CB13', 'CB11']
+
+    path_loss = summary['stages']['link_budget.path_loss']
+
+    assert path_loss['seconds'] == 18
+    assert path_loss['calls'] == 8
+    assert path_loss['runs'] == 2
+    assert path_loss['mean_seconds'] == 9
+    assert path_loss['max_seconds'] == 12
+    assert path_loss['max_run'] == 'CB13'
+    assert path_loss['share'] == pytest.approx(18 / summary['total_seconds'])
+
+    assert summarise_reports([])['runs'] == 0
@@ -0,0 +1,38 @@
+from digital_comms.mobile_network.random_streams import (
+    RandomStreams,
+    )
+
+def test_spawn_is_reproducible():
+
+    first = RandomStreams(42).spawn('CB11', 'link_budget', 0.7).generator()
+    second = RandomStreams(42).spawn('CB11', 'link_budget', 0.7).generator()
+
+    assert (first.standard_normal(10) == second.standard_normal(10)).all()
+
+def test_spawn_is_order_independent():
+
+    streams = RandomStreams(42)
+
+    cb12 = streams.spawn('CB12').generator().random(5)
+    cb11 = streams.spawn('CB11').generator().random(5)
+
+    fresh = RandomStreams(42)
+
+    assert (fresh.spawn('CB11').generator().random(5) == cb11).all()
+    assert (fresh.spawn('CB12').generator().random(5) == cb12).all()
+    assert not (cb11 == cb12).all()
+
+def test_spawn_hierarchy():
+
+    streams = RandomStreams(42)
+
+    assert streams.spawn('CB11').spawn(3).spawn_key == (
+        streams.spawn('CB11', 3).spawn_key
+        )
+    assert streams.spawn(3).spawn_key == (3,)
+
+def test_generator_is_reused():
+
+    stream = RandomStreams(42).spawn('CB11')
+
+    assert stream.generator() is stream.generator()
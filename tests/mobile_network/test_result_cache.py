@@ -0,0 +1,100 @@
+import os
+import numpy as np
+
+from digital_comms.mobile_network.result_cache import (
+    ResultCache,
+    input_fingerprint,
+    )
+
+def make_inputs():
+
+    return {
+        'postcode_sector': 'CB11',
+        'geometry': b'\x01\x03\x00\x00\x00',
+        'local_authority_ids': ['E07000012'],
+        'environment': 'urban',
+        'seed': 42,
+        'parameters': {
+            'iterations': 500,
+            'mast_height': [30, 40],
+            'spectrum_portfolio': [('generic', 'FDD DL', 0.7, 10, '5G')],
+        },
+    }
+
+def test_input_fingerprint():
+
+    fingerprint = input_fingerprint(make_inputs())
+
+    assert len(fingerprint) == 64
+    assert fingerprint == input_fingerprint(make_inputs())
+
+    #key order does not matter
+    reordered = dict(reversed(list(make_inputs().items())))
+    assert input_fingerprint(reordered) == fingerprint
+
+    #tuples, lists and numpy values of the same data are equivalent
+    inputs = make_inputs()
+    inputs['seed'] = np.int64(42)
+    inputs['parameters']['mast_height'] = np.array([30, 40])
+    assert input_fingerprint(inputs) == fingerprint
+
+def test_input_fingerprint_changes():
+
+    fingerprint = input_fingerprint(make_inputs())
+
+    changes = [
+        ('seed', 43),
+        ('geometry', b'\x01\x03\x00\x00\x01'),
+        ('environment', 'suburban'),
+        ('local_authority_ids', ['E07000012', 'E07000011']),
+        ]
+
+    for key, value in changes:
+        inputs = make_inputs()
+        inputs[key] = value
+        assert input_fingerprint(inputs) != fingerprint
+
+    inputs = make_inputs()
+    inputs['parameters']['spectrum_portfolio'] = [
+        ('generic', 'FDD DL', 0.8, 10, '5G')
+        ]
+    assert input_fingerprint(inputs) != fingerprint
+
+    #floats and integers, and floats and strings, are kept apart
+    assert input_fingerprint({'a': 1}) != input_fingerprint({'a': 1.0})
+    assert input_fingerprint({'a': 0.7}) != input_fingerprint({'a': '0.7'})
+
+def test_result_cache(tmpdir):
+
+    cache = ResultCache(str(tmpdir.join('cache')))
+    fingerprint = input_fingerprint(make_inputs())
+
+    output_path = str(tmpdir.join('CB11', 'lookup_table_CB11.csv'))
+    os.makedirs(os.path.dirname(output_path))
+
+    assert not cache.restore(fingerprint, output_path)
+    assert not os.path.exists(output_path)
+
+    with open(output_path, 'w') as sink:
+        sink.write('frequency,sinr\n0.7,5.2\n')
+
+    cached_path = cache.store(fingerprint, output_path)
+
+    assert cached_path == cache.path(fingerprint, '.csv')
+    assert os.path.basename(os.path.dirname(cached_path)) == fingerprint[:2]
+
+    os.remove(output_path)
+
+    assert cache.restore(fingerprint, output_path)
+    with open(output_path, 'r') as source:
+        assert source.read() == 'frequency,sinr\n0.7,5.2\n'
+
+    #results are only restored in the format they were stored in
+    assert not cache.restore(
+        fingerprint, str(tmpdir.join('lookup_table_CB11.npz'))
+        )
+
+    #and only for the same inputs
+    assert not cache.restore(
+        input_fingerprint({'seed': 43}), str(tmpdir.join('other.csv'))
+        )
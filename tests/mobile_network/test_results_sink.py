@@ -0,0 +1,140 @@
+import os
+import csv
+import pytest
+import numpy as np
+
+from digital_comms.mobile_network.results_sink import (
+    ResultsSink,
+    read_table,
+    write_table,
+    merge_tables,
+    table_format,
+    )
+
+FIELDS = ('environment', 'frequency', 'area_capacity_mbps')
+
+ROWS = [
+    ('urban', 0.7, 10.5),
+    ('urban', 3.5, 120.25),
+    ('rural', 0.8, 2),
+    ]
+
+def test_table_format():
+
+    assert table_format('lookup_table_CB11.csv') == 'csv'
+    assert table_format('national.NPZ') == 'npz'
+
+    with pytest.raises(ValueError):
+        table_format('lookup_table.txt')
+
+def test_results_sink_csv(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'CB11', 'lookup_table_CB11.csv')
+
+    with ResultsSink(path, FIELDS) as sink:
+        sink.extend(ROWS[:2])
+        sink.append({
+            'environment': 'rural', 'frequency': 0.8,
+            'area_capacity_mbps': 2
+            })
+        #nothing is written until the sink is flushed
+        assert not os.path.exists(path)
+        assert len(sink) == 3
+
+    with open(path, 'r', newline='') as source:
+        lines = list(csv.reader(source))
+
+    assert lines == [list(FIELDS)] + [[str(v) for v in row] for row in ROWS]
+
+    #later flushes add to the same file
+    sink.append(ROWS[0])
+    assert sink.flush() == 1
+    assert len(read_table(path)['frequency']) == 4
+
+    with pytest.raises(ValueError):
+        sink.append(('urban', 0.7))
+
+def test_results_sink_discards_failed_runs(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'lookup_table.csv')
+
+    with pytest.raises(RuntimeError):
+        with ResultsSink(path, FIELDS) as sink:
+            sink.append(ROWS[0])
+            raise RuntimeError()
+
+    assert not os.path.exists(path)
+
+def test_results_sink_npz(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'lookup_table.npz')
+
+    sink = ResultsSink(path, FIELDS)
+    sink.extend(ROWS)
+    sink.flush()
+
+    sink.append(ROWS[0])
+    sink.flush()
+
+    columns = read_table(path)
+
+    assert list(columns) == list(FIELDS)
+    assert columns['environment'].tolist() == ['urban', 'urban', 'rural', 'urban']
+    assert columns['area_capacity_mbps'].tolist() == [10.5, 120.25, 2, 10.5]
+
+def test_results_sink_parquet(tmpdir):
+
+    pytest.importorskip('pyarrow')
+
+    path = os.path.join(str(tmpdir), 'lookup_table.parquet')
+
+    with ResultsSink(path, FIELDS) as sink:
+        sink.extend(ROWS)
+
+    assert read_table(path)['frequency'].tolist() == [0.7, 3.5, 0.8]
+
+def test_merge_tables(tmpdir):
+
+    directory = str(tmpdir)
+    tables = {}
+
+    for postcode_sector in ('CB12', 'CB11'):
+        tables[postcode_sector] = os.path.join(
+            directory, 'lookup_table_{}.csv'.format(postcode_sector)
+            )
+        with ResultsSink(tables[postcode_sector], FIELDS) as sink:
+            sink.extend(ROWS)
+
+    tables['CB13'] = os.path.join(directory, 'missing.csv')
+
+    output_file = os.path.join(directory, 'national.csv')
+
+    assert merge_tables(tables, output_file) == 6
+
+    columns = read_table(output_file)
+
+    assert list(columns) == ['postcode_sector'] + list(FIELDS)
+    assert columns['postcode_sector'] == ['CB11'] * 3 + ['CB12'] * 3
+    assert columns['area_capacity_mbps'][:3] == ['10.5', '120.25', '2']
+
+    #csv values are typed when written to other formats
+    output_file = os.path.join(directory, 'national.npz')
+
+    assert merge_tables(tables, output_file) == 6
+
+    columns = read_table(output_file)
+
+    assert columns['frequency'].dtype == np.float64
+    assert columns['environment'][2] == 'rural'
+
+    assert merge_tables({}, os.path.join(directory, 'empty.csv')) == 0
+
+def test_write_table_append_creates_file(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'results.csv')
+
+    columns = {'sinr': [1.5, 2.5]}
+
+    assert write_table(path, columns, append=True) == 2
+    assert write_table(path, columns, append=True) == 2
+    assert read_table(path)['sinr'] == ['1.5', '2.5', '1.5', '2.5']
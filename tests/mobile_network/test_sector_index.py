@@ -0,0 +1,93 @@
+import pytest
+import fiona
+from shapely.geometry import shape, box, mapping
+
+from digital_comms.mobile_network.sector_index import (
+    build_sector_index,
+    SectorIndex,
+    open_sector_index,
+    sector_key,
+    )
+
+def write_shapefile(path, features, properties):
+
+    schema = {'geometry': 'Polygon', 'properties': properties}
+
+    with fiona.open(path, 'w', driver='ESRI Shapefile', schema=schema,
+        crs='epsg:27700') as sink:
+        for geom, props in features:
+            sink.write({'geometry': mapping(geom), 'properties': props})
+
+@pytest.fixture
+def sector_index_path(tmp_path):
+
+    sectors_path = str(tmp_path / 'cb.shp')
+    write_shapefile(sectors_path, [
+        (box(0, 0, 10, 10), {'postcode': 'CB1 1'}),
+        (box(10, 0, 30, 10), {'postcode': 'CB1 2'}),
+        (box(100, 100, 110, 110), {'postcode': 'CB1 3'}),
+        ], {'postcode': 'str'})
+
+    duplicates_path = str(tmp_path / 'cc.shp')
+    write_shapefile(duplicates_path, [
+        (box(50, 50, 60, 60), {'postcode': 'CB1 1'}),
+        ], {'postcode': 'str'})
+
+    lads_path = str(tmp_path / 'lads.shp')
+    write_shapefile(lads_path, [
+        (box(15, -5, 40, 15), {'name': 'E07000009'}),
+        (box(-5, -5, 15, 15), {'name': 'E07000008'}),
+        ], {'name': 'str'})
+
+    db_path = str(tmp_path / 'index' / 'postcode_sectors.sqlite')
+
+    count = build_sector_index(
+        db_path, [sectors_path, duplicates_path], lads_path
+        )
+
+    assert count == 3
+
+    return db_path
+
+def test_sector_key():
+
+    assert sector_key('CB1 1') == 'CB11'
+
+def test_read_postcode_sector(sector_index_path):
+
+    sector_index = SectorIndex(sector_index_path)
+
+    assert 'CB11' in sector_index
+    assert 'CB1 1' in sector_index
+    assert 'CB19' not in sector_index
+
+    sector = sector_index.read_postcode_sector('CB11')
+
+    assert sector['properties']['postcode'] == 'CB1 1'
+    #the first occurrence of a duplicated sector is kept
+    assert shape(sector['geometry']).equals(box(0, 0, 10, 10))
+
+    with pytest.raises(KeyError):
+        sector_index.read_postcode_sector('CB19')
+
+def test_local_authority_ids(sector_index_path):
+
+    sector_index = SectorIndex(sector_index_path)
+
+    assert sector_index.local_authority_ids('CB11') == ['E07000008']
+    #shapefile order is preserved
+    assert sector_index.local_authority_ids('CB12') == [
+        'E07000009', 'E07000008'
+        ]
+    assert sector_index.local_authority_ids('CB13') == []
+
+    with pytest.raises(KeyError):
+        sector_index.local_authority_ids('CB19')
+
+def test_open_sector_index(sector_index_path, tmp_path):
+
+    assert open_sector_index(str(tmp_path / 'missing.sqlite')) is None
+
+    sector_index = open_sector_index(sector_index_path)
+
+    assert open_sector_index(sector_index_path) is sector_index
@@ -0,0 +1,199 @@
+import os
+import csv
+import json
+import time
+import pytest
+
+from digital_comms.mobile_network.simulation_runner import (
+    run_task,
+    run_postcode_sectors,
+    group_postcode_sectors,
+    read_progress,
+    merge_lookup_tables,
+    read_postcode_sector_list,
+    write_timing_summary,
+    )
+from digital_comms.mobile_network.profiling import Profiler
+
+#tasks must be importable by the worker processes
+
+def write_table(postcode_sector):
+
+    directory = os.environ['RUNNER_TEST_DIRECTORY']
+    path = os.path.join(directory, 'lookup_table_{}.csv'.format(postcode_sector))
+
+    with open(path, 'w', newline='') as sink:
+        writer = csv.writer(sink)
+        writer.writerow(('frequency', 'area_capacity_mbps'))
+        writer.writerow((0.7, 10))
+        writer.writerow((3.5, 50))
+
+    return path
+
+def flaky_task(postcode_sector):
+
+    marker = os.path.join(
+        os.environ['RUNNER_TEST_DIRECTORY'], '{}.attempted'.format(postcode_sector)
+        )
+
+    if postcode_sector == 'CB12' and not os.path.exists(marker):
+        open(marker, 'w').close()
+        raise ValueError('first attempt fails')
+
+    return write_table(postcode_sector)
+
+def write_tile(postcode_sectors):
+
+    if 'CB3' in postcode_sectors:
+        raise ValueError('tile fails')
+
+    return {
+        postcode_sector: write_table(postcode_sector)
+        for postcode_sector in postcode_sectors
+        }
+
+def slow_task(postcode_sector):
+
+    time.sleep(5)
+
+    return write_table(postcode_sector)
+
+@pytest.fixture
+def runner_directory(tmp_path, monkeypatch):
+
+    monkeypatch.setenv('RUNNER_TEST_DIRECTORY', str(tmp_path))
+
+    return tmp_path
+
+def test_run_task(runner_directory):
+
+    postcode_sector, output, error, seconds = run_task(write_table, 'CB11')
+
+    assert postcode_sector == 'CB11'
+    assert error is None
+    assert os.path.exists(output)
+
+    postcode_sector, output, error, seconds = run_task(
+        slow_task, 'CB11', timeout=0.2
+        )
+
+    assert output is None
+    assert error == 'timed out after 0.2s'
+    assert seconds < 2
+
+def test_run_postcode_sectors(runner_directory):
+
+    progress_file = str(runner_directory / 'progress.csv')
+    output_file = str(runner_directory / 'merged' / 'lookup_table.csv')
+
+    summary = run_postcode_sectors(
+        ['CB11', 'CB12', 'CB13'], flaky_task, workers=2, retries=1,
+        progress_file=progress_file, output_file=output_file
+        )
+
+    assert sorted(summary['completed']) == ['CB11', 'CB12', 'CB13']
+    assert summary['failed'] == {}
+
+    progress = read_progress(progress_file)
+
+    assert progress['CB12']['status'] == 'done'
+    assert progress['CB12']['attempts'] == '2'
+
+    with open(output_file, 'r') as source:
+        merged = list(csv.DictReader(source))
+
+    assert len(merged) == 6
+    assert merged[0]['postcode_sector'] == 'CB11'
+    assert merged[0]['area_capacity_mbps'] == '10'
+
+    #a second run resumes from the progress file
+    summary = run_postcode_sectors(
+        ['CB11', 'CB12', 'CB13', 'CB14'], write_table, workers=2,
+        progress_file=progress_file
+        )
+
+    assert summary['skipped'] == ['CB11', 'CB12', 'CB13']
+    assert 'CB14' in summary['completed']
+
+def test_run_postcode_sectors_failures(runner_directory):
+
+    summary = run_postcode_sectors(
+        ['CB11'], slow_task, workers=1, timeout=0.2, retries=1,
+        progress_file=str(runner_directory / 'progress.csv')
+        )
+
+    assert summary['completed'] == {}
+    assert summary['failed'] == {'CB11': 'timed out after 0.2s'}
+
+    progress = read_progress(str(runner_directory / 'progress.csv'))
+
+    assert progress['CB11']['status'] == 'failed'
+    assert progress['CB11']['attempts'] == '2'
+
+def test_group_postcode_sectors():
+
+    tiles = group_postcode_sectors(
+        ['CB10', 'SG8', 'CB2', 'CB1', 'cb11', 'CB3', 'SG9'], 2
+        )
+
+    assert tiles == [
+        ('CB1', 'CB2'), ('CB3', 'CB10'), ('cb11',), ('SG8', 'SG9')
+        ]
+
+def test_run_postcode_sectors_tiles(runner_directory):
+
+    progress_file = str(runner_directory / 'progress.csv')
+
+    summary = run_postcode_sectors(
+        ['CB1', 'CB2', 'CB3', 'CB4', 'SG8'], write_tile, workers=2,
+        retries=0, progress_file=progress_file, tile_size=2
+        )
+
+    #the tile holding CB3 fails as a whole
+    assert sorted(summary['completed']) == ['CB1', 'CB2', 'SG8']
+    assert sorted(summary['failed']) == ['CB3', 'CB4']
+    assert summary['failed']['CB4'] == 'ValueError: tile fails'
+
+    progress = read_progress(progress_file)
+
+    assert progress['CB2']['status'] == 'done'
+    assert progress['CB2']['output'].endswith('lookup_table_CB2.csv')
+    assert progress['CB4']['status'] == 'failed'
+
+def test_merge_lookup_tables(runner_directory):
+
+    paths = {'CB12': write_table('CB12'), 'CB11': write_table('CB11'),
+        'CB13': None}
+
+    rows = merge_lookup_tables(paths, str(runner_directory / 'merged.csv'))
+
+    assert rows == 4
+
+def test_write_timing_summary(runner_directory):
+
+    def report_path(postcode_sector):
+        return str(runner_directory / 'timings_{}.json'.format(postcode_sector))
+
+    for postcode_sector in ('CB11', 'CB12'):
+        profiler = Profiler(postcode_sector)
+        with profiler.stage('link_budget'):
+            profiler.count('links', 100)
+        profiler.write_report(report_path(postcode_sector))
+
+    output_file = str(runner_directory / 'summary' / 'timings.json')
+
+    summary = write_timing_summary(
+        ['CB11', 'CB12', 'CB13'], output_file, report_path
+        )
+
+    assert summary['runs'] == 2
+    assert summary['counters'] == {'links': 200}
+
+    with open(output_file, 'r') as source:
+        assert json.load(source)['stages']['link_budget']['calls'] == 2
+
+def test_read_postcode_sector_list():
+
+    assert read_postcode_sector_list(['CB11\n', '\n', ' CB12 \n']) == [
+        'CB11', 'CB12'
+        ]
@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+from scipy.spatial import Delaunay
+from shapely.geometry import Point, Polygon, box
+
+from digital_comms.mobile_network.site_placement import SitePlacement
+
+def brute_force_placement(points, geom):
+
+    tri = Delaunay(np.array(points))
+    triangles = sorted(
+        [Polygon(tri.points[simplex]) for simplex in tri.simplices],
+        key=lambda x: x.area, reverse=True
+        )
+    for triangle in triangles:
+        if geom.contains(triangle.centroid):
+            return triangle.centroid.x, triangle.centroid.y
+
+def test_matches_full_retriangulation():
+
+    rng = np.random.default_rng(42)
+    points = [tuple(p) for p in rng.uniform(0, 1000, (20, 2))]
+    geom = box(100, 100, 900, 900)
+
+    placement = SitePlacement(
+        points, lambda x, y: geom.contains(Point(x, y)),
+        lambda: pytest.fail('fallback should not be needed')
+        )
+
+    reference_points = list(points)
+
+    for _ in range(40):
+        actual = placement.place()
+        expected = brute_force_placement(reference_points, geom)
+        assert actual == pytest.approx(expected)
+        reference_points.append(actual)
+
+    assert len(placement.points) == 60
+
+def test_fallback():
+
+    geom = box(0, 0, 100, 100)
+    fallback_points = iter([(90, 10)])
+
+    #two sites cannot be triangulated
+    placement = SitePlacement(
+        [(0, 0), (100, 100)], lambda x, y: geom.contains(Point(x, y)),
+        lambda: next(fallback_points)
+        )
+
+    assert placement.place() == (90, 10)
+
+    #three sites form a triangle whose centroid is within the area
+    assert placement.place() == pytest.approx((190 / 3, 110 / 3))
+
+def test_fallback_when_no_centroid_inside():
+
+    calls = []
+
+    def fallback():
+        calls.append(1)
+        return (5000, 5000)
+
+    placement = SitePlacement(
+        [(0, 0), (10, 0), (0, 10)], lambda x, y: False, fallback
+        )
+
+    assert placement.place() == (5000, 5000)
+    assert len(calls) == 1
+
+def test_collinear_sites():
+
+    geom = box(-10, -10, 40, 10)
+
+    placement = SitePlacement(
+        [(0, 0), (10, 0), (20, 0)], lambda x, y: geom.contains(Point(x, y)),
+        lambda: (10, 5)
+        )
+
+    assert placement.place() == (10, 5)
+    assert len(placement._triangles) == 2
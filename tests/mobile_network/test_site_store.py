@@ -0,0 +1,109 @@
+import os
+import csv
+import pytest
+import numpy as np
+
+from digital_comms.mobile_network.site_store import (
+    compile_site_store,
+    SiteStore,
+    SiteTile,
+    open_site_store,
+    )
+
+@pytest.fixture
+def sitefinder_csv(tmp_path):
+
+    path = str(tmp_path / 'sitefinder_processed.csv')
+
+    rows = [
+        (545000.5, 259500, '15', 'GSM', '900', 'Macro'),
+        (544000, 259000, '5', 'UMTS', '2100', 'Micro'),
+        (546000, 261000, '30', 'LTE', '800', 'Macro'),
+        (544500, 258000, '12', 'TETRA', '400', 'Macro'),
+        (544000, 262000, '10', 'GSM', '1800', 'Macro'),
+        ]
+
+    with open(path, 'w', newline='') as sink:
+        writer = csv.writer(sink, lineterminator='\n')
+        writer.writerow((
+            'longitude', 'latitude', 'Antennaht', 'Transtype', 'Freqband',
+            'Anttype', 'Powerdbw', 'Maxpwrdbw', 'Maxpwrdbm'
+            ))
+        for row in rows:
+            writer.writerow(row + (10, 20, 50))
+
+    return path
+
+def test_compile_site_store(sitefinder_csv, tmp_path):
+
+    store_path = str(tmp_path / 'store' / 'sites.npy')
+
+    records = compile_site_store(sitefinder_csv, store_path)
+
+    assert os.path.exists(store_path)
+    assert len(records) == 5
+    assert (np.diff(records['x']) >= 0).all()
+    assert records[records['row'] == 0]['x'][0] == 545000.5
+    assert records[records['row'] == 2]['Transtype'][0] == 'LTE'
+
+def test_query_bbox(sitefinder_csv, tmp_path):
+
+    store_path = str(tmp_path / 'sites.npy')
+    compile_site_store(sitefinder_csv, store_path)
+
+    store = SiteStore(store_path)
+
+    assert len(store) == 5
+
+    selected = store.query_bbox(544000, 258000, 545500, 260000)
+
+    #inclusive edges, original csv order
+    assert list(selected['row']) == [0, 1, 3]
+    assert list(selected['Antennaht']) == ['15', '5', '12']
+
+    assert len(store.query_bbox(0, 0, 1, 1)) == 0
+
+def test_tile(sitefinder_csv, tmp_path):
+
+    store_path = str(tmp_path / 'sites.npy')
+    compile_site_store(sitefinder_csv, store_path)
+
+    store = SiteStore(store_path)
+    tile = store.tile(544000, 258000, 546000, 260000)
+
+    assert isinstance(tile, SiteTile)
+    assert len(tile) == 3
+
+    #queries within the tile match the store
+    for bbox in [(544000, 258000, 545500, 260000), (544000, 258000, 544000,
+        259000), (545500, 259500, 546000, 260000)]:
+        assert (tile.query_bbox(*bbox) == store.query_bbox(*bbox)).all()
+
+    with pytest.raises(ValueError):
+        tile.query_bbox(544000, 258000, 546000, 262000)
+
+    def project(coordinates):
+        project.calls += 1
+        coordinates = np.array(coordinates)
+        return coordinates[:, 0] / 1e5, coordinates[:, 1] / 1e5
+    project.calls = 0
+
+    lonlat = tile.lonlat(project)
+
+    assert lonlat[(545000.5, 259500.0)] == (5.450005, 2.595)
+    assert len(lonlat) == 3
+    assert tile.lonlat(project) is lonlat
+    assert project.calls == 1
+
+def test_open_site_store(sitefinder_csv):
+
+    store = open_site_store(sitefinder_csv)
+
+    assert store.store_path == sitefinder_csv.replace('.csv', '.npy')
+    assert open_site_store(sitefinder_csv) is store
+
+    #a newer csv file triggers a rebuild
+    later = os.path.getmtime(store.store_path) + 10
+    os.utime(sitefinder_csv, (later, later))
+
+    assert open_site_store(sitefinder_csv) is not store
@@ -1,7 +1,9 @@
 import pytest
 import os
 import numpy as np
-from shapely.geometry import shape, Point
+import fiona
+from scipy.spatial import Delaunay
+from shapely.geometry import shape, Point, Polygon, mapping
 
 from digital_comms.mobile_network.transmitter_module import (
     read_postcode_sector,
@@ -9,11 +11,33 @@ from digital_comms.mobile_network.transmitter_module import (
     determine_environment,
     get_sites,
     generate_receivers,
+    generate_receiver_table,
+    sample_points_in_polygon,
+    RECEIVER_DTYPE,
+    SITE_DTYPE,
+    RecordTable,
     NetworkManager,
     find_and_deploy_new_site,
     randomly_select_los,
-    transform_coordinates
+    transform_coordinates,
+    get_transformer,
+    project_coordinates,
+    planar_distance,
+    MODULATION_AND_CODING_LUT,
+    LOOKUP_TABLE_FIELDS,
+    write_lookup_table,
+    simulation_parameters,
     )
+from digital_comms.mobile_network import transmitter_module
+from digital_comms.mobile_network.result_cache import input_fingerprint
+from digital_comms.mobile_network.site_store import open_site_store
+from digital_comms.mobile_network.sector_index import (
+    build_sector_index,
+    SectorIndex,
+    )
+from digital_comms.mobile_network.path_loss_tables import PathLossTables
+from digital_comms.mobile_network.results_sink import ResultsSink, read_table
+from digital_comms.mobile_network.profiling import Profiler
 
 @pytest.fixture
 def get_postcode_sector():
@@ -21,7 +45,25 @@ def get_postcode_sector():
    yield read_postcode_sector('CB11')
 
 @pytest.fixture
-def base_system(get_postcode_sector):
+def synthetic_postcode_sector():
+
+    yield {
+        'type': "Feature",
+        'geometry': {
+            "type": "Polygon",
+            "coordinates": [[
+                (544000, 258000), (546500, 258000), (546500, 260500),
+                (544000, 260500), (544000, 258000)
+            ]],
+        },
+        'properties': {
+            "postcode": 'CB11',
+            "local_authority_ids": ['E07000008'],
+        }
+    }
+
+@pytest.fixture
+def setup_transmitters():
 
     TRANSMITTERS = [
             {
@@ -98,6 +140,11 @@ def base_system(get_postcode_sector):
         }
     ]
 
+    return TRANSMITTERS
+
+@pytest.fixture
+def setup_receivers():
+
     RECEIVERS = [
         {
             'type': "Feature",
@@ -149,6 +196,14 @@ def base_system(get_postcode_sector):
         }
     ]
 
+    return RECEIVERS
+
+@pytest.fixture
+def base_system(get_postcode_sector, setup_transmitters, setup_receivers):
+
+    TRANSMITTERS = setup_transmitters
+    RECEIVERS = setup_receivers
+
     geojson_postcode_sector = get_postcode_sector
 
     geojson_postcode_sector['properties']['local_authority_ids'] = [
@@ -159,6 +214,16 @@ def base_system(get_postcode_sector):
 
     return system
 
+@pytest.fixture
+def synthetic_system(synthetic_postcode_sector, setup_transmitters,
+    setup_receivers):
+
+    system = NetworkManager(
+        synthetic_postcode_sector, setup_transmitters, setup_receivers
+        )
+
+    return system
+
 @pytest.fixture
 def postcode_sector_lut():
 
@@ -217,6 +282,50 @@ def test_get_sites(get_postcode_sector):
 
     assert len(actual_receivers_in_shape) == 3
 
+def test_read_postcode_sector_from_index(synthetic_postcode_sector,
+    tmp_path):
+
+    geom = shape(synthetic_postcode_sector['geometry'])
+    paths = {}
+
+    for name, field, value in [
+        ('cb', 'postcode', 'CB1 1'), ('lads', 'name', 'E07000008')]:
+        paths[name] = str(tmp_path / '{}.shp'.format(name))
+        with fiona.open(paths[name], 'w', driver='ESRI Shapefile',
+            schema={'geometry': 'Polygon', 'properties': {field: 'str'}},
+            crs='epsg:27700') as sink:
+            sink.write({'geometry': mapping(geom), 'properties': {field: value}})
+
+    db_path = str(tmp_path / 'postcode_sectors.sqlite')
+    build_sector_index(db_path, [paths['cb']], paths['lads'])
+    sector_index = SectorIndex(db_path)
+
+    postcode_sector = read_postcode_sector('CB11', sector_index)
+
+    assert shape(postcode_sector['geometry']).equals(geom)
+    assert get_local_authority_ids(postcode_sector, sector_index) == [
+        'E07000008'
+        ]
+
+def test_get_sites_from_store(synthetic_postcode_sector, tmp_path):
+
+    csv_path = str(tmp_path / 'sitefinder_processed.csv')
+
+    with open(csv_path, 'w') as sink:
+        sink.write('longitude,latitude,Antennaht,Transtype,Freqband,Anttype\n')
+        sink.write('545000,259500,15,GSM,900,Macro\n')
+        sink.write('100000,100000,15,GSM,900,Macro\n')
+        sink.write('544000,259000,5,UMTS,2100,Micro\n')
+
+    sites = get_sites(synthetic_postcode_sector, open_site_store(csv_path))
+
+    assert [site['geometry']['coordinates'] for site in sites] == [
+        [545000, 259500], [544000, 259000]
+        ]
+    assert sites[1]['properties']['sitengr'] == 'site_id_1'
+    assert sites[1]['properties']['ant_height'] == '5'
+    assert sites[1]['properties']['tech'] == 'UMTS'
+
 def test_generate_receivers(get_postcode_sector, postcode_sector_lut):
 
     actual_receivers = generate_receivers(
@@ -232,18 +341,94 @@ def test_generate_receivers(get_postcode_sector, postcode_sector_lut):
     assert receiver_1['properties']['losses'] == 4
     assert receiver_1['properties']['indoor'] == True
 
+def test_generate_receiver_table(synthetic_postcode_sector,
+    postcode_sector_lut):
+
+    receivers = generate_receiver_table(
+        synthetic_postcode_sector, postcode_sector_lut, 250,
+        np.random.default_rng(42)
+        )
+
+    assert receivers.dtype == RECEIVER_DTYPE
+    assert len(receivers) == 250
+    assert list(receivers['ue_id'][:3]) == [0, 1, 2]
+    assert receivers['indoor'].all()
+    assert (receivers['ue_height'] == 1.5).all()
+
+    geom = shape(synthetic_postcode_sector['geometry'])
+    assert all(
+        geom.contains(Point(x, y)) for x, y in zip(receivers['x'], receivers['y'])
+        )
+
+    geojson = generate_receivers(
+        synthetic_postcode_sector, postcode_sector_lut, 250,
+        np.random.default_rng(42)
+        )
+
+    assert geojson[0]['properties']['ue_id'] == 'id_0'
+    assert geojson[0]['geometry']['coordinates'] == [
+        receivers['x'][0], receivers['y'][0]
+        ]
+
+def test_sample_points_in_polygon(monkeypatch):
+
+    #long, thin diagonal sector with a low acceptance rate
+    geom = Polygon([(0, 0), (500, 0), (10000, 9500), (10000, 10000)])
+
+    x, y = sample_points_in_polygon(geom, 200, np.random.default_rng(1))
+
+    assert len(x) == len(y) == 200
+    assert all(geom.contains(Point(point)) for point in zip(x, y))
+
+    #prepared geometry fallback for Shapely < 2
+    monkeypatch.setattr(
+        'digital_comms.mobile_network.transmitter_module.contains_xy', None
+        )
+
+    x_prepared, y_prepared = sample_points_in_polygon(
+        geom, 200, np.random.default_rng(1)
+        )
+
+    assert (x_prepared == x).all()
+    assert (y_prepared == y).all()
+
+    assert len(sample_points_in_polygon(geom, 0)[0]) == 0
+
+    with pytest.raises(ValueError):
+        sample_points_in_polygon(Polygon(), 10)
+
+def largest_gap_centroid(coordinates, geom):
+    """
+    Reference placement: retriangulate and take the centroid of the
+    largest triangle which lies within the area.
+
+    """
+    tri = Delaunay(np.array(coordinates))
+    triangles = sorted(
+        [Polygon(tri.points[simplex]) for simplex in tri.simplices],
+        key=lambda x: x.area, reverse=True
+        )
+    for triangle in triangles:
+        if geom.contains(triangle.centroid):
+            return [triangle.centroid.x, triangle.centroid.y]
+
 def test_find_and_deploy_new_site(base_system, get_postcode_sector):
 
     new_transmitter = find_and_deploy_new_site(
         base_system.sites, 1, get_postcode_sector, 1
         )
-    print(new_transmitter)
+
+    expected_coordinates = largest_gap_centroid(
+        [site.coordinates for site in base_system.sites.values()],
+        shape(get_postcode_sector['geometry'])
+        )
+
     expected_transmitter = [
         {
             'type': "Feature",
             'geometry': {
                 "type": "Point",
-                "coordinates": [545685.9002289057, 258142.1213415587]
+                "coordinates": expected_coordinates
             },
             'properties': {
                     "operator": 'unknown',
@@ -260,35 +445,45 @@ def test_find_and_deploy_new_site(base_system, get_postcode_sector):
     ]
 
     assert len(new_transmitter) == 1
-    assert new_transmitter == expected_transmitter
+    assert new_transmitter[0]['properties'] == (
+        expected_transmitter[0]['properties']
+        )
+    assert new_transmitter[0]['geometry']['coordinates'] == pytest.approx(
+        expected_coordinates
+        )
 
-    new_transmitter = find_and_deploy_new_site(
+    #placement is deterministic
+    assert find_and_deploy_new_site(
         base_system.sites, 1, get_postcode_sector, 1
+        ) == new_transmitter
+
+def test_find_and_deploy_new_sites(synthetic_system,
+    synthetic_postcode_sector):
+
+    new_transmitters = find_and_deploy_new_site(
+        synthetic_system.sites, 3, synthetic_postcode_sector, 2
         )
 
-    expected_transmitter = [
-        {
-            'type': "Feature",
-            'geometry': {
-                "type": "Point",
-                "coordinates": [545631.0363226292, 258198.41171843308]
-            },
-            'properties': {
-                    "operator": 'unknown',
-                    "sitengr": '{new}{GEN1.1}',
-                    "ant_height": 30,
-                    "tech": 'LTE',
-                    "freq": 700,
-                    "type": 17,
-                    "power": 40,
-                    "gain": 20,
-                    "losses": 2,
-                }
-        }
-    ]
+    assert [t['properties']['sitengr'] for t in new_transmitters] == [
+        '{new}{GEN2.1}', '{new}{GEN2.2}', '{new}{GEN2.3}'
+        ]
 
-    assert len(new_transmitter) == 1
-    assert new_transmitter == expected_transmitter
+    geom = shape(synthetic_postcode_sector['geometry'])
+    coordinates = [site.coordinates for site in synthetic_system.sites.values()]
+
+    #each new site joins the triangulation before the next is placed
+    for transmitter in new_transmitters:
+        expected = largest_gap_centroid(coordinates, geom)
+        actual = transmitter['geometry']['coordinates']
+        assert actual == pytest.approx(expected)
+        coordinates.append(actual)
+
+    assert len(set(tuple(t['geometry']['coordinates'])
+        for t in new_transmitters)) == 3
+
+    assert find_and_deploy_new_site(
+        synthetic_system.sites, 0, synthetic_postcode_sector, 2
+        ) == []
 
 def test_network_manager(base_system):
 
@@ -374,6 +569,69 @@ def test_build_new_assets(base_system):
 
 #     assert expected_result == actual_result
 
+def test_record_table():
+
+    table = RecordTable(SITE_DTYPE, capacity=2)
+
+    for i in range(5):
+        assert table.append((i, i, 30, 40, 20, 2, 58)) == i
+
+    assert len(table) == 5
+    assert list(table['x']) == [0, 1, 2, 3, 4]
+
+    table.update(1, (10, 10, 30, 40, 20, 2, 58))
+
+    assert table.records[1]['x'] == 10
+
+    with pytest.raises(IndexError):
+        table.update(5, (0, 0, 30, 40, 20, 2, 58))
+
+    table.clear()
+
+    assert len(table) == 0
+    assert len(table.records) == 0
+
+def test_network_manager_tables(synthetic_system):
+
+    sites = list(synthetic_system.sites.values())
+
+    assert len(synthetic_system.site_table) == len(sites)
+    assert list(synthetic_system.site_table['x']) == [
+        site.coordinates[0] for site in sites
+        ]
+    assert (synthetic_system.site_table['eirp'] == 58).all()
+    assert sites[0].eirp == 58
+    assert isinstance(sites[0].power, float)
+
+    with pytest.raises(AttributeError):
+        sites[0].unknown_attribute = 1
+
+    receivers = list(synthetic_system.receivers.values())
+
+    assert list(synthetic_system.receiver_table['y']) == [
+        receiver.coordinates[1] for receiver in receivers
+        ]
+    assert list(synthetic_system.receiver_table['indoor']) == [
+        receiver.indoor for receiver in receivers
+        ]
+
+    #rebuilding an existing site updates its row in place
+    synthetic_system.build_new_assets([
+        {
+            'type': "Feature",
+            'geometry': {
+                "type": "Point",
+                "coordinates": [544800, 259520]
+            },
+            'properties': {
+                "sitengr": sites[0].id,
+            }
+        }
+    ], 'CB11')
+
+    assert len(synthetic_system.site_table) == len(sites)
+    assert synthetic_system.site_table['x'][0] == 544800
+
 def test_find_closest_available_sites(base_system):
 
     receiver = base_system.receivers['AB3']
@@ -392,6 +650,531 @@ def test_find_closest_available_sites(base_system):
 
     assert interfering_transmitter_ids == expected_result
 
+def test_find_nearest_sites_after_build(synthetic_system):
+
+    receiver = synthetic_system.receivers['AB3']
+
+    closest_site, interfering_sites = (
+        synthetic_system.find_closest_available_sites(receiver)
+        )
+
+    assert closest_site.id == 'TL4454059600'
+    assert len(interfering_sites) == 3
+
+    synthetic_system.build_new_assets([
+        {
+            'type': "Feature",
+            'geometry': {
+                "type": "Point",
+                "coordinates": [544800, 259520]
+            },
+            'properties': {
+                "sitengr": '{new}{GEN0.1}',
+            }
+        }
+    ], 'CB11')
+
+    closest_site, interfering_sites = (
+        synthetic_system.find_closest_available_sites(receiver)
+        )
+
+    assert closest_site.id == '{new}{GEN0.1}'
+    assert [t.id for t in interfering_sites] == [
+        'TL4454059600', 'TL4515059700', 'TL4529059480'
+        ]
+
+    nearest = synthetic_system.find_nearest_sites(receiver.coordinates, 2)
+
+    assert [t.id for t in nearest] == ['{new}{GEN0.1}', 'TL4454059600']
+
+def test_project_coordinates():
+
+    assert get_transformer() is get_transformer('epsg:27700', 'epsg:4326')
+
+    lons, lats = project_coordinates([
+        (544655.1049227581, 259555.22477912105),
+        (545265.1768673284, 259655.21841664566),
+        ])
+
+    assert len(lons) == 2
+    assert round(lons[0], 2) == 0.12
+    assert round(lats[0], 2) == 52.22
+
+def test_link_distances(synthetic_postcode_sector, setup_transmitters,
+    setup_receivers):
+
+    planar_system = NetworkManager(
+        synthetic_postcode_sector, setup_transmitters, setup_receivers
+        )
+    geodesic_system = NetworkManager(
+        synthetic_postcode_sector, setup_transmitters, setup_receivers,
+        geodesic=True
+        )
+
+    receiver = planar_system.receivers['AB3']
+    sites = list(planar_system.sites.values())
+
+    actual_planar = planar_system.link_distances(sites, receiver)
+
+    expected_planar = planar_distance(
+        [site.coordinates[0] for site in sites],
+        [site.coordinates[1] for site in sites],
+        receiver.coordinates[0], receiver.coordinates[1]
+        )
+
+    assert list(actual_planar) == list(expected_planar)
+    assert round(actual_planar[0]) == 158
+
+    actual_geodesic = geodesic_system.link_distances(
+        list(geodesic_system.sites.values()),
+        geodesic_system.receivers['AB3']
+        )
+
+    #national grid scale error is well under 0.1% in Cambridge
+    assert list(actual_geodesic) == pytest.approx(
+        list(actual_planar), rel=1e-3
+        )
+    assert len(geodesic_system._site_lonlat) == 4
+    assert len(geodesic_system._receiver_lonlat) == 3
+
+def test_build_distance_matrix(synthetic_system):
+
+    synthetic_system.build_distance_matrix(k=None)
+
+    dense_distances = synthetic_system.distance_matrix
+    dense_indices = synthetic_system.site_index_matrix
+
+    assert dense_distances.shape == (3, 4)
+    assert (np.diff(dense_distances, axis=1) >= 0).all()
+
+    synthetic_system.build_distance_matrix(k=2)
+
+    assert synthetic_system.distance_matrix.shape == (3, 2)
+    assert (synthetic_system.site_index_matrix == dense_indices[:, :2]).all()
+    assert (synthetic_system.distance_matrix == dense_distances[:, :2]).all()
+
+    sites = list(synthetic_system.sites.values())
+    receiver_ids = list(synthetic_system.receivers.keys())
+
+    for row, receiver_id in enumerate(receiver_ids):
+        receiver = synthetic_system.receivers[receiver_id]
+        closest_site, interfering_sites = (
+            synthetic_system.find_closest_available_sites(receiver)
+            )
+        serving = synthetic_system.serving_site_indices[row]
+        assert sites[serving].id == closest_site.id
+
+    assert synthetic_system.interfering_site_indices.shape == (3, 1)
+
+def test_estimate_link_budget_matches_scalar(synthetic_system,
+    modulation_coding_lut):
+
+    actual_results = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    assert len(actual_results) == len(synthetic_system.receivers)
+
+    noise = synthetic_system.calculate_noise(10)
+
+    for result, receiver in zip(
+        actual_results, synthetic_system.receivers.values()):
+
+        closest_site, interfering_sites = (
+            synthetic_system.find_closest_available_sites(receiver)
+            )
+        path_loss = synthetic_system.calculate_path_loss(
+            closest_site, receiver, 0.7, 30, 'urban'
+            )
+        received_power = synthetic_system.calc_received_power(
+            closest_site, receiver, path_loss
+            )
+        interference = synthetic_system.calculate_interference(
+            interfering_sites, receiver, 0.7, 'urban'
+            )
+        expected_sinr = synthetic_system.calculate_sinr(
+            received_power, interference, noise
+            )
+
+        assert result['sinr'] == pytest.approx(expected_sinr, abs=0.011)
+
+    #geometry is reused until a site is added
+    distance_matrix = synthetic_system.distance_matrix
+
+    synthetic_system.estimate_link_budget(
+        3.5, 80, '5G', 40, 'urban', modulation_coding_lut
+        )
+
+    assert synthetic_system.distance_matrix is distance_matrix
+
+def test_estimate_link_budget_incremental(synthetic_system,
+    modulation_coding_lut):
+
+    def new_site(site_id, coordinates):
+        return {
+            'type': "Feature",
+            'geometry': {"type": "Point", "coordinates": coordinates},
+            'properties': {"sitengr": site_id}
+            }
+
+    first = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    assert synthetic_system.recomputed_receivers == 3
+
+    #a distant site is not among any receiver's nearest sites
+    synthetic_system.build_new_assets(
+        [new_site('{new}{GEN0.1}', [600000, 300000])], 'CB11'
+        )
+
+    second = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    assert synthetic_system.recomputed_receivers == 0
+    assert [r['sinr'] for r in second] == [r['sinr'] for r in first]
+
+    #a site next to AB3 changes its serving site
+    synthetic_system.build_new_assets(
+        [new_site('{new}{GEN0.2}', [544800, 259520])], 'CB11'
+        )
+
+    third = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    assert 1 <= synthetic_system.recomputed_receivers <= 3
+
+    full = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    assert synthetic_system.recomputed_receivers == 3
+    assert [r['sinr'] for r in third] == [r['sinr'] for r in full]
+    assert [r['capacity_mbps'] for r in third] == [
+        r['capacity_mbps'] for r in full
+        ]
+
+    #a different band is not served from the 0.7 GHz cache
+    synthetic_system.estimate_link_budget(
+        3.5, 80, '5G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    assert synthetic_system.recomputed_receivers == 3
+
+def test_rebuild_existing_site(synthetic_system, synthetic_postcode_sector,
+    setup_transmitters, setup_receivers):
+
+    #rebuilding a site id replaces the site, including in the index
+    synthetic_system.build_new_assets([{
+        'type': "Feature",
+        'geometry': {"type": "Point", "coordinates": [600000, 300000]},
+        'properties': {"sitengr": 'TL4454059600'}
+        }], 'CB11')
+
+    receiver = list(synthetic_system.receivers.values())[0]
+
+    nearest_sites = synthetic_system.find_nearest_sites(
+        receiver.coordinates, 100
+        )
+
+    assert sorted(site.id for site in nearest_sites) == sorted(
+        synthetic_system.sites
+        )
+
+    rebuilt_site = [
+        site for site in nearest_sites if site.id == 'TL4454059600'
+        ][0]
+    assert list(rebuilt_site.coordinates) == [600000, 300000]
+
+    closest_site, sites_within_radius = (
+        synthetic_system.find_sites_within_radius(receiver, 1e6)
+        )
+
+    assert sorted(
+        site.id for site in [closest_site] + sites_within_radius
+        ) == sorted(synthetic_system.sites)
+
+    #geodesic distances use the new position, not the cached projection
+    geodesic_system = NetworkManager(
+        synthetic_postcode_sector, setup_transmitters, setup_receivers,
+        geodesic=True
+        )
+    geodesic_system.build_distance_matrix()
+
+    geodesic_system.build_new_assets([{
+        'type': "Feature",
+        'geometry': {"type": "Point", "coordinates": [545500, 259000]},
+        'properties': {"sitengr": 'TL4454059600'}
+        }], 'CB11')
+
+    site = geodesic_system.sites['TL4454059600']
+    receiver = geodesic_system.receivers['AB3']
+
+    expected = synthetic_system.link_distances([site], receiver)[0]
+    actual = geodesic_system.link_distances([site], receiver)[0]
+
+    assert actual == pytest.approx(expected, rel=1e-3)
+
+def test_estimate_link_budget_rng(synthetic_system, modulation_coding_lut):
+
+    first = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut,
+        np.random.default_rng(7)
+        )
+    second = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut,
+        np.random.default_rng(7)
+        )
+
+    assert [r['sinr'] for r in first] == [r['sinr'] for r in second]
+
+def test_estimate_link_budget_path_loss_tables(synthetic_system,
+    modulation_coding_lut):
+
+    expected = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut,
+        np.random.default_rng(7)
+        )
+    actual = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut,
+        np.random.default_rng(7), path_loss_tables=PathLossTables()
+        )
+
+    assert actual == expected
+
+def dense_network(postcode_sector, quantity, seed, **options):
+
+    rng = np.random.default_rng(seed)
+
+    sites = [
+        {
+            'type': "Feature",
+            'geometry': {
+                "type": "Point",
+                "coordinates": [float(x), float(y)],
+            },
+            'properties': {
+                "sitengr": 'site_{}'.format(i),
+                "ant_height": 10,
+                "power": 30,
+                "gain": 10,
+                "losses": 2,
+            }
+        }
+        for i, (x, y) in enumerate(zip(
+            rng.uniform(544000, 546500, quantity),
+            rng.uniform(258000, 260500, quantity)
+            ))
+        ]
+
+    receivers = generate_receivers(
+        postcode_sector, {'indoor_probability': 50}, 40, rng
+        )
+
+    return NetworkManager(postcode_sector, sites, receivers, **options)
+
+def test_interference_radius(synthetic_postcode_sector,
+    modulation_coding_lut):
+
+    system = dense_network(
+        synthetic_postcode_sector, 300, 1, interference_radius=400
+        )
+
+    actual_results = system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    site_coordinates = np.array(
+        [site.coordinates for site in system.sites.values()]
+        )
+
+    noise = system.calculate_noise(10)
+
+    for row, (result, receiver) in enumerate(zip(
+        actual_results, system.receivers.values())):
+
+        distances = np.hypot(*(site_coordinates - receiver.coordinates).T)
+
+        #every other site within the radius interferes
+        assert system.interference_mask[row].sum() == (
+            np.count_nonzero(distances <= 400) -
+            (1 if distances.min() <= 400 else 0)
+            )
+
+        closest_site, interfering_sites = (
+            system.find_closest_available_sites(receiver)
+            )
+
+        assert len(interfering_sites) == system.interference_mask[row].sum()
+
+        path_loss = system.calculate_path_loss(
+            closest_site, receiver, 0.7, 30, 'urban'
+            )
+        received_power = system.calc_received_power(
+            closest_site, receiver, path_loss
+            )
+        interference = system.calculate_interference(
+            interfering_sites, receiver, 0.7, 'urban'
+            )
+        expected_sinr = system.calculate_sinr(
+            received_power, interference, noise
+            )
+
+        assert result['sinr'] == pytest.approx(expected_sinr, abs=0.011)
+
+    #dense networks have far more than three interferers
+    assert system.interference_mask.sum(axis=1).max() > 10
+
+def test_interference_radius_incremental(synthetic_postcode_sector,
+    modulation_coding_lut):
+
+    system = dense_network(
+        synthetic_postcode_sector, 300, 1, interference_radius=170
+        )
+
+    system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    #a smaller radius drops interferers, so cached results are stale
+    system.interference_radius = 120
+
+    actual_results = system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut, incremental=True
+        )
+
+    assert system.recomputed_receivers > 0
+
+    expected_results = dense_network(
+        synthetic_postcode_sector, 300, 1, interference_radius=120
+        ).estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    assert actual_results == expected_results
+
+def test_interference_power_floor(synthetic_postcode_sector,
+    modulation_coding_lut):
+
+    everything = dense_network(synthetic_postcode_sector, 50, 2)
+    everything.build_distance_matrix(k=None)
+
+    floor = dense_network(
+        synthetic_postcode_sector, 50, 2, interference_power_floor=-1000
+        )
+
+    assert floor.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        ) == everything.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    #a floor above every interferer leaves only noise
+    floor.interference_power_floor = 1000
+
+    signal_to_noise = floor.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    for result, receiver in zip(signal_to_noise, floor.receivers.values()):
+
+        closest_site, _ = floor.find_closest_available_sites(receiver)
+        received_power = floor.calc_received_power(
+            closest_site, receiver, floor.calculate_path_loss(
+                closest_site, receiver, 0.7, 30, 'urban'
+                )
+            )
+
+        assert result['sinr'] == pytest.approx(
+            floor.calculate_sinr(received_power, [], floor.calculate_noise(10)),
+            abs=0.011
+            )
+
+def test_interference_radius_without_neighbours(synthetic_system,
+    modulation_coding_lut):
+
+    synthetic_system.interference_radius = 1
+
+    results = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    assert synthetic_system.distance_matrix.shape == (
+        len(synthetic_system.receivers), 1
+        )
+    assert len(results) == len(synthetic_system.receivers)
+    assert all(np.isfinite(r['sinr']) for r in results)
+
+def test_estimate_link_budget_profiler(synthetic_postcode_sector,
+    setup_transmitters, setup_receivers, modulation_coding_lut):
+
+    profiler = Profiler('CB11')
+
+    system = NetworkManager(
+        synthetic_postcode_sector, setup_transmitters, setup_receivers,
+        profiler=profiler
+        )
+
+    system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+
+    report = profiler.report()
+
+    assert list(report['stages']) == [
+        'link_budget.nearest_sites', 'link_budget.path_loss',
+        'link_budget.interference', 'link_budget.sinr'
+        ]
+    assert report['counters']['receivers'] == len(setup_receivers)
+    assert report['counters']['links'] == system.distance_matrix.size
+
+    system.find_closest_available_sites(
+        list(system.receivers.values())[0]
+        )
+
+    assert profiler.counters['rtree_queries'] == 1
+
+def test_estimate_link_budget_monte_carlo(synthetic_system,
+    modulation_coding_lut, postcode_sector_lut):
+
+    receiver_ids = list(synthetic_system.receivers.keys())
+
+    estimates = synthetic_system.estimate_link_budget_monte_carlo(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut,
+        postcode_sector_lut, 95, np.random.default_rng(42),
+        batch_size=50, min_iterations=100, max_iterations=400
+        )
+
+    assert 100 <= estimates['iterations'] <= 400
+    assert estimates['iterations'] % 50 == 0
+    lower, upper = estimates['sinr_interval']
+    assert lower <= estimates['sinr'] <= upper
+
+    #the original receivers are restored afterwards
+    assert list(synthetic_system.receivers.keys()) == receiver_ids
+    results = synthetic_system.estimate_link_budget(
+        0.7, 10, '4G', 30, 'urban', modulation_coding_lut
+        )
+    assert len(results) == len(receiver_ids)
+
+def test_generate_receivers_rng(synthetic_postcode_sector,
+    postcode_sector_lut):
+
+    first = generate_receivers(
+        synthetic_postcode_sector, postcode_sector_lut, 5,
+        np.random.default_rng(3)
+        )
+    second = generate_receivers(
+        synthetic_postcode_sector, postcode_sector_lut, 5,
+        np.random.default_rng(3)
+        )
+
+    assert len(first) == 5
+    assert [r['geometry'] for r in first] == [r['geometry'] for r in second]
+
+    assert randomly_select_los(np.random.default_rng(3)) in ('los', 'nlos')
 
 def test_calculate_path_loss(base_system):
 
@@ -631,6 +1414,85 @@ def test_modulation_scheme_and_coding_rate(base_system):
 
     assert actual_result == expected_result
 
+def legacy_spectral_efficiency(sinr, generation, modulation_and_coding_lut):
+
+    for lower, upper in zip(modulation_and_coding_lut,
+        modulation_and_coding_lut[1:]):
+        if lower[0] and upper[0] == generation:
+            if sinr >= lower[5] and sinr < upper[5]:
+                return lower[4]
+
+    return 0
+
+def test_modulation_scheme_and_coding_rate_batch(synthetic_system):
+
+    modulation_coding_lut = MODULATION_AND_CODING_LUT
+
+    rng = np.random.default_rng(11)
+    thresholds = [row[5] for row in modulation_coding_lut]
+    sinr = np.concatenate([
+        np.round(rng.uniform(-15, 35, 1000), 2), thresholds, [np.nan]
+        ])
+
+    for generation in ('4G', '5G'):
+
+        actual_result = synthetic_system.modulation_scheme_and_coding_rate(
+            sinr, generation, modulation_coding_lut
+            )
+
+        expected_result = [
+            legacy_spectral_efficiency(
+                value, generation, modulation_coding_lut
+                )
+            for value in sinr
+            ]
+
+        assert actual_result.shape == sinr.shape
+        assert actual_result.tolist() == expected_result
+
+    #rows are not assumed to be in SINR order
+    unordered_lut = [
+        ('4G', 1, 'QPSK', 0, 1, 0),
+        ('4G', 2, 'QPSK', 0, 2, 10),
+        ('4G', 3, 'QPSK', 0, 3, 5),
+        ('4G', 4, 'QPSK', 0, 4, 20),
+        ]
+    sinr = np.arange(-5, 25, 0.5)
+
+    assert synthetic_system.modulation_scheme_and_coding_rate(
+        sinr, '4G', unordered_lut).tolist() == [
+        legacy_spectral_efficiency(value, '4G', unordered_lut)
+        for value in sinr
+        ]
+
+    assert synthetic_system.modulation_scheme_and_coding_rate(
+        5, '4G', []) == 0
+
+def test_calculate_sinr_batch(synthetic_system):
+
+    rng = np.random.default_rng(12)
+    received_power = rng.uniform(-12, -6, 50)
+    interference = rng.uniform(-14, -8, (50, 3))
+
+    actual_result = synthetic_system.calculate_sinr(
+        received_power, interference, -10.45
+        )
+
+    for i in range(50):
+        expected_result = round(np.log10(
+            10**received_power[i] /
+            (np.sum(10**interference[i]) + 10**-10.45)
+            ), 2)
+        assert actual_result[i] == pytest.approx(expected_result, abs=0.011)
+
+    #values whose linear power underflows a float
+    assert synthetic_system.calculate_sinr(
+        -400, [-402, -402], -405
+        ) == pytest.approx(1.7, abs=0.011)
+
+    #no interfering sites
+    assert synthetic_system.calculate_sinr(-20, [], -30) == 10
+
 def link_budget_capacity(base_system):
 
     bandwidth = 10
@@ -645,3 +1507,37 @@ def link_budget_capacity(base_system):
         )
 
     assert actual_estimate_capacity == expected_estimate_capacity
+
+def test_write_lookup_table(tmpdir):
+
+    path = os.path.join(str(tmpdir), 'lookup_table_CB11.csv')
+
+    with ResultsSink(path, LOOKUP_TABLE_FIELDS) as sink:
+        for frequency in (0.7, 0.8):
+            write_lookup_table(
+                1.5, 4.2, 100, 0.01, 'urban', 'generic', 'LTE', frequency,
+                10, 30, 2.5, 'tbc', 'CB11', sink
+                )
+        assert not os.path.exists(path)
+
+    columns = read_table(path)
+
+    assert list(columns) == list(LOOKUP_TABLE_FIELDS)
+    assert columns['frequency'] == ['0.7', '0.8']
+    assert columns['area_capacity_mbps'] == ['100', '100']
+
+def test_simulation_parameters(monkeypatch):
+
+    fingerprint = input_fingerprint(simulation_parameters())
+
+    #cached results are not reused after the path loss models change
+    monkeypatch.setattr(transmitter_module, 'TABLE_VERSION',
+        transmitter_module.TABLE_VERSION + 1)
+
+    assert input_fingerprint(simulation_parameters()) != fingerprint
+
+    monkeypatch.undo()
+    monkeypatch.setattr(transmitter_module, 'PATH_LOSS_TABLES',
+        not transmitter_module.PATH_LOSS_TABLES)
+
+    assert input_fingerprint(simulation_parameters()) != fingerprint